@@ -1,10 +1,25 @@
-from flask import Flask, jsonify, render_template, send_file, request # Framework Flask y utilidades para manejo de JSON, renderizado de plantillas, envío de archivos y solicitudes HTTP
-import subprocess # Ayuda en la ejecución de procesos externos (se utiliza para llamar a generator.py)
+from flask import Flask, Request, jsonify, render_template, send_file, request, Response, stream_with_context, g # Framework Flask y utilidades para manejo de JSON, renderizado de plantillas, envío de archivos y solicitudes HTTP
 import os # Manejo de archivos y directorios
-import threading # Permite ejecutar tareas en hilos paralelos
-import time # Manejo de tiempos de espera (sleep)
 from werkzeug.utils import secure_filename
 import shutil # Operaciones de alto nivel con archivos (copiar, mover, etc...)
+import tempfile # Archivo temporal donde se recibe el archivo subido
+import threading # Compactación del historial en segundo plano
+import time # Latencia de las solicitudes
+import io # Texto del perfil de cProfile
+import cProfile # Perfil opcional de una generación
+import pstats # Resumen del perfil de cProfile
+import metrics # Métricas del proceso en formato Prometheus
+# Motor de generación de reportes; se importa una sola vez al iniciar el worker para que pandas,
+# python-docx y openpyxl ya estén cargados cuando llegue la primera solicitud
+from generator import generate_reports, generate_period_reports, stream_reports, preview_reports, resolve_month, resolve_months, GenerationError, EXCEL_PATH, TEMPLATE_PATH
+from docx_template import get_compiled_template # Plantilla Word compilada una sola vez por worker
+from excel_cache import warm_cache, workbook_hash, file_hash # Caché de las hojas del archivo Excel
+from jobs import JobManager, DONE # Trabajos de generación en segundo plano
+from result_cache import ResultCache # Caché de los ZIP ya generados
+from historial_store import HistorialStore # Índice de los documentos del historial
+from excel_validation import validate_workbook # Validación del archivo Excel antes de reemplazar la base de datos
+from workbook_snapshots import SnapshotStore # Versiones inmutables del archivo Excel
+from events import EventBus # Eventos en tiempo real (/events) compartidos entre workers
 
 # Configuración del directorio del historial
 # Se define la carpeta donde se guardará el historial de los reportes generados
@@ -12,6 +27,10 @@ HISTORIAL_DIR = os.path.join(os.getcwd(), "reports_historial")
 if not os.path.exists(HISTORIAL_DIR):
     os.makedirs(HISTORIAL_DIR)
 
+# Tamaño de página por defecto y máximo del listado del historial
+HISTORIAL_PER_PAGE = 50
+HISTORIAL_MAX_PER_PAGE = 500
+
 # Configuración del directorio de subida y extensiones permitidas
 # Se define la carpeta donde se guardará el archivo excel subido por el usuario con la información de los cursos
 # Se declaran la extensiones validas para el archivo
@@ -20,8 +39,144 @@ ALLOWED_EXTENSIONS = {'xlsx', 'xls'}
 if not os.path.exists(UPLOAD_FOLDER):
     os.makedirs(UPLOAD_FOLDER)
 
+# Versiones del archivo Excel: cada subida se guarda como una versión inmutable y cada generación lee la
+# versión que era la actual al solicitarla. db_excel.xlsx se mantiene como enlace a la versión actual
+# para el uso desde consola (python generator.py)
+DATA_FILE = os.path.join(os.getcwd(), "db_excel.xlsx")
+snapshots = SnapshotStore()
+
+# Eventos en tiempo real: cambios del historial, del archivo Excel y avance de los trabajos
+# Con más nombres que este límite un evento del historial solo pide recargar la lista
+HISTORIAL_EVENT_MAX_NAMES = 200
+event_bus = EventBus()
+
+# Avance y resultado de un trabajo de generación como evento "job"
+def publish_job(job):
+    data = job.to_dict()
+    if job.state == DONE:
+        data["summary"] = dict(job.result)
+        data["summary"].pop("timings", None)
+    event_bus.publish("job", data)
+
+# Configuración de los trabajos de generación en segundo plano
+# Cada trabajo guarda su ZIP en un subdirectorio propio; el número de generaciones simultáneas está acotado
+JOBS_DIR = os.path.join(os.getcwd(), "generation_jobs")
+GENERATION_JOBS_WORKERS = int(os.environ.get("GENERATION_JOBS_WORKERS", "2"))
+job_manager = JobManager(JOBS_DIR, max_workers=GENERATION_JOBS_WORKERS, listener=publish_job)
+
+# Configuración del caché de resultados
+# Los ZIP generados se conservan por (archivo Excel, plantilla, mes) hasta llenar la cuota de disco indicada en MB
+RESULT_CACHE_DIR = os.path.join(os.getcwd(), "results_cache")
+RESULT_CACHE_MAX_MB = int(os.environ.get("RESULT_CACHE_MAX_MB", "512"))
+result_cache = ResultCache(RESULT_CACHE_DIR, RESULT_CACHE_MAX_MB * 1024 * 1024)
+
+# Métricas de las solicitudes HTTP y del caché de resultados (se exponen en /metrics)
+REQUEST_SECONDS = metrics.histogram("http_request_duration_seconds", "Latencia de las solicitudes HTTP por endpoint en segundos", ("endpoint", "method"))
+REQUESTS = metrics.counter("http_requests_total", "Solicitudes HTTP por endpoint y código de estado", ("endpoint", "method", "status"))
+RESULT_CACHE_REQUESTS = metrics.counter("result_cache_requests_total", "Búsquedas de ZIP ya generados en /generate por resultado (hit o miss)", ("result",))
+
+# Funciones con más tiempo acumulado que se incluyen en el perfil de una generación
+PROFILE_TOP_FUNCTIONS = 30
+
+# =============================================================
+# Clase: UploadRequest
+# Objetivo: Solicitud de Flask cuyo formulario escribe cada archivo subido directamente en un archivo
+# temporal oculto de la carpeta de subida (mismo sistema de archivos que el almacén de versiones), en
+# lugar del temporal de Werkzeug: el archivo se escribe en disco una sola vez mientras se recibe y
+# después solo se renombra. Las rutas creadas se guardan en `upload_paths` para eliminarlas si no se usan.
+# =============================================================
+class UploadRequest(Request):
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if not hasattr(self, "upload_paths"):
+            self.upload_paths = []
+        # Se conserva la extensión original, openpyxl la revisa al abrir el archivo
+        fd, path = tempfile.mkstemp(prefix=".subida-", suffix=os.path.splitext(secure_filename(filename or ""))[1], dir=UPLOAD_FOLDER)
+        os.close(fd)
+        self.upload_paths.append(path)
+        return open(path, "wb+") # Con nombre: el endpoint lo usa como ruta del archivo recibido
+
 # Se crea una instancia de la aplicación Flask
 app = Flask(__name__)
+app.request_class = UploadRequest
+
+# Al terminar cada solicitud se eliminan los archivos subidos que no se movieron al almacén de versiones
+# (archivo inválido, partes adicionales del formulario o una subida interrumpida)
+@app.teardown_request
+def remove_uploads(exc=None):
+    for path in getattr(request, "upload_paths", []):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+# =============================================================
+# Latencia de las solicitudes
+# Objetivo: Registrar la duración de cada solicitud (excepto archivos estáticos y /metrics). En las
+# descargas en streaming se mide hasta el inicio de la respuesta.
+# =============================================================
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request(response):
+    start = g.pop("request_start", None)
+    if start is not None and request.endpoint not in (None, "static", "metrics"):
+        REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=request.endpoint, method=request.method)
+        REQUESTS.inc(endpoint=request.endpoint, method=request.method, status=response.status_code)
+    return response
+
+# =============================================================
+# Endpoint: /metrics
+# Objetivo: Exponer las métricas del proceso en el formato de texto de Prometheus: tiempos por etapa
+# de la generación, documentos y bytes generados, aciertos de los cachés y latencia de los endpoints.
+# =============================================================
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    return Response(metrics.REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
+# =============================================================
+# Endpoint: /events
+# Objetivo: Enviar los cambios en tiempo real con Server-Sent Events para que la página los aplique
+# sin volver a consultar las listas completas:
+# - "historial": {"added": [...], "removed": [...], "total": N}, {"cleared": true} o {"reload": true}
+# - "workbook": datos del nuevo archivo Excel en uso (igual que /current_excel)
+# - "job": avance y resultado de un trabajo de generación (igual que /jobs/<id>)
+# - "reset": se perdieron eventos, la página debe recargar los datos completos
+# Cada conexión ocupa un hilo mientras está abierta; gunicorn.conf.py configura workers con hilos
+# (gthread) para que no bloquee al worker. La conexión se cierra cada pocos minutos y el navegador se
+# reconecta enviando Last-Event-ID para recibir los eventos que se perdió.
+# =============================================================
+@app.route('/events', methods=['GET'])
+def events_endpoint():
+    return Response(event_bus.stream(request.headers.get("Last-Event-ID")), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no" # Evita que un proxy nginx retenga los eventos
+    })
+
+# ===============================================================================================
+# Función: publish_historial
+# Objetivo: Publicar los documentos agregados y eliminados del historial junto con el nuevo total.
+# ===============================================================================================
+def publish_historial(added=(), removed=(), cleared=False):
+    added, removed = list(added), list(removed)
+    if not (added or removed or cleared):
+        return
+    with HistorialStore(HISTORIAL_DIR) as store:
+        total = store.list(per_page=1)[0]
+    if cleared:
+        data = {"cleared": True, "total": total}
+    elif len(added) + len(removed) > HISTORIAL_EVENT_MAX_NAMES:
+        data = {"reload": True, "total": total}
+    else:
+        data = {"added": added, "removed": removed, "total": total}
+    event_bus.publish("historial", data)
+
+# Se compila la plantilla Word al iniciar el worker para que la primera generación no pague ese costo
+try:
+    get_compiled_template(TEMPLATE_PATH)
+except Exception as e:
+    app.logger.warning(f"No se pudo compilar la plantilla Word al iniciar: {e}")
 
 # =============================================================
 # Ruta principal (Home)
@@ -35,9 +190,12 @@ def home():
 # Endpoint: /upload_excel
 # Objetivo: Actualizar la base de datos con la información de los cursos y participantes
 # sin tener que acceder directamente al servidor.
-# - Se recibe el archivo Excel desde la web, lo valida y lo guarda o reemplaza en una
-#   ubicación accesible para que el proceso de generación de reportes utilice los datos actualizados.
-# - Devuelve una respuesta JSON indicando ya sea el éxito o el error.
+# - El archivo Excel se escribe en disco mientras se recibe, directamente en un archivo temporal (ver UploadRequest).
+# - Los temporales que no pasan al almacén de versiones se eliminan al terminar la solicitud.
+# - Se valida leyendo solo los encabezados y una muestra de filas (hojas, columnas, meses y fechas);
+#   si no es válido se descarta y se devuelve el reporte sin tocar la base de datos actual.
+# - Si es válido se coloca en su lugar mediante renombrado atómico (sin una segunda copia completa).
+# - Devuelve una respuesta JSON indicando ya sea el éxito o el error, junto con el reporte de validación.
 # =====================================================================================================
 @app.route('/upload_excel', methods=['POST'])
 def upload_excel():
@@ -49,31 +207,100 @@ def upload_excel():
         return jsonify({"error": "No se seleccionó ningún archivo"}), 400
     
     if file and allowed_file(file.filename):
-        # Se eliminan los archivos previos en UPLOAD_FOLDER para que quede solo el último que se subio
-        for f in os.listdir(UPLOAD_FOLDER):
-            os.remove(os.path.join(UPLOAD_FOLDER, f))
-
         filename = secure_filename(file.filename)
-        file_path = os.path.join(UPLOAD_FOLDER, filename)
+        # El contenido ya está completo en el temporal de la carpeta de subida
+        tmp_path = file.stream.name
         try:
-            file.save(file_path)
-            DATA_FILE = os.path.join(os.getcwd(), "db_excel.xlsx")
-            shutil.copy(file_path, DATA_FILE)
-            return jsonify({"message": f"Archivo '{filename}' subido y actualizado exitosamente."})
+            file.stream.close()
+            report = validate_workbook(tmp_path)
+            if not report["valid"]:
+                return jsonify({"error": "El archivo Excel no tiene el formato esperado", "details": validation_details(report), "report": report}), 400
+
+            # El archivo se mueve al almacén de versiones y se vuelve la versión actual solo después de
+            # colocarlo como db_excel.xlsx, así ambos nunca difieren si el reemplazo falla; las
+            # generaciones en curso siguen leyendo la versión con la que iniciaron
+            rows = {sheet_name: sheet["rows"] for sheet_name, sheet in report["sheets"].items()}
+            snapshot = snapshots.add(tmp_path, filename, rows, move=True, make_current=False)
+            replace_data_file(snapshot.path, DATA_FILE)
+            snapshots.set_current(snapshot)
+            snapshots.gc()
+        except Exception as e:
+            return jsonify({"error": f"Error al guardar el archivo: {e}"}), 500
+        # Los ZIP generados con el archivo anterior ya no son válidos
+        result_cache.clear()
+        # Se interpreta el archivo una sola vez en este momento para que la primera generación lo lea del caché
+        try:
+            warm_cache(snapshot.path)
         except Exception as e:
-            return jsonify({"error": f"Error al guardar el archivo: str{e}"}), 500
+            app.logger.warning(f"No se pudo preparar el caché del archivo Excel: {e}")
+        event_bus.publish("workbook", current_excel_info(snapshot))
+        return jsonify({"message": f"Archivo '{filename}' subido y actualizado exitosamente.", "report": report})
     else:
         return jsonify({"error": "Tipo de archivo no permitido. Solo se permiten archivos Excel."}), 400
-    
+
+# ===============================================================================================
+# Función: replace_data_file
+# Objetivo: Colocar la versión actual como db_excel.xlsx de forma atómica. Se crea una copia con nombre
+# temporal y se renombra sobre db_excel.xlsx, así quien lo lea desde consola nunca encuentra un archivo
+# a medio escribir. Es una copia y no un enlace para que modificar db_excel.xlsx en el servidor no
+# altere la versión guardada.
+# ===============================================================================================
+def replace_data_file(file_path, data_file):
+    tmp_path = f"{data_file}.{os.getpid()}.tmp"
+    shutil.copyfile(file_path, tmp_path)
+    os.replace(tmp_path, data_file)
+
+# ===============================================================================================
+# Función: validation_details
+# Objetivo: Resumir en un texto para el usuario los problemas encontrados en el reporte de validación.
+# ===============================================================================================
+def validation_details(report):
+    if report.get("error"):
+        return report["error"]
+    details = []
+    if report["missing_sheets"]:
+        details.append(f"Hojas faltantes: {', '.join(report['missing_sheets'])}")
+    for sheet_name, sheet in report["sheets"].items():
+        if sheet["missing_columns"]:
+            details.append(f"Columnas faltantes en {sheet_name}: {', '.join(sheet['missing_columns'])}")
+    return ". ".join(details)
+
+# ===============================================================================================
+# Función: import_data_file
+# Objetivo: Al iniciar, registrar db_excel.xlsx como versión actual si todavía no hay versiones o si
+# el archivo se reemplazó manualmente en el servidor (su contenido ya no coincide con la versión actual).
+# ===============================================================================================
+def import_data_file():
+    if not os.path.exists(DATA_FILE):
+        return
+    current = snapshots.current()
+    if current is not None and current.hash == file_hash(DATA_FILE):
+        return
+    # Nombre del último archivo subido antes de que existieran las versiones
+    files = [f for f in os.listdir(UPLOAD_FOLDER) if not f.startswith('.')]
+    snapshots.add(DATA_FILE, files[0] if len(files) == 1 else os.path.basename(DATA_FILE))
+
+try:
+    import_data_file()
+    snapshots.gc()
+except Exception as e:
+    app.logger.warning(f"No se pudo registrar la versión actual del archivo Excel: {e}")
+
 # ======================================================================================================
 # Endpoint: /current_excel
 # Objetivo: Devolver el nombre del ultimo archivo Excel subido por el usuario con la intención de que
 # el usuario sepa de que archivo se generaran los documentos en caso de querer generarlos al instante.
+# Incluye los datos de la versión actual: hash, tamaño, fecha de subida, filas por hoja y el número de
+# versiones guardadas y reservadas por generaciones en curso.
 # ======================================================================================================   
 @app.route('/current_excel', methods=['GET'])
 def current_excel():
     try:
-        files = os.listdir(UPLOAD_FOLDER)
+        snapshot = snapshots.current()
+        if snapshot is not None:
+            return jsonify(current_excel_info(snapshot))
+        # Se omiten los archivos ocultos (subidas temporales en curso)
+        files = [f for f in os.listdir(UPLOAD_FOLDER) if not f.startswith('.')]
         if len(files) == 1:
             current_filename = files[0]
             return jsonify({ "filename": current_filename })
@@ -82,6 +309,10 @@ def current_excel():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# Datos de la versión del archivo Excel en uso (respuesta de /current_excel y evento "workbook")
+def current_excel_info(snapshot):
+    return dict(snapshot.meta, filename=snapshot.meta.get("filename"), **snapshots.stats())
+
 # ===============================================================================================
 # Función: allowed_file
 # Objetivo: Verificar que el archivo subido por el usuario contenga las extensiones permitidas,
@@ -93,118 +324,358 @@ def allowed_file(filename):
 # ==========================================================================================
 # Endpoint: /download_zip
 # Objetivo: Permitir la descarga del archivo ZIP generado.
-# - Recibe el nombre del archivo a través de un parámetro GET.
-# - Envía el archivo como descarga adjunta.
-# - Posteriormente, lanza un hilo para eliminar el ZIP del servidor después de un retraso.
+# - Recibe la llave del ZIP en el caché de resultados a través de un parámetro GET.
+# - Envía el archivo como descarga adjunta con un ETag igual a la llave; si el cliente ya tiene esa
+#   versión (If-None-Match) se responde 304 sin volver a enviar el archivo.
+# - Modo streaming (?stream=1&month=N): genera el ZIP del mes mientras se envía, de modo que
+#   el cliente empieza a recibir bytes antes de que se construya el último documento.
 # ==========================================================================================
 @app.route('/download_zip', methods=['GET'])
 def download_zip():
-    file_name = request.args.get("file")
-    zip_path = os.path.join(os.getcwd(), file_name)
-    if os.path.exists(zip_path):
-        response = send_file(zip_path, as_attachment=True)
-        # Se lanza la eliminación del archivo ZIP en un hilo separado para no bloquear la respuesta
-        threading.Thread(target=delayed_delete, args=(zip_path,)).start()
-        return response
-    return jsonify({"error": "Archivo ZIP no encontrado, revise el formato del archivo de datos"}), 500
-
-# =============================================================================
-# Función: delayed_delete
-# Objetivo: Esperar 5 segundos y luego eliminar el archivo ZIP del servidor
-# =============================================================================
-def delayed_delete(zip_path):
-    time.sleep(5) # Se espera 5 segundos antes de eliminar el ZIP del servidor
+    if request.args.get("stream"):
+        return download_zip_stream(request.args.get("month"))
+
+    key = request.args.get("key", "")
+    cached = result_cache.get(key) if key.isalnum() else None
+    if cached:
+        zip_path, meta = cached
+        return send_file(zip_path, as_attachment=True, download_name=meta["download_name"], etag=key, conditional=True)
+    return jsonify({"error": "Archivo ZIP no encontrado, revise el formato del archivo de datos"}), 404
+
+# ==========================================================================================
+# Función: download_zip_stream
+# Objetivo: Generar y enviar el ZIP del mes al mismo tiempo. Los errores del archivo de datos o
+# de la plantilla se detectan antes de iniciar la respuesta y se devuelven como JSON.
+# ==========================================================================================
+def download_zip_stream(month):
+    # La versión del archivo Excel solo se lee al preparar la generación, la reserva se libera enseguida
+    snapshot, pin = snapshots.pin()
     try:
-        if os.path.exists(zip_path):
-            os.remove(zip_path)
-            print(f"Archivo ZIP eliminado del servidor: {zip_path}")
-    except Exception as e:
-        app.logger.error(f"Error al eliminar el archivo ZIP: {e}");
-# ===========================================================================
+        result, chunks = stream_reports(month, excel_path=snapshot.path if snapshot else EXCEL_PATH)
+    except GenerationError as e:
+        return jsonify({"error": "Error al generar los reportes", "details": str(e)}), 500
+    finally:
+        snapshots.unpin(pin)
+    if not result.total_courses:
+        return jsonify({"error": "No hay cursos disponibles para este mes. Revise el formato del archivo Excel."}), 500
+
+    # Los cambios del historial se publican al terminar de enviar el ZIP
+    def chunks_with_events():
+        yield from chunks
+        publish_historial(result.historial_added, result.historial_removed)
+
+    return Response(stream_with_context(chunks_with_events()), mimetype="application/zip", headers={
+        "Content-Disposition": f"attachment; filename=Reportes_{result.month_name}.zip"
+    })
+
+# ===========================================================================================
 # Endpoint: /historial
-# Objetivo: Listar los archivos presentes en el directorio del historial.
-# - Devuelve un JSON con la lista de archivos.
-# ===========================================================================
+# Objetivo: Listar los documentos del historial desde su índice, sin recorrer el directorio.
+# - Parámetros GET opcionales: page, per_page, sort (creado, nombre, curso, fecha_inicio, mes,
+#   tamano), order (asc o desc), month, course (coincidencia parcial), date_from y date_to
+#   (fecha de inicio del curso, AAAA-MM-DD).
+# - Devuelve un JSON con los nombres de la página ("historial"), sus datos ("items") y el total.
+# ===========================================================================================
 @app.route('/historial', methods=['GET'])
 def list_historial():
     try:
         # Se verifica que el directorio del historial exista en tiempo de ejecución
         if not os.path.exists(HISTORIAL_DIR):
             return jsonify({"error": "El directorio del historial no existe"}), 500
-        # Se listan todos los archivos del directorio HISTORIAL_DIR
-        files = os.listdir(HISTORIAL_DIR)
-        return jsonify({"historial": files})
+        page = max(request.args.get("page", 1, type=int), 1)
+        per_page = min(max(request.args.get("per_page", HISTORIAL_PER_PAGE, type=int), 1), HISTORIAL_MAX_PER_PAGE)
+        with HistorialStore(HISTORIAL_DIR) as store:
+            total, items = store.list(
+                page=page,
+                per_page=per_page,
+                sort=request.args.get("sort", "creado"),
+                order=request.args.get("order", "desc"),
+                month=request.args.get("month", type=int),
+                course=request.args.get("course"),
+                date_from=request.args.get("date_from"),
+                date_to=request.args.get("date_to")
+            )
+        return jsonify({
+            "historial": [item["nombre"] for item in items],
+            "items": items,
+            "total": total,
+            "page": page,
+            "per_page": per_page,
+            "pages": (total + per_page - 1) // per_page
+        })
     except Exception as e:
         return jsonify({"error": "No se pudo obtener el historial de los documentos", "details": str(e)}), 500
 
-# =================================================================================
+# ===============================================================================================
+# Función: schedule_compaction
+# Objetivo: Compactar en su archivo mensual los documentos de los meses antiguos en un hilo aparte, sin
+# retrasar el inicio del worker ni el resultado de un trabajo. Si ya hay una compactación en curso en
+# este worker no se inicia otra. Un error solo se registra.
+# ===============================================================================================
+_compaction_lock = threading.Lock()
+
+def schedule_compaction():
+    if not _compaction_lock.locked():
+        threading.Thread(target=compact_historial, name="compactacion", daemon=True).start()
+
+def compact_historial():
+    if not _compaction_lock.acquire(blocking=False):
+        return
+    try:
+        with HistorialStore(HISTORIAL_DIR) as store:
+            store.compact()
+    except Exception as e:
+        app.logger.warning(f"No se pudo compactar el historial: {e}")
+    finally:
+        _compaction_lock.release()
+
+# Al iniciar se registran en el índice los documentos generados antes de que existiera y se compactan los
+# meses antiguos (en segundo plano); un índice bloqueado o dañado no impide que el worker inicie
+try:
+    with HistorialStore(HISTORIAL_DIR) as store:
+        store.sync()
+except Exception as e:
+    app.logger.warning(f"No se pudo sincronizar el índice del historial: {e}")
+schedule_compaction()
+
+# ===========================================================================================
+# Endpoint: /historial/<nombre>
+# Objetivo: Descargar un documento del historial, ya sea suelto o desde el archivo de su mes.
+# ===========================================================================================
+@app.route('/historial/<path:name>', methods=['GET'])
+def download_historial(name):
+    try:
+        with HistorialStore(HISTORIAL_DIR) as store:
+            content = store.read(name)
+    except FileNotFoundError:
+        return jsonify({"error": "El documento no existe en el historial"}), 404
+    except Exception as e:
+        return jsonify({"error": "No se pudo obtener el documento", "details": str(e)}), 500
+    return send_file(
+        io.BytesIO(content),
+        mimetype="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+        as_attachment=True,
+        download_name=name
+    )
+
+# ===========================================================================================
 # Endpoint: /clean_historial
-# Objetivo: Eliminar todos los archivos presentes en el directorio del historial.
-# - Se invoca mediante una solicitud POST.
-# =================================================================================
+# Objetivo: Eliminar documentos del historial.
+# - Se invoca mediante una solicitud POST. Sin cuerpo se eliminan todos los documentos.
+# - JSON opcional: {"older_than_days": N} elimina los generados hace más de N días y
+#   {"month": M} los del mes indicado (se pueden combinar). El mes también puede ser un periodo
+#   ("1,2,3", [1, 2, 3] o "year").
+# ===========================================================================================
 @app.route('/clean_historial', methods=['POST'])
 def clean_historial():
     try:
-        for f in os.listdir(HISTORIAL_DIR):
-            file_path = os.path.join(HISTORIAL_DIR, f)
-            os.remove(file_path)
-        return jsonify({"message": "Historial limpiado existosamente."})
+        data = request.get_json(silent=True) or {}
+        older_than_days = data.get("older_than_days")
+        older_than_days = float(older_than_days) if older_than_days is not None else None
+        month = data.get("month")
+        with HistorialStore(HISTORIAL_DIR) as store:
+            if month is None:
+                names = store.names_where(older_than_days=older_than_days)
+            else:
+                names = [name for m in resolve_months(month if isinstance(month, list) else str(month)) for name in store.names_where(older_than_days=older_than_days, month=m)]
+            removed = store.remove(names)
+        cleared = older_than_days is None and month is None
+        if cleared:
+            # Limpieza total: también se eliminan los archivos que no estén en el índice (salvo el índice mismo)
+            for f in os.listdir(HISTORIAL_DIR):
+                if not f.startswith('.'):
+                    os.remove(os.path.join(HISTORIAL_DIR, f))
+                    removed += 1
+        publish_historial(removed=names, cleared=cleared)
+        return jsonify({"message": "Historial limpiado existosamente.", "removed": removed})
     except Exception as e:
         return jsonify({"error": "Error al limpiar el historial", "details": str(e)}), 500
 
+# =================================================================================================================
+# Endpoint: /preview
+# Objetivo: Vista previa de la generación sin construir documentos, calculada con las hojas del archivo
+# Excel ya interpretadas (caché en memoria), para saber antes de generar si un mes tiene cursos.
+# - Parámetros GET: month (un mes, por defecto el actual) o months ("1,2,3", "1-3" o "year" para el
+#   resumen de los 12 meses en una sola consulta); courses=0 omite la lista de cursos de cada mes.
+# - Devuelve por mes los cursos con sus participantes y lotes, los cursos sin participantes, el número de
+#   documentos y el tamaño estimado del ZIP, además de los totales.
+# =================================================================================================================
+@app.route('/preview', methods=['GET'])
+def preview_generation():
+    start = time.perf_counter()
+    months = request.args.get("months")
+    if months is None:
+        months = resolve_month(request.args.get("month"))
+    snapshot = snapshots.current()
+    try:
+        preview = preview_reports(months, snapshot.path if snapshot else EXCEL_PATH, HISTORIAL_DIR, courses=request.args.get("courses") != "0")
+    except GenerationError as e:
+        return jsonify({"error": "No se pudo obtener la vista previa", "details": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": "Error inesperado", "details": str(e)}), 500
+    preview["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return jsonify(preview)
+
 # =================================================================================================================
 # Endpoint: /generate
-# Objetivo: Ejecutar el script generator.py para generar reportes.
-# - Recibe datos JSON (por ejemplo, el mes a procesar).
-# - Llama generator.py como proceso externo y captura su salida.
-# - Analiza la salida para extraer información (como el nombre del ZIP generado) y construye una respuesta JSON.
+# Objetivo: Encolar la generación de los reportes del mes solicitado.
+# - Recibe datos JSON: el mes a procesar ({"month": 3}) o varios meses en una sola pasada
+#   ({"months": [1, 2, 3]}, {"months": "1-3"} o {"months": "year"}); en ese caso el ZIP contiene una
+#   carpeta por mes y el resumen incluye el de cada mes.
+# - Opcional: {"timings": true} incluye en el resumen el tiempo de cada etapa en milisegundos y
+#   {"profile": true} ejecuta la generación con cProfile (sin usar el caché de resultados ni unirse a otro
+#   trabajo) e incluye en el resumen las funciones con más tiempo acumulado.
+# - Crea un trabajo en segundo plano y devuelve su identificador de inmediato (202), sin bloquear el worker.
+# - Las solicitudes idénticas (mismo mes y misma versión del archivo Excel) se unen al trabajo en curso.
+# - La generación lee la versión del archivo Excel que era la actual al recibir la solicitud, aunque
+#   mientras tanto se suba otro archivo.
+# - El avance se consulta en /jobs/<id>; al terminar el resumen incluye la URL de descarga del ZIP.
 # =================================================================================================================
 @app.route('/generate', methods=['POST'])
 def report_generator():
     try:
         data = request.get_json(silent=True) or {} # Se obtiene el JSON enviado en la solicitud, sin lanzar error si es inválido
-        # Se obtiene el párametro 'month' del JSON de la solicitud. Si no se envía, se deja vacío para que generator.py use el mes actual por defecto
-        month = data.get("month")
-        if month is None:
-            month = "" # Se puede dejar vacio, de modo que generator.py use el mes actual por defecto
-        # Se ejecuta generator.py pasando el argumento "month" como un proceso externo y se captura su salida
-        result = subprocess.run(['python', 'generator.py', str(month)], capture_output=True, text=True)
-
-        # Si la ejecución fue exitosa (código de salida 0), se procesa la salida para extraer los datos relevantes
-        if result.returncode == 0:
-            # Se divide la salida en líneas para buscar información específica
-            output_lines = result.stdout.splitlines()
-            zip_path = None
-            summary = {}
-
-            for line in output_lines:
-                if line.startswith("Mes procesado:"):
-                    summary["month"] = line.split(":", 1)[1].strip()
-                elif line.startswith("Total de documentos generados:"):
-                    summary["total_docs"] = line.split(":", 1)[1].strip()
-                elif line.startswith("Cursos sin participantes:"):
-                    summary["courses_without_participants"] = line.split(":", 1)[1].strip()
-                elif line.startswith("ZIP generado:"):
-                    zip_path = line.split(":", 1)[1].strip()
-                    summary["zip_path"] = zip_path
-            
-            # Si se encontró el ZIP y el archivo existe, se construye la URL de descarga y se devuelve el resumen
-            if zip_path and os.path.exists(zip_path):
-                # Se construye el URL de descarga
-                download_url = f"/download_zip?file={os.path.basename(zip_path)}"
-                summary["download_url"] = download_url
+        # Se obtiene el párametro 'month' del JSON de la solicitud. Si no se envía, se usa el mes actual por defecto
+        if data.get("months") is not None:
+            try:
+                month = resolve_months(data["months"])
+            except GenerationError as e:
+                return jsonify({"error": "Meses no válidos", "details": str(e)}), 400
+            # Un solo mes se genera igual que con el parámetro 'month' (comparte su caché)
+            if len(month) == 1:
+                month = month[0]
+        else:
+            month = resolve_month(data.get("month"))
+        # La versión del archivo Excel y de la plantilla forman la llave: si ya existe el ZIP se devuelve
+        # de inmediato y si hay un trabajo idéntico en curso la solicitud se une a él
+        timings = bool(data.get("timings"))
+        profile = bool(data.get("profile"))
+        # Se reserva la versión actual del archivo Excel; la reserva pasa al trabajo o se libera aquí
+        snapshot, pin = snapshots.pin()
+        excel_path = snapshot.path if snapshot else EXCEL_PATH
+        try:
+            try:
+                key = ResultCache.key(snapshot.hash if snapshot else workbook_hash(excel_path), file_hash(TEMPLATE_PATH), month_key(month))
+            except OSError:
+                key = None
+            cached = result_cache.get(key) if key and not profile else None
+            if not profile:
+                RESULT_CACHE_REQUESTS.inc(result="hit" if cached else "miss")
+            if cached:
+                snapshots.unpin(pin)
                 return jsonify({
                     "message": "Reportes generados correctamente",
-                    "summary": summary
+                    "cached": True,
+                    "summary": cached_summary(key, cached[1], timings)
                 })
 
-            return jsonify({"error": "Archivo ZIP no encontrado. Revise el formato del archivo Excel."}), 500
-        # Si hubo algún error en la ejecución, se devuelve un mensaje de error con los detalles de la salida del error
-        else:
-            return jsonify({"error": "Error al generar los reportes", "details": result.stderr}), 500 # 500 es un código HTTP que indica un error interno en el servidor
+            # Una ejecución con perfil nunca se une a otro trabajo (llave única)
+            job_key = object() if profile else (month_key(month), key)
+            job, coalesced = job_manager.submit(job_key, lambda job: run_generation_job(job, month, excel_path, pin, profile))
+        except Exception:
+            snapshots.unpin(pin)
+            raise
+        if coalesced:
+            snapshots.unpin(pin) # El trabajo al que se une ya tiene reservada la misma versión
+        return jsonify({
+            "message": "Generación de reportes en curso",
+            "job_id": job.id,
+            "status_url": f"/jobs/{job.id}" + ("?timings=1" if timings else ""),
+            "coalesced": coalesced
+        }), 202
     # Captura errores inesperados y los devuelve como respuesta en formato JSON
     except Exception as e:
-        return jsonify({"error": "Error inesperado", "details": str(e)}), 500    
+        return jsonify({"error": "Error inesperado", "details": str(e)}), 500
+
+# =================================================================================================================
+# Función: run_generation_job
+# Objetivo: Ejecutar el motor de generación dentro de un trabajo, informando su avance, y guardar el ZIP
+# resultante en el caché de resultados. `month` es un mes o la lista de meses de un periodo y `excel_path`
+# la versión del archivo Excel reservada al recibir la solicitud (`pin`, se libera al terminar). Con `profile`
+# la generación se ejecuta con cProfile (solo el hilo del trabajo, no los procesos de renderizado).
+# =================================================================================================================
+def run_generation_job(job, month, excel_path, pin=None, profile=False):
+    profiler = cProfile.Profile() if profile else None
+    try:
+        # Se registran los hashes con los que realmente se generó, por si la plantilla cambió mientras el trabajo esperaba
+        workbook, template = workbook_hash(excel_path), file_hash(TEMPLATE_PATH)
+        if profiler:
+            profiler.enable()
+        if isinstance(month, list):
+            result = generate_period_reports(month, excel_path, output_dir=job.output_dir, progress=job.progress)
+        else:
+            result = generate_reports(month, excel_path, output_dir=job.output_dir, progress=job.progress)
+    finally:
+        if profiler:
+            profiler.disable()
+        # La versión del archivo Excel ya no se vuelve a leer
+        snapshots.unpin(pin)
+    publish_historial(result.historial_added, result.historial_removed)
+    schedule_compaction()
+    if not result.zip_path:
+        raise GenerationError("No hay cursos disponibles para este mes. Revise el formato del archivo Excel.")
+
+    key = ResultCache.key(workbook, template, month_key(month))
+    summary = result.summary()
+    meta = {
+        "workbook_hash": workbook,
+        "template_hash": template,
+        "month": month,
+        "download_name": os.path.basename(result.zip_path),
+        "summary": summary
+    }
+    # Si mientras tanto se subió otro archivo, el ZIP de la versión anterior no desplaza a los de la actual
+    current = snapshots.current()
+    result.zip_path = result_cache.put(key, result.zip_path, meta, purge_others=current is None or current.hash == workbook)
+    summary = cached_summary(key, meta, timings=True)
+    if profiler:
+        summary["profile"] = profile_text(profiler)
+    return summary
+
+# =================================================================================================================
+# Función: profile_text
+# Objetivo: Texto con las funciones de mayor tiempo acumulado de un perfil de cProfile.
+# =================================================================================================================
+def profile_text(profiler):
+    output = io.StringIO()
+    pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+    return output.getvalue()
+
+# Identificador de la selección de meses para las llaves del caché y de los trabajos ("3" o "1,2,3")
+def month_key(month):
+    return ",".join(str(m) for m in month) if isinstance(month, list) else month
+
+# =================================================================================================================
+# Función: cached_summary
+# Objetivo: Resumen de una generación guardada en el caché junto con su URL de descarga. Los tiempos por etapa
+# solo se incluyen si se solicitaron.
+# =================================================================================================================
+def cached_summary(key, meta, timings=False):
+    summary = dict(meta["summary"])
+    summary.pop("zip_path", None) # La ruta en el servidor no se expone, se descarga por su llave
+    if not timings:
+        summary.pop("timings", None)
+    summary["download_url"] = f"/download_zip?key={key}"
+    return summary
+
+# =================================================================================================================
+# Endpoint: /jobs/<job_id>
+# Objetivo: Consultar el estado de un trabajo de generación (pending, running, done o error), los documentos
+# generados contra el total y el curso en proceso. Al terminar incluye el resumen y la URL de descarga (con
+# ?timings=1 también el tiempo de cada etapa).
+# =================================================================================================================
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Trabajo de generación no encontrado o expirado"}), 404
+
+    response = job.to_dict()
+    if job.state == DONE:
+        response["summary"] = dict(job.result)
+        if not request.args.get("timings"):
+            response["summary"].pop("timings", None)
+    return jsonify(response)
 
 # Punto de entrada de la app Flask, se inicia la aplicación en modo depuración en el puerto 5000
 if __name__ == '__main__':
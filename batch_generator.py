@@ -0,0 +1,128 @@
+import os # Manejo de rutas y directorios de salida por oficina
+import sys # Argumentos, salida estándar y código de salida del script
+import json # Resumen de cada archivo en formato JSON
+import time # Duración de la generación de cada oficina
+import argparse # Argumentos de la línea de comandos
+import contextlib # Redirección de los mensajes del generador a la salida de errores
+import multiprocessing # Contexto 'spawn' para los procesos de las oficinas
+from concurrent.futures import ProcessPoolExecutor, as_completed # Generación de varias oficinas en paralelo
+from generator import GenerationError, TEMPLATE_PATH, generate_reports, generate_period_reports, resolve_months
+
+# Separador entre el archivo Excel y su plantilla Word propia: oficina.xlsx::plantilla.docx
+TEMPLATE_SEPARATOR = '::'
+
+# Directorio donde se crea una carpeta por oficina con su ZIP y su historial
+OUTPUT_DIR = os.path.join(os.getcwd(), "reportes_oficinas")
+
+#=======================================================================================================
+# Función: collect_workbooks
+# Objetivo: Convertir los argumentos recibidos (archivos .xlsx, directorios con archivos .xlsx y
+#           archivos con plantilla propia "oficina.xlsx::plantilla.docx") en la lista de oficinas a
+#           procesar: nombre de la oficina, archivo Excel y plantilla. El nombre de la oficina es el
+#           nombre del archivo sin extensión; si se repite se le agrega un número.
+#=======================================================================================================
+def collect_workbooks(paths, default_template=TEMPLATE_PATH):
+    workbooks = []
+    for path in paths:
+        excel_path, _, template_path = path.partition(TEMPLATE_SEPARATOR)
+        if os.path.isdir(excel_path):
+            # Archivos temporales de Excel (~$archivo.xlsx) y ocultos no son oficinas
+            files = sorted(f for f in os.listdir(excel_path) if f.lower().endswith('.xlsx') and not f.startswith(('~$', '.')))
+            workbooks.extend((os.path.join(excel_path, f), template_path or default_template) for f in files)
+        else:
+            workbooks.append((excel_path, template_path or default_template))
+
+    offices = []
+    names = set()
+    for excel_path, template_path in workbooks:
+        base = os.path.splitext(os.path.basename(excel_path))[0] or "oficina"
+        name, counter = base, 2
+        while name in names:
+            name = f"{base}_{counter}"
+            counter += 1
+        names.add(name)
+        offices.append({"office": name, "excel": os.path.abspath(excel_path), "template": os.path.abspath(template_path)})
+    return offices
+
+#=======================================================================================================
+# Función: generate_office
+# Objetivo: Generar los reportes de una oficina dentro de su propio directorio (ZIP e historial
+#           separados de las demás oficinas) y devolver su resumen. Se ejecuta en los procesos del
+#           grupo; los errores se devuelven en el resumen para no detener a las demás oficinas.
+#=======================================================================================================
+def generate_office(office, months, output_dir, render_workers=1):
+    office_dir = os.path.join(output_dir, office["office"])
+    historial_dir = os.path.join(office_dir, "reports_historial") # El historial se crea al guardar el primer documento
+    summary = dict(office, output_dir=office_dir, ok=False)
+    start = time.perf_counter()
+    try:
+        os.makedirs(office_dir, exist_ok=True)
+        # La salida estándar se reserva para los resúmenes JSON
+        with contextlib.redirect_stdout(sys.stderr):
+            if len(months) > 1:
+                result = generate_period_reports(months, office["excel"], office["template"], office_dir, historial_dir, render_workers)
+            else:
+                result = generate_reports(months[0], office["excel"], office["template"], office_dir, historial_dir, render_workers)
+        summary["ok"] = True
+        summary["result"] = result.summary()
+    except GenerationError as e:
+        summary["error"] = str(e)
+    except Exception as e:
+        summary["error"] = f"Error inesperado: {e}"
+    if not summary["ok"] and os.path.isdir(office_dir) and not os.listdir(office_dir):
+        os.rmdir(office_dir) # No se dejan carpetas vacías de las oficinas que fallaron
+    summary["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return summary
+
+#=======================================================================================================
+# Función: run_batch
+# Objetivo: Procesar todas las oficinas en un grupo de `workers` procesos y llamar a `report(resumen)`
+#           conforme termina cada una. Los procesos se reutilizan entre oficinas, así que las
+#           bibliotecas se cargan una sola vez por proceso. Devuelve la lista de resúmenes en el orden
+#           de las oficinas.
+#=======================================================================================================
+def run_batch(offices, months, output_dir=OUTPUT_DIR, workers=None, render_workers=1, report=None):
+    workers = max(1, min(workers or os.cpu_count() or 1, len(offices) or 1))
+    summaries = {}
+    if workers == 1:
+        for office in offices:
+            summaries[office["office"]] = summary = generate_office(office, months, output_dir, render_workers)
+            if report:
+                report(summary)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            futures = [pool.submit(generate_office, office, months, output_dir, render_workers) for office in offices]
+            for future in as_completed(futures):
+                summary = future.result()
+                summaries[summary["office"]] = summary
+                if report:
+                    report(summary)
+    return [summaries[office["office"]] for office in offices]
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera los reportes de varias oficinas (un archivo Excel por oficina) en paralelo")
+    parser.add_argument("paths", nargs='+', help="Archivos .xlsx o directorios con archivos .xlsx; plantilla propia con oficina.xlsx::plantilla.docx")
+    parser.add_argument("--months", default=None, help="Mes o meses a generar: 3, 1,2,3, 1-3 o year (por defecto el mes actual)")
+    parser.add_argument("--template", default=TEMPLATE_PATH, help="Plantilla Word de las oficinas que no indican una propia")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR, help="Directorio donde se crea una carpeta por oficina")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Oficinas procesadas al mismo tiempo")
+    parser.add_argument("--render-workers", type=int, default=1, help="Procesos de renderizado dentro de cada oficina")
+    args = parser.parse_args()
+
+    try:
+        months = resolve_months(args.months) if args.months else [None]
+    except GenerationError as e:
+        print(e, file=sys.stderr)
+        sys.exit(2)
+    offices = collect_workbooks(args.paths, args.template)
+    if not offices:
+        print("Error: No se encontraron archivos .xlsx para procesar", file=sys.stderr)
+        sys.exit(2)
+
+    # Un resumen JSON por línea conforme termina cada oficina
+    summaries = run_batch(offices, months, args.output_dir, args.workers, args.render_workers,
+                          report=lambda summary: print(json.dumps(summary, ensure_ascii=False), flush=True))
+    sys.exit(0 if all(summary["ok"] for summary in summaries) else 1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+# =====================================================================================================
+# Benchmark: generación de varias oficinas
+# Objetivo: Comparar el tiempo total de generar N oficinas (un archivo Excel sintético cada una) con
+#           una ejecución de consola por oficina, una tras otra ("secuencial"), contra una sola
+#           ejecución de batch_generator con un grupo de procesos ("batch").
+# Uso: python benchmarks/bench_batch.py --offices 20 --courses 300 --workers 4
+# =====================================================================================================
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_workbook import build_workbook
+
+# Una ejecución independiente por oficina, como se hacía antes en directorios separados
+SEQUENTIAL_CODE = """
+import os, sys
+sys.path.insert(0, {root!r})
+from generator import generate_reports
+excel_path, template_path, office_dir, month = sys.argv[1:5]
+generate_reports(month, excel_path, template_path, office_dir, os.path.join(office_dir, "reports_historial"))
+"""
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo total de varias oficinas: ejecuciones separadas contra batch_generator")
+    parser.add_argument("--offices", type=int, default=20, help="Número de oficinas (archivos Excel)")
+    parser.add_argument("--courses", type=int, default=300, help="Cursos por oficina")
+    parser.add_argument("--month", default="3", help="Mes a generar (1-12)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Procesos del batch")
+    parser.add_argument("--template", default=os.path.join(ROOT_DIR, "FORMATO_WORD.docx"), help="Plantilla Word")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_batch_")
+    try:
+        excel_dir = os.path.join(work_dir, "oficinas")
+        os.makedirs(excel_dir)
+        for i in range(args.offices):
+            build_workbook(os.path.join(excel_dir, f"oficina{i + 1:02d}.xlsx"), courses=args.courses, seed=i + 1)
+        print(f"{args.offices} oficinas de {args.courses} cursos, mes {args.month}, {os.cpu_count()} CPU")
+
+        start = time.perf_counter()
+        for f in sorted(os.listdir(excel_dir)):
+            office_dir = os.path.join(work_dir, "secuencial", os.path.splitext(f)[0])
+            os.makedirs(office_dir)
+            subprocess.run([sys.executable, "-c", SEQUENTIAL_CODE.format(root=ROOT_DIR), os.path.join(excel_dir, f), args.template, office_dir, args.month],
+                           check=True, stdout=subprocess.DEVNULL, cwd=work_dir)
+        sequential = time.perf_counter() - start
+        print(f"secuencial  {sequential:8.2f} s")
+
+        start = time.perf_counter()
+        subprocess.run([sys.executable, os.path.join(ROOT_DIR, "batch_generator.py"), excel_dir, "--months", args.month, "--template", args.template,
+                        "--output-dir", os.path.join(work_dir, "batch"), "--workers", str(args.workers)],
+                       check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, cwd=work_dir)
+        batch = time.perf_counter() - start
+        print(f"batch       {batch:8.2f} s  (workers={args.workers})  x{sequential / batch:.2f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
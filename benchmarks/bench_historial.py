@@ -0,0 +1,94 @@
+# =====================================================================================================
+# Benchmark: almacenamiento del historial
+# Objetivo: Construir un historial de varios años (un archivo Excel sintético por año, los 12 meses de
+#           cada uno) con documentos sueltos como se guardaban antes, pasarlo al almacén por contenido
+#           (HistorialStore.sync) y compactar los meses antiguos (HistorialStore.compact). Se reporta el
+#           espacio en disco antes y después, el tiempo de la compactación, del listado filtrado y de
+#           la lectura de un documento suelto contra uno archivado.
+# Uso: python benchmarks/bench_historial.py --years 3 --courses 200
+# =====================================================================================================
+import argparse
+import contextlib
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from synthetic_workbook import build_workbook
+from generator import generate_period_reports
+from historial_store import HistorialStore
+
+# Tiempo promedio en milisegundos de `fn` aplicada a cada elemento
+def average_ms(fn, items):
+    start = time.perf_counter()
+    for item in items:
+        fn(item)
+    return (time.perf_counter() - start) * 1000 / max(len(items), 1)
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+def main():
+    parser = argparse.ArgumentParser(description="Espacio y tiempos del historial: documentos sueltos contra almacén por contenido y archivos mensuales")
+    parser.add_argument("--years", type=int, default=3, help="Años de historial (uno por archivo Excel)")
+    parser.add_argument("--first-year", type=int, default=2022, help="Primer año del historial")
+    parser.add_argument("--courses", type=int, default=200, help="Cursos por año")
+    parser.add_argument("--after-months", type=int, default=3, help="Meses que un documento permanece suelto antes de compactarse")
+    parser.add_argument("--lookups", type=int, default=50, help="Documentos leídos para medir la lectura")
+    parser.add_argument("--template", default=os.path.join(ROOT_DIR, "FORMATO_WORD.docx"), help="Plantilla Word")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_historial_")
+    try:
+        legacy_dir = os.path.join(work_dir, "reports_historial")
+        os.makedirs(legacy_dir)
+        start = time.perf_counter()
+        for year in range(args.first_year, args.first_year + args.years):
+            excel_path = os.path.join(work_dir, f"{year}.xlsx")
+            year_dir = os.path.join(work_dir, f"historial_{year}")
+            build_workbook(excel_path, courses=args.courses, year=year, seed=year)
+            with contextlib.redirect_stdout(open(os.devnull, "w")):
+                generate_period_reports(list(range(1, 13)), excel_path, args.template, work_dir, year_dir)
+            # Se escriben como documentos sueltos, igual que el historial anterior al almacén por contenido
+            with HistorialStore(year_dir) as store:
+                for (name,) in store._conn.execute("SELECT nombre FROM documentos").fetchall():
+                    with open(os.path.join(legacy_dir, name), 'wb') as f:
+                        f.write(store.read(name))
+        documents = sum(1 for f in os.listdir(legacy_dir) if not f.startswith('.'))
+        legacy_size = directory_size(legacy_dir)
+        print(f"{documents} documentos de {args.years} años ({args.courses} cursos por año), construidos en {time.perf_counter() - start:.1f} s")
+        print(f"sueltos (antes)       {legacy_size / 1024 / 1024:8.2f} MB")
+
+        with HistorialStore(legacy_dir) as store:
+            start = time.perf_counter()
+            store.sync()
+            sync_time = time.perf_counter() - start
+            usage = store.blobs.disk_usage()
+            print(f"almacén por contenido {usage['loose'] / 1024 / 1024:8.2f} MB  (migración {sync_time:.2f} s)")
+
+            names = [name for (name,) in store._conn.execute("SELECT nombre FROM documentos")]
+            sample = random.Random(1).sample(names, min(args.lookups, len(names)))
+            loose_ms = average_ms(store.read, sample)
+
+            start = time.perf_counter()
+            stats = store.compact(args.after_months)
+            compact_time = time.perf_counter() - start
+            usage = store.blobs.disk_usage()
+            total = usage['loose'] + usage['archives']
+            print(f"compactado            {total / 1024 / 1024:8.2f} MB  ({stats['archives']} archivos, {stats['documents']} documentos en {compact_time:.2f} s)  x{legacy_size / max(total, 1):.1f} menos espacio")
+
+            archived_ms = average_ms(store.read, sample)
+            print(f"lectura suelto        {loose_ms:8.2f} ms por documento")
+            print(f"lectura archivado     {archived_ms:8.2f} ms por documento")
+            list_ms = average_ms(lambda month: store.list(page=2, per_page=50, month=month, course="A", sort="fecha_inicio"), list(range(1, 13)))
+            print(f"listado filtrado      {list_ms:8.2f} ms por consulta")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+# =====================================================================================================
+# Benchmark: generación en frío (subproceso) vs generación en caliente (dentro del proceso)
+# Objetivo: Comparar la latencia de la forma anterior de generar reportes (un nuevo intérprete de
+#           Python ejecutando generator.py en cada solicitud) contra la llamada directa al motor ya
+#           importado, como lo hace ahora app.py.
+# Uso: python benchmarks/bench_inprocess.py --excel ruta/al/archivo.xlsx --month 3 --runs 5
+# =====================================================================================================
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Directorio de historial vacío dentro del directorio de trabajo: la generación es incremental y con el
+# historial de la ejecución anterior no se construiría ningún documento
+def fresh_historial(work_dir):
+    return tempfile.mkdtemp(prefix="historial_", dir=work_dir)
+
+def main():
+    parser = argparse.ArgumentParser(description="Latencia en frío (subproceso) vs en caliente (en proceso)")
+    parser.add_argument("--excel", default=os.path.join(ROOT_DIR, "db_excel.xlsx"), help="Archivo Excel con las hojas P01 y PARTIP01")
+    parser.add_argument("--template", default=os.path.join(ROOT_DIR, "FORMATO_WORD.docx"), help="Plantilla Word")
+    parser.add_argument("--month", default="1", help="Mes a generar (1-12)")
+    parser.add_argument("--runs", type=int, default=5, help="Número de repeticiones por modo")
+    args = parser.parse_args()
+
+    # Se trabaja en un directorio temporal para no tocar el historial ni los ZIP del proyecto
+    work_dir = tempfile.mkdtemp(prefix="bench_inprocess_")
+    shutil.copy(args.excel, os.path.join(work_dir, "db_excel.xlsx"))
+    shutil.copy(args.template, os.path.join(work_dir, "FORMATO_WORD.docx"))
+    os.chdir(work_dir)
+
+    try:
+        # Modo frío: un intérprete nuevo por solicitud (comportamiento anterior de /generate)
+        cold = []
+        for _ in range(args.runs):
+            # generator.py usa reports_historial del directorio actual; se vacía antes de cada ejecución
+            shutil.rmtree(os.path.join(work_dir, "reports_historial"), ignore_errors=True)
+            start = time.perf_counter()
+            subprocess.run([sys.executable, os.path.join(ROOT_DIR, "generator.py"), args.month], capture_output=True, text=True, check=True)
+            cold.append(time.perf_counter() - start)
+
+        # Modo caliente: el motor se importa una sola vez y se llama directamente
+        sys.path.insert(0, ROOT_DIR)
+        import_start = time.perf_counter()
+        from generator import generate_reports
+        import_time = time.perf_counter() - import_start
+
+        warm = []
+        for _ in range(args.runs):
+            historial_dir = fresh_historial(work_dir)
+            start = time.perf_counter()
+            result = generate_reports(args.month, historial_dir=historial_dir)
+            warm.append(time.perf_counter() - start)
+
+        print(f"Documentos por ejecución: {result.total_docs_generated} (construidos {result.rendered}, reutilizados {result.reused})")
+        print(f"Importación única del motor: {import_time * 1000:.0f} ms")
+        print(f"Subproceso (frío):  mediana {statistics.median(cold) * 1000:.0f} ms  min {min(cold) * 1000:.0f} ms")
+        print(f"En proceso (caliente): mediana {statistics.median(warm) * 1000:.0f} ms  min {min(warm) * 1000:.0f} ms")
+        print(f"Aceleración (mediana): {statistics.median(cold) / statistics.median(warm):.1f}x")
+    finally:
+        os.chdir(ROOT_DIR)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+# =====================================================================================================
+# Benchmark: memoria de la carga del archivo Excel
+# Objetivo: Comparar el pico de memoria (RSS máximo) de un proceso que carga un archivo Excel grande y
+#           prepara los documentos de un mes, cargando todas las columnas como lo hacía pd.read_excel
+#           ("antes") contra la carga de excel_cache.read_sheets con solo las columnas necesarias y
+#           tipos compactos ("después"), tanto leyendo el Excel como leyendo el caché en disco (pickle),
+#           que es como cargan el archivo los procesos una vez interpretado. Cada medición se ejecuta
+#           en un proceso nuevo; también se reporta la memoria que ocupan los Dataframes. Por defecto
+#           se usa un archivo sintético.
+# Uso: python benchmarks/bench_memory.py --courses 5000 --participants 15 --month 3
+# =====================================================================================================
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_workbook import build_workbook
+
+# Código que se ejecuta en cada proceso de medición: carga las hojas, prepara el mes y reporta el RSS máximo
+MEASURE_CODE = """
+import json, resource, sys
+sys.path.insert(0, {root!r})
+import pandas as pd
+import excel_cache
+from generator import build_participant_index, build_document_jobs, GenerationResult
+
+mode, source, month = sys.argv[1], sys.argv[2], int(sys.argv[3])
+baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if source.endswith(".pkl"):
+    df_courses, df_participants = pd.read_pickle(source)
+elif mode == "antes":
+    sheets = pd.read_excel(source, sheet_name=[excel_cache.COURSES_SHEET, excel_cache.PARTICIPANTS_SHEET])
+    df_courses, df_participants = sheets[excel_cache.COURSES_SHEET], sheets[excel_cache.PARTICIPANTS_SHEET]
+else:
+    df_courses, df_participants = excel_cache.read_sheets(source)
+
+result = GenerationResult(month=month, month_name=str(month))
+df_filtered = df_courses.loc[df_courses['MES_PROGRAMADO'] == month]
+jobs = build_document_jobs(df_filtered, build_participant_index(df_participants, month), result)
+print(json.dumps({{
+    "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    "baseline_rss_mb": round(baseline / 1024, 1),
+    "frames_mb": round((df_courses.memory_usage(deep=True).sum() + df_participants.memory_usage(deep=True).sum()) / 1024 / 1024, 2),
+    "documents": len(jobs)
+}}))
+"""
+
+# Código que escribe el caché en disco (pickle) de cada forma de carga
+CACHE_CODE = """
+import os, sys
+sys.path.insert(0, {root!r})
+import pandas as pd
+import excel_cache
+excel_path, work_dir = sys.argv[1], sys.argv[2]
+sheets = pd.read_excel(excel_path, sheet_name=[excel_cache.COURSES_SHEET, excel_cache.PARTICIPANTS_SHEET])
+pd.to_pickle((sheets[excel_cache.COURSES_SHEET], sheets[excel_cache.PARTICIPANTS_SHEET]), os.path.join(work_dir, "antes.pkl"))
+pd.to_pickle(excel_cache.read_sheets(excel_path), os.path.join(work_dir, "despues.pkl"))
+"""
+
+def measure(mode, source, month):
+    output = subprocess.run([sys.executable, "-c", MEASURE_CODE.format(root=ROOT_DIR), mode, source, str(month)],
+                            capture_output=True, text=True, check=True, cwd=tempfile.gettempdir())
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Pico de memoria de la carga del Excel antes y después de compactar")
+    parser.add_argument("--excel", help="Archivo Excel a utilizar (por defecto se genera uno sintético)")
+    parser.add_argument("--courses", type=int, default=5000, help="Cursos del archivo sintético")
+    parser.add_argument("--participants", type=int, default=15, help="Participantes promedio por curso del archivo sintético")
+    parser.add_argument("--month", type=int, default=3, help="Mes a preparar (1-12)")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_memory_")
+    excel_path = args.excel or os.path.join(work_dir, "db_excel.xlsx")
+    try:
+        if not args.excel:
+            rows = build_workbook(excel_path, courses=args.courses, participants=args.participants)
+            print(f"Archivo sintético: {rows['courses']} cursos, {rows['participants']} registros de participantes")
+        results = {mode: measure(mode, excel_path, args.month) for mode in ("antes", "despues")}
+
+        # Cachés en disco con cada forma de carga. Se escriben en otro proceso: el RSS máximo se hereda a
+        # los procesos hijos y cargar aquí el Excel alteraría las mediciones siguientes.
+        subprocess.run([sys.executable, "-c", CACHE_CODE.format(root=ROOT_DIR), excel_path, work_dir], check=True)
+        for mode in ("antes", "despues"):
+            results[f"{mode}_cache"] = measure(mode, os.path.join(work_dir, f"{mode}.pkl"), args.month)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    for mode, data in results.items():
+        print(f"{mode:<14} RSS máximo {data['peak_rss_mb']:8.1f} MB (al iniciar {data['baseline_rss_mb']:.1f} MB)  Dataframes {data['frames_mb']:8.2f} MB  documentos {data['documents']}")
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
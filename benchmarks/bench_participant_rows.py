@@ -0,0 +1,55 @@
+# =====================================================================================================
+# Benchmark: construcción de las filas de la tabla de participantes
+# Objetivo: Comparar cuántas filas por segundo se agregan a la tabla de participantes con python-docx
+#           (add_participants: add_row, cell.text y estilos celda por celda) contra la clonación de la
+#           fila prototipo de la plantilla compilada, y verificar que ambas producen el mismo XML.
+# Uso: python benchmarks/bench_participant_rows.py --participants 10 --runs 200
+# =====================================================================================================
+import argparse
+import copy
+import os
+import statistics
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from lxml import etree
+from docx.table import Table
+from docx_template import CompiledTemplate, add_participants, _node_at
+
+def main():
+    parser = argparse.ArgumentParser(description="Filas por segundo de la tabla de participantes")
+    parser.add_argument("--template", default=os.path.join(ROOT_DIR, "FORMATO_WORD.docx"), help="Plantilla Word")
+    parser.add_argument("--participants", type=int, default=10, help="Participantes por documento (mínimo 10 filas)")
+    parser.add_argument("--runs", type=int, default=200, help="Tablas construidas por método")
+    args = parser.parse_args()
+
+    template = CompiledTemplate(args.template)
+    participants = [{"RPE": f"9A{i:03d}", "NOMBRE_COMPLETO": f"PERSONA {i} APELLIDO", "SEXO_TRAB": "MF"[i % 2]} for i in range(args.participants)]
+    pristine = _node_at(template._root, template._table_path)
+    rows = max(10, args.participants)
+
+    def python_docx(tbl):
+        add_participants(Table(tbl, None), participants)
+
+    def prototype(tbl):
+        template._add_participant_rows(tbl, participants)
+
+    results = {}
+    for name, fill in (("python-docx", python_docx), ("prototipo", prototype)):
+        times = []
+        for _ in range(args.runs):
+            tbl = copy.deepcopy(pristine)
+            start = time.perf_counter()
+            fill(tbl)
+            times.append(time.perf_counter() - start)
+        results[name] = (statistics.median(times), etree.tostring(tbl))
+        print(f"{name:<12} mediana {statistics.median(times) * 1000:7.2f} ms por tabla  {rows / statistics.median(times):9.0f} filas/s")
+
+    print(f"Aceleración (mediana): {results['python-docx'][0] / results['prototipo'][0]:.1f}x")
+    print(f"XML idéntico: {'sí' if results['python-docx'][1] == results['prototipo'][1] else 'NO'}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+# =====================================================================================================
+# Benchmark: vista previa contra generación
+# Objetivo: Comparar lo que cuesta obtener el resumen de un mes ejecutando la generación completa
+#           (construir los documentos y el ZIP) contra la vista previa (preview_reports), que solo usa
+#           las hojas ya interpretadas, y el tiempo del resumen de los 12 meses. El archivo Excel se
+#           interpreta una vez antes de medir, igual que en el servidor después de subirlo.
+# Uso: python benchmarks/bench_preview.py --courses 600 --month 3
+# =====================================================================================================
+import argparse
+import contextlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from synthetic_workbook import build_workbook
+from excel_cache import load_frames
+from generator import generate_reports, preview_reports
+
+def best_ms(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo de la vista previa de un mes y del año contra la generación completa")
+    parser.add_argument("--courses", type=int, default=600, help="Cursos del archivo sintético")
+    parser.add_argument("--month", type=int, default=3, help="Mes a comparar (1-12)")
+    parser.add_argument("--repeat", type=int, default=20, help="Repeticiones de la vista previa (se reporta la mejor)")
+    parser.add_argument("--template", default=os.path.join(ROOT_DIR, "FORMATO_WORD.docx"), help="Plantilla Word")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_preview_")
+    try:
+        excel_path = os.path.join(work_dir, "datos.xlsx")
+        build_workbook(excel_path, courses=args.courses)
+        load_frames(excel_path, os.path.join(work_dir, "cache"))
+        historial_dir = os.path.join(work_dir, "historial")
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(open(os.devnull, "w")):
+            result = generate_reports(args.month, excel_path, args.template, work_dir, historial_dir)
+        generate_ms = (time.perf_counter() - start) * 1000
+        zip_bytes = os.path.getsize(result.zip_path)
+
+        preview = preview_reports(args.month, excel_path, historial_dir)
+        month_ms = best_ms(lambda: preview_reports(args.month, excel_path, historial_dir), args.repeat)
+        year_ms = best_ms(lambda: preview_reports("year", excel_path, historial_dir), args.repeat)
+
+        print(f"{args.courses} cursos, mes {args.month}: {result.total_docs_generated} documentos (vista previa: {preview['total_docs']})")
+        print(f"generación completa   {generate_ms:9.1f} ms  ZIP {zip_bytes / 1024 / 1024:.2f} MB")
+        print(f"vista previa del mes  {month_ms:9.1f} ms  ZIP estimado {preview['estimated_bytes'] / 1024 / 1024:.2f} MB")
+        print(f"vista previa del año  {year_ms:9.1f} ms")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+# =====================================================================================================
+# Benchmark: etapas de la generación de reportes
+# Objetivo: Medir por separado cada etapa de la generación sobre un archivo Excel sintético (o uno
+#           indicado): lectura del Excel (en frío y desde el caché), filtrado y agrupación de
+#           participantes, construcción de cada documento, guardado en el historial, empaquetado ZIP
+#           y la solicitud completa a /generate a través del cliente de pruebas de Flask. Los
+#           resultados se escriben en JSON para comparar ejecuciones a lo largo del tiempo.
+#           Todo se ejecuta en un directorio temporal y sin conexión.
+# Uso: python benchmarks/bench_stages.py --courses 300 --month 3 --runs 3 --output resultados.json
+# =====================================================================================================
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import zipfile
+from datetime import datetime
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from synthetic_workbook import build_workbook
+
+#=================================================================================================
+# Función: measure
+# Objetivo: Ejecutar `func` el número de veces indicado y devolver las estadísticas en milisegundos
+#           junto con el último valor devuelto.
+#=================================================================================================
+def measure(func, runs):
+    times, value = [], None
+    for _ in range(runs):
+        start = time.perf_counter()
+        value = func()
+        times.append((time.perf_counter() - start) * 1000)
+    stats = {
+        "runs": runs,
+        "median_ms": round(statistics.median(times), 3),
+        "min_ms": round(min(times), 3),
+        "max_ms": round(max(times), 3)
+    }
+    return stats, value
+
+#=================================================================================================
+# Función: bench_engine
+# Objetivo: Medir las etapas del motor de generación dentro del proceso.
+#=================================================================================================
+def bench_engine(work_dir, month, runs):
+    import excel_cache
+    from generator import prepare_generation
+    from docx_template import CompiledTemplate
+
+    excel_path = os.path.join(work_dir, "db_excel.xlsx")
+    template_path = os.path.join(work_dir, "FORMATO_WORD.docx")
+    cache_dir = os.path.join(work_dir, ".excel_cache")
+    stages = {}
+
+    # Lectura del Excel con openpyxl (sin caché)
+    stages["excel_load_cold"], _ = measure(lambda: excel_cache.read_sheets(excel_path), runs)
+
+    # Lectura desde el caché en disco (se vacía el caché en memoria en cada repetición)
+    excel_cache.load_frames(excel_path, cache_dir)
+    def load_from_disk_cache():
+        excel_cache._frames_in_memory.clear()
+        return excel_cache.load_frames(excel_path, cache_dir)
+    stages["excel_load_cache"], _ = measure(load_from_disk_cache, runs)
+    excel_cache.load_frames(excel_path)
+
+    # Filtrado del mes, índice de participantes y lista de documentos (con el Excel ya en memoria)
+    stages["filter_and_index"], (result, jobs) = measure(lambda: prepare_generation(month, excel_path, template_path), runs)
+    stages["filter_and_index"].update({"courses": result.total_courses, "documents": len(jobs)})
+    if not jobs:
+        return stages
+
+    # Construcción de cada documento con la plantilla compilada
+    compile_stats, template = measure(lambda: CompiledTemplate(template_path), 1)
+    stages["template_compile"] = compile_stats
+    per_doc = []
+    documents = []
+    for _ in range(runs):
+        documents = []
+        for job in jobs:
+            start = time.perf_counter()
+            documents.append((job.file_name, template.render(job.values, job.participants)))
+            per_doc.append((time.perf_counter() - start) * 1000)
+    stages["render_document"] = {
+        "runs": runs,
+        "documents": len(jobs),
+        "median_ms": round(statistics.median(per_doc), 3),
+        "min_ms": round(min(per_doc), 3),
+        "max_ms": round(max(per_doc), 3),
+        "docs_per_second": round(1000 / statistics.mean(per_doc), 1)
+    }
+
+    # Guardado de los documentos en el historial
+    save_dir = os.path.join(work_dir, "bench_save")
+    os.makedirs(save_dir, exist_ok=True)
+    def save_documents():
+        for name, content in documents:
+            with open(os.path.join(save_dir, name), 'wb') as f:
+                f.write(content)
+    stages["save_documents"], _ = measure(save_documents, runs)
+    stages["save_documents"]["bytes"] = sum(len(content) for _, content in documents)
+
+    # Empaquetado de los documentos en el ZIP (en memoria para no medir el disco dos veces)
+    def build_zip():
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+            for name, content in documents:
+                zf.writestr(name, content)
+        return buffer.getbuffer().nbytes
+    stages["zip"], zip_size = measure(build_zip, runs)
+    stages["zip"]["bytes"] = zip_size
+    return stages
+
+#=================================================================================================
+# Función: bench_endpoint
+# Objetivo: Medir /generate de principio a fin con el cliente de pruebas de Flask: solicitud,
+#           espera del trabajo en segundo plano y descarga del ZIP. En frío cada repetición parte de
+#           un historial y un caché de resultados vacíos; después se mide la respuesta desde el caché.
+#=================================================================================================
+def bench_endpoint(work_dir, month, runs):
+    import app as app_module
+    client = app_module.app.test_client()
+
+    def generate():
+        response = client.post('/generate', json={"month": month})
+        data = response.get_json()
+        if "summary" not in data:
+            while True:
+                status = client.get(f"/jobs/{data['job_id']}").get_json()
+                if status["state"] in ("done", "error"):
+                    break
+                time.sleep(0.01)
+            if status["state"] == "error":
+                raise RuntimeError(status["details"])
+            data = status
+        download = client.get(data["summary"]["download_url"])
+        return len(download.data)
+
+    def generate_cold():
+        app_module.result_cache.clear()
+        client.post('/clean_historial')
+        return generate()
+
+    stages = {}
+    stages["generate_endpoint_cold"], size = measure(generate_cold, runs)
+    stages["generate_endpoint_cold"]["bytes"] = size
+    stages["generate_endpoint_cached"], _ = measure(generate, runs)
+    return stages
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempos de cada etapa de la generación de reportes en JSON")
+    parser.add_argument("--excel", help="Archivo Excel a utilizar (por defecto se genera uno sintético)")
+    parser.add_argument("--template", default=os.path.join(ROOT_DIR, "FORMATO_WORD.docx"), help="Plantilla Word")
+    parser.add_argument("--courses", type=int, default=300, help="Cursos del archivo sintético")
+    parser.add_argument("--participants", type=int, default=12, help="Participantes promedio por curso del archivo sintético")
+    parser.add_argument("--duplicate-rate", type=float, default=0.05, help="Fracción de participantes duplicados del archivo sintético")
+    parser.add_argument("--month", type=int, default=3, help="Mes a generar (1-12)")
+    parser.add_argument("--runs", type=int, default=3, help="Repeticiones por etapa")
+    parser.add_argument("--skip-endpoint", action="store_true", help="No medir /generate con el cliente de Flask")
+    parser.add_argument("--output", help="Archivo JSON de salida (por defecto se imprime en consola)")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_stages_")
+    excel_path = os.path.join(work_dir, "db_excel.xlsx")
+    if args.excel:
+        shutil.copy(args.excel, excel_path)
+        workbook = {"source": os.path.abspath(args.excel)}
+    else:
+        workbook = {"source": "synthetic", "courses": args.courses, "participants_per_course": args.participants, "duplicate_rate": args.duplicate_rate}
+        workbook["rows"] = build_workbook(excel_path, courses=args.courses, participants=args.participants, duplicate_rate=args.duplicate_rate)
+    shutil.copy(args.template, os.path.join(work_dir, "FORMATO_WORD.docx"))
+    output = os.path.abspath(args.output) if args.output else None
+
+    # La aplicación y el motor usan rutas relativas al directorio de trabajo
+    os.chdir(work_dir)
+    try:
+        stages = bench_engine(work_dir, args.month, args.runs)
+        if not args.skip_endpoint:
+            stages.update(bench_endpoint(work_dir, args.month, args.runs))
+    finally:
+        os.chdir(ROOT_DIR)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "month": args.month,
+        "workbook": workbook,
+        "stages": stages
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    print(text)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+# =====================================================================================================
+# Benchmark: escalamiento del renderizado en paralelo
+# Objetivo: Medir cuántos documentos por segundo se generan para un mes al variar el número de
+#           procesos de renderizado (parámetro workers de generate_reports) de 1 a N.
+# Uso: python benchmarks/bench_workers.py --excel ruta/al/archivo.xlsx --month 3 --max-workers 8
+# =====================================================================================================
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from generator import generate_reports
+
+# Directorio de historial vacío dentro del directorio de trabajo
+def fresh_historial(work_dir):
+    return tempfile.mkdtemp(prefix="historial_", dir=work_dir)
+
+def main():
+    parser = argparse.ArgumentParser(description="Documentos por segundo según el número de procesos")
+    parser.add_argument("--excel", default=os.path.join(ROOT_DIR, "db_excel.xlsx"), help="Archivo Excel con las hojas P01 y PARTIP01")
+    parser.add_argument("--template", default=os.path.join(ROOT_DIR, "FORMATO_WORD.docx"), help="Plantilla Word")
+    parser.add_argument("--month", default="1", help="Mes a generar (1-12)")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1, help="Número máximo de procesos a probar")
+    parser.add_argument("--runs", type=int, default=3, help="Repeticiones por configuración")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_workers_")
+    try:
+        baseline = None
+        for workers in range(1, args.max_workers + 1):
+            # Ejecución de calentamiento: crea los procesos y compila la plantilla en cada uno
+            generate_reports(args.month, args.excel, args.template, work_dir, fresh_historial(work_dir), workers=workers)
+            times = []
+            for _ in range(args.runs):
+                # Historial vacío en cada repetición para medir la construcción y no la reutilización de documentos
+                historial_dir = fresh_historial(work_dir)
+                start = time.perf_counter()
+                result = generate_reports(args.month, args.excel, args.template, work_dir, historial_dir, workers=workers)
+                times.append(time.perf_counter() - start)
+            elapsed = statistics.median(times)
+            throughput = result.total_docs_generated / elapsed
+            baseline = baseline or throughput
+            print(f"workers={workers:<3} docs={result.total_docs_generated:<5} mediana={elapsed * 1000:8.0f} ms  {throughput:8.1f} docs/s  x{throughput / baseline:.2f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+# =====================================================================================================
+# Utilidad: generador de archivos Excel sintéticos con el formato de CFE
+# Objetivo: Construir un archivo Excel con las hojas P01 (cursos) y PARTIP01 (participantes) y las
+#           columnas que utiliza el generador, a la escala que se indique (cursos, participantes por
+#           curso, meses, tasa de participantes duplicados y de cursos sin participantes). Los datos son
+#           reproducibles a partir de la semilla, así que dos ejecuciones con los mismos parámetros
+#           producen el mismo contenido. Se utiliza en los benchmarks y funciona sin conexión.
+# Uso: python benchmarks/synthetic_workbook.py salida.xlsx --courses 500 --participants 15 --months 12
+# =====================================================================================================
+import argparse
+import random
+from datetime import datetime, timedelta
+from openpyxl import Workbook
+
+# Columnas de cada hoja: primero las que utiliza el generador y después columnas adicionales que
+# suelen venir en el archivo de CFE (el generador no las usa, pero sí se leen al cargar el archivo)
+COURSE_COLUMNS = ['ID_CURSO', 'NOMBRE_CURSO', 'MES_PROGRAMADO', 'FECHA_INICIO', 'FECHA_TERMINO', 'ID_ACTIVIDAD']
+PARTICIPANT_COLUMNS = ['ID_CURSO', 'MES_PROGRAMADO', 'FECHA_INICIO', 'FECHA_TERMINO', 'ID_ACTIVIDAD', 'RPE', 'NOMBRE_COMPLETO', 'SEXO_TRAB']
+EXTRA_COLUMNS = ['INSTRUCTOR', 'SEDE', 'AREA', 'DURACION_HRS', 'MODALIDAD', 'OBSERVACIONES']
+
+COURSE_NAMES = ['SEGURIDAD BASICA', 'PRIMEROS AUXILIOS', 'TRABAJOS EN ALTURA', 'LINEAS ENERGIZADAS', 'MANEJO DEFENSIVO',
+                'ATENCION AL CLIENTE', 'MEDICION/FACTURACION', 'REDES DE DISTRIBUCION', 'CALIDAD DE LA ENERGIA', 'ETICA LABORAL']
+FIRST_NAMES = ['JUAN', 'MARIA', 'JOSE', 'ANA', 'LUIS', 'GUADALUPE', 'CARLOS', 'LAURA', 'MIGUEL', 'ROSA', 'JORGE', 'PATRICIA']
+LAST_NAMES = ['HERNANDEZ', 'GARCIA', 'MARTINEZ', 'LOPEZ', 'GONZALEZ', 'PEREZ', 'RODRIGUEZ', 'SANCHEZ', 'RAMIREZ', 'CRUZ', 'FLORES', 'GOMEZ']
+
+#=================================================================================================
+# Función: build_workbook
+# Objetivo: Escribir el archivo Excel sintético en `path`. Cada curso tiene en promedio
+#           `participants` participantes (entre la mitad y una vez y media), `duplicate_rate` es la
+#           fracción de registros de participantes repetidos y `empty_rate` la fracción de cursos sin
+#           participantes. `extra_columns` agrega columnas que el generador no utiliza. Devuelve el
+#           número de filas de cada hoja.
+#=================================================================================================
+def build_workbook(path, courses=200, participants=12, months=12, duplicate_rate=0.05, empty_rate=0.1, extra_columns=len(EXTRA_COLUMNS), year=2025, seed=1):
+    rng = random.Random(seed)
+    extras = EXTRA_COLUMNS[:extra_columns]
+
+    # Modo de solo escritura: las filas se escriben directamente sin mantener la hoja en memoria
+    wb = Workbook(write_only=True)
+    ws_courses = wb.create_sheet('P01')
+    ws_participants = wb.create_sheet('PARTIP01')
+    ws_courses.append(COURSE_COLUMNS + extras)
+    ws_participants.append(PARTICIPANT_COLUMNS + extras)
+
+    course_rows = participant_rows = 0
+    for i in range(courses):
+        month = 1 + i % months
+        start = datetime(year, month, rng.randint(1, 20))
+        end = start + timedelta(days=rng.randint(0, 4))
+        course_id = 1000 + i % 150 # Los identificadores de curso se repiten entre meses, como en el archivo real
+        activity = 50000 + i
+        extra_values = [_extra_value(rng, column) for column in extras]
+        ws_courses.append([course_id, f"{COURSE_NAMES[i % len(COURSE_NAMES)]} {i // len(COURSE_NAMES)}", month, start, end, activity] + extra_values)
+        course_rows += 1
+
+        if rng.random() < empty_rate:
+            continue
+        count = rng.randint(max(1, participants // 2), max(1, participants * 3 // 2))
+        for j in range(count):
+            row = [course_id, month, start, end, activity, _rpe(rng),
+                   f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {rng.choice(LAST_NAMES)}", rng.choice('MF')] + extra_values
+            ws_participants.append(row)
+            participant_rows += 1
+            # Registro duplicado (mismo RPE y nombre), el generador debe descartarlo
+            if rng.random() < duplicate_rate:
+                ws_participants.append(row)
+                participant_rows += 1
+
+    wb.save(path)
+    return {"courses": course_rows, "participants": participant_rows}
+
+# RPE del trabajador: 5 caracteres alfanuméricos (con al menos una letra, como en el archivo real)
+def _rpe(rng):
+    return f"{rng.randint(1, 9)}{rng.choice('ABCDEFGHJKLMNPRSTUVWXYZ')}{rng.randint(100, 999)}"
+
+# Valor de una columna adicional
+def _extra_value(rng, column):
+    if column == 'DURACION_HRS':
+        return rng.choice([4, 8, 16, 24, 40])
+    if column == 'MODALIDAD':
+        return rng.choice(['PRESENCIAL', 'EN LINEA', 'MIXTA'])
+    return f"{column} {rng.randint(1, 30)}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera un archivo Excel sintético con las hojas P01 y PARTIP01")
+    parser.add_argument("output", help="Ruta del archivo .xlsx a generar")
+    parser.add_argument("--courses", type=int, default=200, help="Número de cursos")
+    parser.add_argument("--participants", type=int, default=12, help="Participantes promedio por curso")
+    parser.add_argument("--months", type=int, default=12, help="Número de meses entre los que se reparten los cursos (1-12)")
+    parser.add_argument("--duplicate-rate", type=float, default=0.05, help="Fracción de registros de participantes duplicados")
+    parser.add_argument("--empty-rate", type=float, default=0.1, help="Fracción de cursos sin participantes")
+    parser.add_argument("--extra-columns", type=int, default=len(EXTRA_COLUMNS), help="Columnas adicionales que el generador no utiliza")
+    parser.add_argument("--seed", type=int, default=1, help="Semilla de los datos aleatorios")
+    args = parser.parse_args()
+
+    rows = build_workbook(args.output, args.courses, args.participants, max(1, min(args.months, 12)), args.duplicate_rate, args.empty_rate, args.extra_columns, seed=args.seed)
+    print(f"{args.output}: {rows['courses']} cursos, {rows['participants']} registros de participantes")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,255 @@
+import os # Manejo de rutas y archivos
+import io # Buffers en memoria para construir los documentos sin pasar por disco
+import copy # Clonación del árbol XML de la plantilla
+import threading # Protección del caché de plantillas compiladas entre hilos del servidor
+import zipfile # Lectura de las partes de la plantilla y escritura del documento final (.docx es un ZIP)
+from docx import Document # Se trabaja con la manipulación de documentos Word
+from docx.shared import Pt # Definición de tamaños en puntos para fuentes
+from docx.enum.text import WD_PARAGRAPH_ALIGNMENT # Alineación de parrafos
+from docx.oxml.ns import qn # Manejo de nombres de espacio en XML para compatibilidad en word
+from docx.opc.oxml import serialize_part_xml # Serialización del XML tal como lo guarda python-docx
+from docx.table import Table # Envoltura de la tabla de participantes del documento clonado
+from docx.text.run import Run # Envoltura de los fragmentos de texto (run) que contienen marcadores
+import metrics # Tiempos por etapa y contadores del caché de plantillas
+
+# Marcadores de la plantilla Word, en el orden en que se reemplazan
+MARKS = ("[NOMBRE_CURSO]", "[FECHA_INICIO]", "[FECHA_TERMINO]")
+
+# Filas mínimas de la tabla de participantes y celdas que se llenan en cada fila (No., RPE, nombre, M, F)
+MIN_PARTICIPANT_ROWS = 10
+PARTICIPANT_CELLS = 5
+
+# Caché de plantillas compiladas por ruta (se invalida si el archivo cambia)
+_compiled_templates = {}
+_lock = threading.Lock()
+
+TEMPLATE_CACHE = metrics.counter("template_cache_requests_total", "Solicitudes de la plantilla Word compilada por resultado (hit o miss)", ("result",))
+
+#=================================================================================================
+# Función: apply_styles
+# Objetivo: Aplicar estilos predefinidos a un fragmento de texto (run) dentro del documento word.
+#=================================================================================================
+def apply_styles(run, font_size=9):
+    run.font.name = 'Arial' # Fuente del texto
+    run.font.size = Pt(font_size) # Tamaño del texto en puntos
+    run.font.bold = True # Texto en negritas activado
+    r = run._element
+    # Se establece la fuente para la compatibilidad con versiones de Word que usan codificación diferente para ciertos idiomas
+    r.rPr.rFonts.set(qn('w:eastAsia'), 'Arial')
+
+#=======================================================================================================
+# Función: participant_rows
+# Objetivo: Devolver los textos de cada fila de la tabla de participantes (índice, RPE, nombre completo,
+#           marca de sexo masculino y femenino), con al menos 10 filas aunque haya menos participantes.
+#=======================================================================================================
+def participant_rows(participants):
+    num_participants = len(participants) # Número total de participantes a agregar
+    total_rows = max(MIN_PARTICIPANT_ROWS, num_participants) # Asegura al menos 10 filas, incluso si hay menos participantes
+
+    for idx in range(total_rows):
+        if idx < num_participants:
+            participant = participants[idx]
+            # Se preparan los datos: Índice, RPE y nombre completo del participante
+            data = [str(idx + 1), participant['RPE'], participant['NOMBRE_COMPLETO']]
+            # Se obtiene el dato del sexo, si está presente
+            sex = participant.get('SEXO_TRAB', '')
+            # Dependiendo del valor de 'SEXO_TRAB', se marca la celda correspondiente
+            if sex == 'M':
+                data.append('X') # Celda del sexo masculino
+                data.append('') # Celda del sexo femenino vacía
+            elif sex == 'F':
+                data.append('') # Celda del sexo masculino vacía
+                data.append('X') # Celda del sexo femenino
+            else:
+                data.append('')
+                data.append('') # Datos vacíos si no hay información
+        else:
+            data = [''] * PARTICIPANT_CELLS # Filas vacías de relleno si no existen más participantes
+        yield data
+
+#=======================================================================================================
+# Función: add_participants
+# Objetivo: Agregar los datos de los participantes a la tabla de participantes del documento Word
+#           mediante python-docx (una fila y un estilo a la vez). Los reportes se construyen con
+#           CompiledTemplate, que clona una fila prototipo con el mismo resultado; esta función se
+#           conserva como referencia y para el benchmark de filas.
+#=======================================================================================================
+def add_participants(table, participants):
+    # Se itera para crear filas en la tabla
+    for data in participant_rows(participants):
+        # Se agrega una nueva fila a la tabla
+        new_row = table.add_row()
+
+        # Se recorre cada dato y se coloca en la celda correspondiente
+        for i, text in enumerate(data):
+            # Se coloca cada dato correspondiente en su respectiva celda
+            cell = new_row.cells[i]
+            cell.text = text
+            # Se accede al parrafo dentro de la celda actual
+            paragraph = cell.paragraphs[0]
+            # Se aplica la justificación al centro para el texto
+            paragraph.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
+            # Se aplican los estilos con un tamaño de fuente reducido para ajustarse al formato de la tabla
+            if paragraph.runs:
+                apply_styles(paragraph.runs[0], font_size=7.5)
+
+#=======================================================================================================
+# Clase: CompiledTemplate
+# Objetivo: Plantilla Word interpretada una sola vez. Al compilarla se localizan los nodos XML que
+#           contienen cada marcador y la tabla de participantes (la tercera del documento), se les
+#           aplican los estilos y se guarda el árbol resultante como copia prístina junto con el resto
+#           de las partes del .docx. Cada reporte se obtiene clonando el árbol, escribiendo directamente
+#           en los nodos ya localizados y serializando, sin volver a abrir ni recorrer la plantilla.
+#           Las filas de participantes se obtienen clonando una fila prototipo ya centrada y con estilo
+#           (Arial 7.5 negritas), de modo que por cada fila solo se escribe el texto de sus celdas.
+#=======================================================================================================
+class CompiledTemplate:
+    def __init__(self, template_path):
+        doc = Document(template_path)
+        self._root = doc.element
+        self._document_part = doc.part.partname.lstrip('/')
+        self._mark_runs = [] # (ruta del run, texto original con marcadores)
+        self._located = set()
+
+        # Se localizan los marcadores con el mismo recorrido que se hacía en cada reporte:
+        # párrafos del cuerpo y celdas de las tablas del cuerpo
+        for paragraph in doc.paragraphs:
+            self._locate_runs(paragraph)
+        for table in doc.tables:
+            for row in table.rows:
+                for cell in row.cells:
+                    if any(mark in cell.text for mark in MARKS):
+                        for paragraph in cell.paragraphs:
+                            self._locate_runs(paragraph)
+                        # Se justifica el texto de la celda al centro
+                        paragraph.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
+
+        # Se asume que la tabla de los participantes es la tercera del documento
+        if len(doc.tables) < 3:
+            raise IndexError("Error: No se encontró la tabla esperada de los participantes, revisar el formato Word")
+        self._table_path = _node_path(doc.tables[2]._tbl)
+        self._build_row_prototype(doc.tables[2]._tbl)
+
+        # Se conservan las demás partes del .docx tal como vienen en la plantilla
+        with zipfile.ZipFile(template_path) as zf:
+            self._parts = [(zipfile.ZipInfo(info.filename, date_time=info.date_time), zf.read(info)) for info in zf.infolist()]
+
+    #=================================================================================================
+    # Método: _locate_runs
+    # Objetivo: Registrar los runs de un párrafo que contienen algún marcador y aplicarles los estilos
+    #           (los estilos no dependen del texto, así que se aplican una sola vez en la plantilla).
+    #=================================================================================================
+    def _locate_runs(self, paragraph):
+        for run in paragraph.runs:
+            text = run.text
+            path = _node_path(run._r)
+            # Las celdas combinadas aparecen varias veces en la fila, cada run se registra una sola vez
+            if path not in self._located and any(mark in text for mark in MARKS):
+                apply_styles(run)
+                self._located.add(path)
+                self._mark_runs.append((path, text))
+
+    #=================================================================================================
+    # Método: _build_row_prototype
+    # Objetivo: Construir la fila prototipo de la tabla de participantes con el mismo procedimiento de
+    #           add_participants (sobre una copia de la tabla) y registrar la posición del run de cada
+    #           celda dentro de la fila.
+    #=================================================================================================
+    def _build_row_prototype(self, tbl):
+        scratch = copy.deepcopy(tbl)
+        if len(scratch.tblGrid.gridCol_lst) < PARTICIPANT_CELLS:
+            raise IndexError("Error: La tabla de los participantes no tiene las columnas esperadas, revisar el formato Word")
+        add_participants(Table(scratch, None), [])
+        self._row_prototype = scratch.tr_lst[-1]
+        scratch.remove(self._row_prototype)
+        self._row_run_paths = [_node_path(tc.p_lst[0].r_lst[0], self._row_prototype) for tc in self._row_prototype.tc_lst[:PARTICIPANT_CELLS]]
+
+    #=================================================================================================
+    # Método: _add_participant_rows
+    # Objetivo: Agregar las filas de participantes al final de la tabla clonando la fila prototipo y
+    #           escribiendo solo el texto de cada celda.
+    #=================================================================================================
+    def _add_participant_rows(self, tbl, participants):
+        prototype, run_paths = self._row_prototype, self._row_run_paths
+        for data in participant_rows(participants):
+            tr = copy.deepcopy(prototype)
+            for path, text in zip(run_paths, data):
+                if text:
+                    _node_at(tr, path).text = text
+            tbl.append(tr)
+
+    #=================================================================================================
+    # Método: render
+    # Objetivo: Construir un reporte con los datos del curso (valores en el orden de MARKS) y los
+    #           participantes del lote. Devuelve el contenido del .docx en bytes. Si se recibe el
+    #           diccionario `timings` se le suma la duración de cada etapa (ver metrics.timed).
+    #=================================================================================================
+    def render(self, values, participants, timings=None):
+        with metrics.timed(timings, "marker_replacement"):
+            root = copy.deepcopy(self._root)
+            for path, text in self._mark_runs:
+                for mark, value in zip(MARKS, values):
+                    text = text.replace(mark, str(value))
+                Run(_node_at(root, path), None).text = text
+
+        with metrics.timed(timings, "participant_table"):
+            self._add_participant_rows(_node_at(root, self._table_path), participants)
+
+        with metrics.timed(timings, "docx_packaging"):
+            document_xml = serialize_part_xml(root)
+            buffer = io.BytesIO()
+            with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+                # Se conservan las fechas de la plantilla para que el mismo contenido produzca los mismos bytes
+                for info, data in self._parts:
+                    zf.writestr(info, document_xml if info.filename == self._document_part else data, zipfile.ZIP_DEFLATED)
+        return buffer.getvalue()
+
+#=======================================================================================================
+# Función: get_compiled_template
+# Objetivo: Devolver la plantilla compilada de la ruta indicada, compilándola solo la primera vez o
+#           cuando el archivo de la plantilla cambió.
+#=======================================================================================================
+def get_compiled_template(template_path):
+    stat = os.stat(template_path)
+    key = os.path.abspath(template_path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    with _lock:
+        cached = _compiled_templates.get(key)
+        if cached and cached[0] == version:
+            TEMPLATE_CACHE.inc(result="hit")
+            return cached[1]
+        TEMPLATE_CACHE.inc(result="miss")
+        template = CompiledTemplate(template_path)
+        _compiled_templates[key] = (version, template)
+        return template
+
+#=======================================================================================================
+# Función: render_batch
+# Objetivo: Construir un reporte con la plantilla compilada de la ruta indicada. Es la tarea que se
+#           envía a los procesos de renderizado en paralelo (cada proceso compila la plantilla una vez),
+#           por eso en lugar de lanzar excepciones devuelve la pareja (contenido, error).
+#=======================================================================================================
+def render_batch(template_path, values, participants, timings=None):
+    try:
+        return get_compiled_template(template_path).render(values, participants, timings), None
+    except Exception as e:
+        return None, str(e)
+
+#=======================================================================================================
+# Funciones auxiliares: _node_path / _node_at
+# Objetivo: Guardar la posición de un nodo como la lista de índices desde la raíz del documento (o desde
+#           el ancestro indicado) y recuperarlo en cualquier clon del árbol.
+#=======================================================================================================
+def _node_path(node, root=None):
+    path = []
+    parent = node.getparent()
+    while parent is not None and node is not root:
+        path.append(parent.index(node))
+        node, parent = parent, parent.getparent()
+    return tuple(reversed(path))
+
+def _node_at(root, path):
+    node = root
+    for i in path:
+        node = node[i]
+    return node
@@ -0,0 +1,222 @@
+import os # Manejo de rutas y del archivo de eventos
+import json # Formato de cada evento
+import time # Intervalo de lectura del archivo y mensajes de mantenimiento de la conexión
+import queue # Cola de eventos pendientes de cada conexión
+import threading # Hilo que lee el archivo de eventos y protección de las suscripciones
+
+# Directorio y archivo donde los workers publican los eventos (una línea JSON por evento)
+EVENTS_DIR = os.path.join(os.getcwd(), "events")
+LOG_FILE = "events.log"
+# Tamaño a partir del cual el archivo se rota (se conserva solo el anterior como events.log.1)
+MAX_LOG_BYTES = 4 * 1024 * 1024
+# Segundos después de los cuales el bloqueo de la rotación se considera abandonado
+ROTATE_LOCK_SECONDS = 30
+# Segundos entre lecturas del archivo (latencia máxima de un evento publicado por otro worker)
+POLL_INTERVAL = 0.25
+# Eventos pendientes por conexión; si un cliente no los consume se le pide recargar en lugar de acumularlos
+QUEUE_SIZE = 1000
+# Segundos entre mensajes de mantenimiento (comentarios SSE) para que los proxies no cierren la conexión
+HEARTBEAT_INTERVAL = 15
+# Duración máxima de una conexión; el navegador se reconecta solo y continúa desde el último evento
+STREAM_MAX_SECONDS = 300
+
+#=================================================================================================
+# Clase: EventBus
+# Objetivo: Publicación y suscripción de eventos entre los workers de gunicorn sin un servidor
+#           externo. Cada worker agrega sus eventos al final de un archivo compartido y un solo hilo
+#           por worker lo lee y reparte cada evento a las conexiones (/events) de ese worker. El
+#           identificador de cada evento es su posición en el archivo, así que un cliente que se
+#           reconecta (Last-Event-ID) recibe los eventos que se perdió; si ya no están disponibles
+#           recibe un evento "reset" para recargar los datos completos.
+#=================================================================================================
+class EventBus:
+    def __init__(self, events_dir=EVENTS_DIR):
+        self.events_dir = events_dir
+        self.log_path = os.path.join(events_dir, LOG_FILE)
+        os.makedirs(events_dir, exist_ok=True)
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._file = None
+        self._inode = None
+        self._position = 0
+
+    #=============================================================================================
+    # Método: publish
+    # Objetivo: Agregar un evento al archivo compartido. Cada evento se escribe en una sola
+    #           operación en modo "append", así las líneas de varios workers nunca se mezclan.
+    #=============================================================================================
+    def publish(self, event_type, data):
+        line = json.dumps({"type": event_type, "data": data, "time": time.time()}, ensure_ascii=False, default=str) + "\n"
+        try:
+            if os.path.getsize(self.log_path) > MAX_LOG_BYTES:
+                self._rotate()
+        except OSError:
+            pass
+        with open(self.log_path, 'ab') as f:
+            f.write(line.encode('utf-8'))
+
+    #=============================================================================================
+    # Método: _rotate
+    # Objetivo: Mover el archivo a events.log.1 cuando pasa de MAX_LOG_BYTES. Varios workers pueden
+    #           detectar el tamaño al mismo tiempo; solo rota el que crea el archivo de bloqueo y
+    #           vuelve a revisar el tamaño antes de moverlo, así el archivo recién creado por otro
+    #           worker nunca reemplaza al que se acaba de rotar. Un bloqueo más antiguo que
+    #           ROTATE_LOCK_SECONDS se considera abandonado (el worker terminó mientras rotaba).
+    #=============================================================================================
+    def _rotate(self):
+        lock_path = f"{self.log_path}.lock"
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            if time.time() - os.path.getmtime(lock_path) > ROTATE_LOCK_SECONDS:
+                os.remove(lock_path)
+            return # Otro worker está rotando; el evento se escribe en el archivo que quede
+        try:
+            if os.path.getsize(self.log_path) > MAX_LOG_BYTES:
+                os.replace(self.log_path, f"{self.log_path}.1")
+        finally:
+            os.close(fd)
+            os.remove(lock_path)
+
+    #=============================================================================================
+    # Método: subscribe
+    # Objetivo: Registrar una conexión y devolver su cola de eventos. Con `last_id` (Last-Event-ID)
+    #           se agregan primero los eventos publicados después de ese identificador.
+    #=============================================================================================
+    def subscribe(self, last_id=None):
+        events = queue.Queue(maxsize=QUEUE_SIZE)
+        with self._lock:
+            self._start()
+            if last_id:
+                for event in self._replay(last_id):
+                    events.put_nowait(event)
+            self._subscribers.add(events)
+        return events
+
+    def unsubscribe(self, events):
+        with self._lock:
+            self._subscribers.discard(events)
+
+    #=============================================================================================
+    # Método: stream
+    # Objetivo: Generador con el texto SSE de una conexión: los eventos conforme llegan y un
+    #           comentario de mantenimiento cada HEARTBEAT_INTERVAL segundos. Termina después de
+    #           STREAM_MAX_SECONDS (el navegador se reconecta) o cuando el cliente se desconecta.
+    #=============================================================================================
+    def stream(self, last_id=None):
+        events = self.subscribe(last_id)
+        deadline = time.monotonic() + STREAM_MAX_SECONDS
+        try:
+            yield f"retry: {int(POLL_INTERVAL * 4000)}\n\n"
+            while time.monotonic() < deadline:
+                try:
+                    event_id, event = events.get(timeout=HEARTBEAT_INTERVAL)
+                except queue.Empty:
+                    yield ": ping\n\n"
+                    continue
+                yield format_event(event_id, event)
+        finally:
+            self.unsubscribe(events)
+
+    # Inicia el hilo lector la primera vez que alguien se suscribe (a partir del final del archivo)
+    def _start(self):
+        if self._thread is not None:
+            return
+        self._open(at_end=True)
+        self._thread = threading.Thread(target=self._run, name="eventos", daemon=True)
+        self._thread.start()
+
+    def _open(self, at_end=False):
+        if self._file:
+            self._file.close()
+        open(self.log_path, 'ab').close()
+        self._file = open(self.log_path, 'rb')
+        self._inode = os.fstat(self._file.fileno()).st_ino
+        self._position = self._file.seek(0, os.SEEK_END) if at_end else 0
+
+    #=============================================================================================
+    # Método: _run
+    # Objetivo: Leer periódicamente las líneas nuevas del archivo y repartirlas. Si el archivo se
+    #           rotó se terminan de leer las líneas del anterior y se continúa con el nuevo.
+    #=============================================================================================
+    def _run(self):
+        while True:
+            time.sleep(POLL_INTERVAL)
+            try:
+                with self._lock:
+                    for event in self._read_new():
+                        self._dispatch(event)
+                    if _inode(self.log_path) != self._inode:
+                        self._open()
+                        for event in self._read_new():
+                            self._dispatch(event)
+            except Exception:
+                # El hilo no debe terminar por un error de lectura; se reintenta en la siguiente vuelta
+                continue
+
+    # Líneas completas agregadas desde la última lectura como pares (identificador, evento)
+    def _read_new(self):
+        self._file.seek(self._position)
+        events = []
+        for line in self._file:
+            if not line.endswith(b"\n"):
+                break # Línea aún incompleta, se lee en la siguiente vuelta
+            self._position += len(line)
+            try:
+                events.append((f"{self._inode}-{self._position}", json.loads(line)))
+            except ValueError:
+                continue
+        return events
+
+    # Entrega el evento a todas las conexiones; a las que tienen la cola llena se les pide recargar
+    def _dispatch(self, item):
+        for events in list(self._subscribers):
+            try:
+                events.put_nowait(item)
+            except queue.Full:
+                _clear(events)
+                events.put_nowait((item[0], {"type": "reset", "data": {}}))
+
+    #=============================================================================================
+    # Método: _replay
+    # Objetivo: Eventos publicados entre `last_id` y la posición actual del hilo lector. Si el
+    #           identificador es de un archivo anterior o no es válido se devuelve un evento "reset".
+    #=============================================================================================
+    def _replay(self, last_id):
+        inode, _, position = str(last_id).partition('-')
+        try:
+            inode, position = int(inode), int(position)
+        except ValueError:
+            inode = position = None
+        if inode != self._inode or position is None or position > self._position:
+            return [(f"{self._inode}-{self._position}", {"type": "reset", "data": {}})]
+        # Se lee del mismo archivo que tiene abierto el hilo lector (aunque ya se haya rotado); el hilo
+        # vuelve a posicionarse en self._position en cada lectura
+        self._file.seek(position)
+        data = self._file.read(self._position - position)
+        events = []
+        for line in data.splitlines(keepends=True):
+            position += len(line)
+            try:
+                events.append((f"{inode}-{position}", json.loads(line)))
+            except ValueError:
+                continue
+        return events
+
+# Texto SSE de un evento: el tipo como nombre del evento y los datos en JSON
+def format_event(event_id, event):
+    return f"id: {event_id}\nevent: {event.get('type', 'message')}\ndata: {json.dumps(event.get('data'), ensure_ascii=False, default=str)}\n\n"
+
+def _inode(path):
+    try:
+        return os.stat(path).st_ino
+    except OSError:
+        return None
+
+def _clear(events):
+    try:
+        while True:
+            events.get_nowait()
+    except queue.Empty:
+        pass
@@ -0,0 +1,156 @@
+import os # Manejo de rutas y archivos
+import hashlib # Cálculo del hash SHA-256 del archivo Excel
+import threading # Protección del caché en memoria entre hilos del servidor
+import pandas as pd # Lectura del archivo Excel y serialización de los Dataframes
+import metrics # Contadores de aciertos del caché
+
+# Directorio donde se guardan las hojas ya interpretadas del archivo Excel
+CACHE_DIR = os.path.join(os.getcwd(), ".excel_cache")
+
+# Hojas del archivo Excel que utiliza el generador
+COURSES_SHEET = 'P01'
+PARTICIPANTS_SHEET = 'PARTIP01'
+
+# Únicas columnas que utiliza el generador (las demás columnas de las hojas no se cargan)
+USED_COLUMNS = {'ID_CURSO', 'MES_PROGRAMADO', 'FECHA_INICIO', 'FECHA_TERMINO', 'ID_ACTIVIDAD', 'NOMBRE_CURSO', 'RPE', 'NOMBRE_COMPLETO', 'SEXO_TRAB'}
+# Columnas de texto con pocos valores distintos que se guardan como categorías
+CATEGORY_COLUMNS = ('NOMBRE_CURSO', 'SEXO_TRAB')
+
+# Versión del formato de los Dataframes guardados en el caché (cambia si cambia la forma de interpretarlos)
+CACHE_VERSION = 2
+
+# Caché en memoria del proceso: hash conocido por archivo (según su mtime y tamaño) y último par de hojas leído
+_hash_by_stat = {}
+_frames_in_memory = {}
+_lock = threading.Lock()
+
+EXCEL_CACHE = metrics.counter("excel_cache_requests_total", "Lecturas del archivo Excel por origen (memory, disk o miss)", ("result",))
+
+#=================================================================================================
+# Función: file_hash
+# Objetivo: Calcular el SHA-256 del contenido de un archivo. Mientras el mtime y el tamaño del
+#           archivo no cambien se reutiliza el hash ya calculado para no volver a leerlo completo.
+#=================================================================================================
+def file_hash(path):
+    stat = os.stat(path)
+    stat_key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    with _lock:
+        cached = _hash_by_stat.get(stat_key)
+    if cached:
+        return cached
+
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(chunk)
+    digest = sha.hexdigest()
+    with _lock:
+        _hash_by_stat[stat_key] = digest
+    return digest
+
+#=================================================================================================
+# Función: workbook_hash
+# Objetivo: Hash del contenido del archivo Excel (llave del caché de hojas interpretadas).
+#=================================================================================================
+def workbook_hash(excel_path):
+    return file_hash(excel_path)
+
+#=================================================================================================
+# Función: read_sheets
+# Objetivo: Interpretar las hojas de cursos y participantes directamente desde el archivo Excel
+#           (operación costosa con openpyxl, por eso su resultado se guarda en caché). Solo se cargan
+#           las columnas que utiliza el generador y con tipos compactos (ver compact_frame).
+#=================================================================================================
+def read_sheets(excel_path):
+    sheets = pd.read_excel(excel_path, sheet_name=[COURSES_SHEET, PARTICIPANTS_SHEET], usecols=lambda column: str(column).strip() in USED_COLUMNS)
+    return compact_frame(sheets[COURSES_SHEET]), compact_frame(sheets[PARTICIPANTS_SHEET])
+
+#=================================================================================================
+# Función: compact_frame
+# Objetivo: Reducir la memoria de una hoja sin cambiar sus valores: los nombres de los cursos y el
+#           sexo se guardan como categorías y el mes como entero de 8 bits (solo si la columna ya es
+#           numérica y todas las filas tienen un mes entero). Las fechas se conservan tal como las interpreta pandas, así que el
+#           texto que se escribe en los documentos no cambia.
+#=================================================================================================
+def compact_frame(df):
+    for column in CATEGORY_COLUMNS:
+        if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype('category')
+    if 'MES_PROGRAMADO' in df.columns and pd.api.types.is_numeric_dtype(df['MES_PROGRAMADO']):
+        months = df['MES_PROGRAMADO']
+        if months.notna().all() and (months % 1 == 0).all() and months.between(-128, 127).all():
+            df['MES_PROGRAMADO'] = months.astype('int8')
+    return df
+
+#=================================================================================================
+# Función: load_frames
+# Objetivo: Devolver los Dataframes de cursos y participantes del archivo Excel, leyéndolos del
+#           caché (memoria o disco) cuando el contenido del archivo no ha cambiado.
+#=================================================================================================
+def load_frames(excel_path, cache_dir=CACHE_DIR):
+    digest = workbook_hash(excel_path)
+
+    # Primero se busca en la memoria del proceso
+    with _lock:
+        frames = _frames_in_memory.get(digest)
+    if frames is not None:
+        EXCEL_CACHE.inc(result="memory")
+        return frames
+
+    # Después en el caché en disco (formato pickle de pandas, mucho más rápido que openpyxl)
+    cache_path = os.path.join(cache_dir, cache_file_name(digest))
+    if os.path.exists(cache_path):
+        try:
+            frames = pd.read_pickle(cache_path)
+        except Exception:
+            frames = None # Archivo de caché dañado o incompleto, se vuelve a generar
+
+    if frames is None:
+        EXCEL_CACHE.inc(result="miss")
+        frames = read_sheets(excel_path)
+        _write_cache(cache_path, frames)
+    else:
+        EXCEL_CACHE.inc(result="disk")
+
+    with _lock:
+        # Solo se conserva en memoria la versión más reciente del archivo
+        _frames_in_memory.clear()
+        _frames_in_memory[digest] = frames
+    return frames
+
+#=================================================================================================
+# Función: warm_cache
+# Objetivo: Interpretar el archivo recién subido y dejarlo en caché para que la primera generación
+#           no pague el costo de lectura. Se eliminan las entradas de versiones anteriores.
+#=================================================================================================
+def warm_cache(excel_path, cache_dir=CACHE_DIR):
+    frames = load_frames(excel_path, cache_dir)
+    current = cache_file_name(workbook_hash(excel_path))
+    if not os.path.isdir(cache_dir):
+        return frames
+    for f in os.listdir(cache_dir):
+        if f != current and not f.endswith('.tmp'):
+            try:
+                os.remove(os.path.join(cache_dir, f))
+            except OSError:
+                pass
+    return frames
+
+# Nombre del archivo de caché de un archivo Excel (según su hash y la versión del formato)
+def cache_file_name(digest):
+    return f"{digest}-v{CACHE_VERSION}.pkl"
+
+#=================================================================================================
+# Función: _write_cache
+# Objetivo: Guardar los Dataframes en disco de forma atómica (archivo temporal + renombrado) para que
+#           otro proceso nunca lea un caché a medio escribir.
+#=================================================================================================
+def _write_cache(cache_path, frames):
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        pd.to_pickle(frames, tmp_path)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        # El caché es una optimización: si no se puede escribir la generación continúa igual
+        print(f"Advertencia: No se pudo guardar el caché del archivo Excel: {e}")
@@ -0,0 +1,108 @@
+from datetime import date, datetime # Reconocimiento de las fechas del archivo Excel
+from openpyxl import load_workbook # Lectura en modo solo lectura (sin cargar el libro completo en memoria)
+from excel_cache import COURSES_SHEET, PARTICIPANTS_SHEET # Hojas del archivo Excel que utiliza el generador
+from generator import REQUIRED_COLUMNS, PARTICIPANT_COLUMNS # Columnas que necesita el motor de generación
+
+# Columnas necesarias por hoja (además de las esenciales, el nombre del curso y los datos de los participantes)
+SHEET_COLUMNS = {
+    COURSES_SHEET: sorted(REQUIRED_COLUMNS | {'NOMBRE_CURSO'}),
+    PARTICIPANTS_SHEET: sorted(REQUIRED_COLUMNS | set(PARTICIPANT_COLUMNS))
+}
+
+# Columnas de fecha que se revisan en la muestra
+DATE_COLUMNS = ('FECHA_INICIO', 'FECHA_TERMINO')
+
+# Filas de datos que se revisan por hoja y máximo de fechas inválidas que se detallan en el reporte
+SAMPLE_ROWS = 1000
+MAX_REPORTED_DATES = 20
+
+#=================================================================================================
+# Función: validate_workbook
+# Objetivo: Revisar un archivo Excel antes de usarlo como base de datos, leyendo solo el encabezado
+#           y una muestra de filas de cada hoja (openpyxl en modo solo lectura, en milisegundos aun
+#           para archivos grandes). Devuelve un reporte con las hojas y columnas faltantes, las filas
+#           por MES_PROGRAMADO de la muestra ("sampled_rows_per_month", completas solo si
+#           "sample_complete"), las fechas que no se pueden interpretar y "valid" indicando si el archivo
+#           se puede utilizar para generar los reportes.
+#=================================================================================================
+def validate_workbook(excel_path, sample_rows=SAMPLE_ROWS):
+    report = {"valid": False, "missing_sheets": [], "sheets": {}, "unparseable_dates": [], "unparseable_dates_count": 0}
+    try:
+        wb = load_workbook(excel_path, read_only=True, data_only=True)
+    except Exception as e:
+        report["error"] = f"El archivo no es un libro de Excel (.xlsx) válido: {e}"
+        return report
+
+    try:
+        for sheet_name, columns in SHEET_COLUMNS.items():
+            if sheet_name not in wb.sheetnames:
+                report["missing_sheets"].append(sheet_name)
+                continue
+            report["sheets"][sheet_name] = _validate_sheet(wb[sheet_name], sheet_name, columns, sample_rows, report)
+    finally:
+        wb.close()
+
+    report["valid"] = not report["missing_sheets"] and not any(sheet["missing_columns"] for sheet in report["sheets"].values())
+    return report
+
+#=================================================================================================
+# Función: _validate_sheet
+# Objetivo: Revisar el encabezado y la muestra de filas de una hoja. Las fechas inválidas se
+#           agregan al reporte general.
+#=================================================================================================
+def _validate_sheet(ws, sheet_name, columns, sample_rows, report):
+    rows = ws.iter_rows(values_only=True)
+    header = [str(value).strip() if value is not None else '' for value in next(rows, ())]
+    position = {name: i for i, name in enumerate(header) if name}
+    # Las dimensiones declaradas en el archivo dan el total de filas sin recorrer la hoja completa (no
+    # todos los archivos las incluyen)
+    total_rows = ws.max_row - 1 if ws.max_row else None
+
+    months = {}
+    sampled = 0
+    complete = True
+    month_idx = position.get('MES_PROGRAMADO')
+    date_idx = [(column, position[column]) for column in DATE_COLUMNS if column in position]
+    for row_number, row in enumerate(rows, start=2):
+        if not any(value is not None for value in row):
+            continue # Filas vacías al final de la hoja
+        if sampled >= sample_rows:
+            complete = False # La hoja tiene más filas que la muestra
+            break
+        sampled += 1
+        if month_idx is not None and month_idx < len(row):
+            month = _month_label(row[month_idx])
+            months[month] = months.get(month, 0) + 1
+        for column, idx in date_idx:
+            value = row[idx] if idx < len(row) else None
+            if not _is_date(value):
+                report["unparseable_dates_count"] += 1
+                if len(report["unparseable_dates"]) < MAX_REPORTED_DATES:
+                    report["unparseable_dates"].append({"sheet": sheet_name, "row": row_number, "column": column, "value": str(value)})
+
+    return {
+        # Sin dimensiones declaradas el total solo se conoce si la muestra recorrió toda la hoja
+        "rows": total_rows if total_rows is not None else (sampled if complete else None),
+        "sampled_rows": sampled,
+        "sample_complete": complete,
+        "missing_columns": [column for column in columns if column not in position],
+        "sampled_rows_per_month": dict(sorted(months.items(), key=lambda item: (not item[0].isdigit(), item[0].zfill(2))))
+    }
+
+# Etiqueta del mes de una fila: número entero (1-12) o el valor tal como viene si no lo es
+def _month_label(value):
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip() if value is not None else ''
+
+# Indica si un valor de la hoja es una fecha o un texto que se puede interpretar como fecha
+def _is_date(value):
+    if isinstance(value, (datetime, date)):
+        return True
+    if isinstance(value, str):
+        try:
+            datetime.fromisoformat(value.strip())
+            return True
+        except ValueError:
+            return False
+    return False
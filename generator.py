@@ -1,312 +1,804 @@
 import os # Manipulación de rutas y archivos
-import tempfile # Creación de directorios temporales para almacenar archivos de forma aislada
 import zipfile # Empaquetamiento de archivos en formato ZIP
-import pandas as pd # Lectura y manipulación de datos (En este caso desde archivos excel)
-from docx import Document # Se trabaja con la manipulación de documentos Word
-from docx.shared import Pt # Definición de tamaños en puntos para fuentes
-from docx.enum.text import WD_PARAGRAPH_ALIGNMENT # Alineación de parrafos
-from docx.oxml.ns import qn # Manejo de nombres de espacio en XML para compatibilidad en word
 from datetime import datetime # Manejo de fechas y horas
-import shutil # Operaciones de alto nivel con archivos (copiar, mover, etc...)
 import sys # Acceso a variables y funciones del sistema, como los argumentos del script
 import locale # Configuración de la localización (idioma, formato de fecha, etc...)
+import json # Serialización estable de los datos de cada documento para calcular su huella
+import hashlib # Huella (fingerprint) de los datos de cada documento
+import threading # Protección del grupo de procesos de renderizado compartido
+import multiprocessing # Contexto 'spawn' para crear los procesos de renderizado de forma segura desde el servidor
+from concurrent.futures import ProcessPoolExecutor # Renderizado de documentos en paralelo
+from concurrent.futures.process import BrokenProcessPool
+from itertools import repeat
+from dataclasses import dataclass, field # Estructura del resultado devuelto por el motor de generación
+from excel_cache import load_frames, file_hash # Caché de las hojas del archivo Excel ya interpretadas
+from historial_store import HistorialStore # Índice de los documentos del historial (regeneración incremental)
+from docx_template import get_compiled_template, render_batch # Plantilla Word compilada una sola vez por proceso
+import metrics # Tiempos por etapa y contadores de la generación
+from metrics import timed
 
 # Directorio para almacenar los documentos generados como historial (registro permanente)
 HISTORIAL_DIR = os.path.join(os.getcwd(), "reports_historial")
 if not os.path.exists(HISTORIAL_DIR):
     os.makedirs(HISTORIAL_DIR) # Se crea el directorio en caso de no existir
 
+# Rutas por defecto del archivo de datos y de la plantilla Word (relativas al directorio de trabajo)
+EXCEL_PATH = 'db_excel.xlsx'
+TEMPLATE_PATH = 'FORMATO_WORD.docx'
+
+# Diccionario con los nombres de los meses en español
+MONTH_NAMES = {
+    1: 'Enero',
+    2: 'Febrero',
+    3: 'Marzo',
+    4: 'Abril',
+    5: 'Mayo',
+    6: 'Junio',
+    7: 'Julio',
+    8: 'Agosto',
+    9: 'Septiembre',
+    10: 'Octubre',
+    11: 'Noviembre',
+    12: 'Diciembre'
+}
+
+# Valores que indican la generación del año completo
+YEAR_ALIASES = {'year', 'anual', 'año', 'todo'}
+
+# Columnas esenciales que deben existir en ambas hojas del archivo Excel
+REQUIRED_COLUMNS = {'ID_CURSO', 'MES_PROGRAMADO', 'FECHA_INICIO', 'FECHA_TERMINO', 'ID_ACTIVIDAD'}
+
+# Número de procesos que construyen los documentos en paralelo (1 = todo en el proceso actual)
+RENDER_WORKERS = int(os.environ.get('GENERATOR_WORKERS', '1'))
+# Documentos en vuelo por proceso de renderizado
+RENDER_WINDOW_PER_WORKER = 8
+
+# Grupos de procesos persistentes por número de procesos: se conservan entre generaciones para que cada
+# proceso mantenga la plantilla compilada
+_render_pools = {}
+_render_pool_lock = threading.Lock()
+
+# Llave compuesta que relaciona a un participante con un curso del mes y columnas que se colocan en el documento
+PARTICIPANT_KEY = ['ID_CURSO', 'FECHA_INICIO', 'FECHA_TERMINO', 'ID_ACTIVIDAD']
+PARTICIPANT_COLUMNS = ['RPE', 'NOMBRE_COMPLETO', 'SEXO_TRAB']
+
+# Documentos que se registran juntos en el índice del historial (cada lote es una transacción corta)
+HISTORIAL_RECORD_BATCH = 20
+
+# Participantes por documento (un documento por lote)
+BATCH_SIZE = 10
+# Tamaño estimado de un documento para la vista previa cuando el historial aún no registra tamaños
+ESTIMATED_DOCUMENT_BYTES = 55 * 1024
+# Bytes fijos de cada archivo dentro del ZIP (encabezado local y del directorio central, sin el nombre)
+ZIP_ENTRY_BYTES = 76
+# Bytes del registro final del directorio central del ZIP
+ZIP_END_BYTES = 22
+
+# Métricas de la generación (se exponen en /metrics)
+STAGE_SECONDS = metrics.histogram("generator_stage_seconds", "Duración de cada etapa de una generación en segundos", ("stage",))
+DOCUMENTS = metrics.counter("generator_documents_total", "Documentos incluidos en los ZIP por origen (rendered o reused)", ("kind",))
+DOCUMENT_BYTES = metrics.counter("generator_document_bytes_total", "Bytes de los documentos Word incluidos en los ZIP")
+ZIP_BYTES = metrics.counter("generator_zip_bytes_total", "Bytes de los archivos ZIP generados")
+
+#=================================================================================================
+# Clase: GenerationError
+# Objetivo: Error que detiene la generación completa (archivo de datos o plantilla inválidos,
+#           nada que comprimir, etc...). El mensaje está pensado para mostrarse al usuario.
 #=================================================================================================
-# Función: apply_styles
-# Objetivo: Aplicar estilos predefinidos a un fragmento de texto (run) dentro del documento word.
+class GenerationError(Exception):
+    pass
+
 #=================================================================================================
-def apply_styles(run, font_size=9):
-    run.font.name = 'Arial' # Fuente del texto
-    run.font.size = Pt(font_size) # Tamaño del texto en puntos
-    run.font.bold = True # Texto en negritas activado
-    r = run._element
-    # Se establece la fuente para la compatibilidad con versiones de Word que usan codificación diferente para ciertos idiomas
-    r.rPr.rFonts.set(qn('w:eastAsia'), 'Arial')
+# Clase: GenerationResult
+# Objetivo: Resultado estructurado de una generación, sustituye a las líneas de resumen que
+#           antes se imprimían en consola y que app.py tenía que interpretar.
+#=================================================================================================
+@dataclass
+class GenerationResult:
+    month: int
+    month_name: str
+    total_courses: int = 0 # Cursos programados en el mes
+    total_docs_generated: int = 0 # Documentos incluidos en el ZIP (construidos + reutilizados)
+    rendered: int = 0 # Documentos construidos en esta ejecución
+    reused: int = 0 # Documentos sin cambios tomados del historial
+    removed: int = 0 # Documentos del mes eliminados del historial por ya no corresponder a los datos
+    courses_without_participants: list = field(default_factory=list) # Nombres de los cursos sin participantes
+    errors: list = field(default_factory=list) # Errores por curso/lote que no detuvieron la generación
+    zip_path: str = None # Ruta del ZIP generado (None si no hubo cursos en el mes)
+    document_bytes: int = 0 # Bytes de los documentos incluidos en el ZIP
+    timings: dict = field(default_factory=dict) # Segundos acumulados por etapa (ver metrics.timed)
+    historial_added: list = field(default_factory=list) # Nombres de los documentos guardados en el historial
+    historial_removed: list = field(default_factory=list) # Nombres de los documentos eliminados del historial
+
+    # Resumen en formato diccionario, listo para devolverse como JSON
+    def summary(self):
+        return {
+            "month": self.month_name,
+            "total_courses": self.total_courses,
+            "total_docs": self.total_docs_generated,
+            "rendered": self.rendered,
+            "reused": self.reused,
+            "removed": self.removed,
+            "courses_without_participants": len(self.courses_without_participants),
+            "empty_courses": list(self.courses_without_participants),
+            "errors": list(self.errors),
+            "document_bytes": self.document_bytes,
+            "timings": _timings_ms(self.timings),
+            "zip_path": self.zip_path
+        }
+
+#=================================================================================================
+# Clase: PeriodResult
+# Objetivo: Resultado de una generación de varios meses en una sola pasada: el resultado de cada
+#           mes y el ZIP único que los contiene (una carpeta por mes).
+#=================================================================================================
+@dataclass
+class PeriodResult:
+    months: list
+    label: str # Nombre del periodo (p. ej. "Enero-Marzo" o "Anual")
+    results: list = field(default_factory=list) # GenerationResult de cada mes, en el orden de `months`
+    zip_path: str = None
+    timings: dict = field(default_factory=dict) # Segundos de las etapas comunes a todos los meses (lectura, plantilla, agrupación)
+
+    @property
+    def total_courses(self):
+        return sum(result.total_courses for result in self.results)
+
+    @property
+    def total_docs_generated(self):
+        return sum(result.total_docs_generated for result in self.results)
+
+    @property
+    def historial_added(self):
+        return [name for result in self.results for name in result.historial_added]
+
+    @property
+    def historial_removed(self):
+        return [name for result in self.results for name in result.historial_removed]
+
+    # Resumen del periodo (totales) con el resumen de cada mes, listo para devolverse como JSON
+    def summary(self):
+        months = []
+        for result in self.results:
+            month_summary = result.summary()
+            month_summary.pop("zip_path")
+            months.append(month_summary)
+        return {
+            "month": self.label,
+            "total_courses": self.total_courses,
+            "total_docs": self.total_docs_generated,
+            "rendered": sum(result.rendered for result in self.results),
+            "reused": sum(result.reused for result in self.results),
+            "removed": sum(result.removed for result in self.results),
+            "courses_without_participants": sum(len(result.courses_without_participants) for result in self.results),
+            "empty_courses": [course for result in self.results for course in result.courses_without_participants],
+            "errors": [dict(error, month=result.month_name) for result in self.results for error in result.errors],
+            "document_bytes": sum(result.document_bytes for result in self.results),
+            "timings": _timings_ms(self.timings, *(result.timings for result in self.results)),
+            "months": months,
+            "zip_path": self.zip_path
+        }
+
+# Tiempos por etapa en milisegundos (sumando los diccionarios recibidos) para el resumen
+def _timings_ms(*timings):
+    total = {}
+    for stage_timings in timings:
+        for stage, seconds in stage_timings.items():
+            total[stage] = total.get(stage, 0.0) + seconds
+    return {stage: round(seconds * 1000, 1) for stage, seconds in total.items()}
+
+#=================================================================================================
+# Clase: DocumentJob
+# Objetivo: Un documento por construir: curso y lote al que pertenece, nombre de archivo, valores de
+#           los marcadores (en el orden de docx_template.MARKS) y participantes del lote.
+#=================================================================================================
+@dataclass
+class DocumentJob:
+    course: str
+    batch: int
+    file_name: str
+    values: tuple
+    participants: list
+    activity: str = ''
+
+    # Huella de los datos del documento: si no cambia, el documento del historial sigue siendo válido
+    def fingerprint(self, template_hash):
+        data = json.dumps([template_hash, self.values, self.participants], default=str, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(data.encode('utf-8')).hexdigest()
 
 #=======================================================================================================
-# Función: replace_mark
-# Objetivo: Reemplazar marcadores (placeholders) en el documento Word, tanto en párrafos como en tablas,
-#           y aplicar los estilos definidos a esos textos.
+# Función: resolve_month
+# Objetivo: Convertir el mes recibido (número, texto o vacío) a un entero entre 1 y 12.
+#           Si no es válido se usa el mes actual, igual que cuando se llamaba al script sin argumento.
 #=======================================================================================================
-def replace_mark(doc, mark, text):
+def resolve_month(value):
     try:
-        text = str(text) # Asegura que el contenido a insertar sea una cadenass
-        # Se itera sobre cada párrafo del documento 
-        for paragraph in doc.paragraphs:
-            if mark in paragraph.text:
-                # Se itera sobre cada fragmento de texto (run) dentro del párrafo
-                for run in paragraph.runs:
-                    if mark in run.text:
-                        # Se reemplaza el marcador con el texto designado
-                        run.text = run.text.replace(mark, str(text))
-                        # Se aplican los estilos personalizados al run modificado
-                        apply_styles(run)
-    
-        # Se itera sobre cada tabla del documento
-        for table in doc.tables:
-            for row in table.rows:
-                for cell in row.cells:
-                    if mark in cell.text: # Se verifica si el marcador existe en la celda
-                        for paragraph in cell.paragraphs: # Se recorre cada párrafo dentro de la celda
-                            for run in paragraph.runs: # Recorre cada fragmento de texto (run) del párrafo
-                                if mark in run.text:
-                                    run.text = run.text.replace(mark, str(text))
-                                    # Se aplican los estilos personalizados
-                                    apply_styles(run)
-
-                        # Se justifica el texto de cada celda al centro
-                        paragraph.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-    except Exception as e:
-        print(f"Error al reemplazar el marcador {mark}: {e}")
+        month = int(value)
+    except (TypeError, ValueError):
+        return datetime.now().month
+    return month if month in MONTH_NAMES else datetime.now().month
 
 #=======================================================================================================
-# Función: add_participants
-# Objetivo: Agregar los datos de los participantes a una tabla en el documento Word.
-#           Dado el formato proporcionado se asume que la tabla de los participantes es la tercera del
-#           documento.
+# Función: resolve_months
+# Objetivo: Convertir la selección de meses a una lista ordenada de enteros entre 1 y 12. Acepta una
+#           lista ([1, 2, 3]), un texto con comas ("1,2,3"), un rango ("1-3") o el año completo ("year",
+#           "anual"). A diferencia de resolve_month, una selección inválida lanza GenerationError.
 #=======================================================================================================
-def add_participants(doc, participants):
-    try:
-        table = doc.tables[2] # Se asume que la tabla de los participantes es la tercera del documento
-    except IndexError:
-        raise IndexError("Error: No se encontró la tabla esperada de los participantes, revisar el formato Word")
-
-    num_participants = len(participants) # Número total de participantes a agregar
-    total_rows = max(10, num_participants) # Asegura al menos 10 filas, incluso si hay menos participantes
-
-    # Se itera para crear filas en la tabla
-    for idx in range(total_rows):
-        # Se agrega una nueva fila a la tabla
-        new_row = table.add_row()
-
-        if idx < num_participants:
-            participant = participants[idx]
-            # Se preparan los datos: Índice, RPE y nombre completo del participante
-            data = [str(idx + 1), participant['RPE'], participant['NOMBRE_COMPLETO']]
-            # Se obtiene el dato del sexo, si está presente
-            sex = participant.get('SEXO_TRAB', '')
-            # Dependiendo del valor de 'SEXO_TRAB', se marca la celda correspondiente
-            if sex == 'M':
-                data.append('X') # Celda del sexo masculino
-                data.append('') # Celda del sexo femenino vacía
-            elif sex == 'F':
-                data.append('') # Celda del sexo masculino vacía
-                data.append('X') # Celda del sexo femenino
-            else:
-                data.append('')
-                data.append('') # Datos vacíos si no hay información
+def resolve_months(value):
+    if isinstance(value, str):
+        text = value.strip().lower()
+        if text in YEAR_ALIASES:
+            return list(MONTH_NAMES)
+        if '-' in text:
+            start, _, end = text.partition('-')
+            value = range(int(start), int(end) + 1) if start.strip().isdigit() and end.strip().isdigit() else [text]
         else:
-            data = ['', '', '', '', ''] # Filas vacías de relleno si no existen más participantes
-
-        # Se recorre cada dato y se coloca en la celda correspondiente
-        for i, text in enumerate(data):
-            # Se coloca cada dato correspondiente en su respectiva celda
-            cell = new_row.cells[i]
-            cell.text = text
-            # Se accede al parrafo dentro de la celda actual
-            paragraph = cell.paragraphs[0]
-            # Se aplica la justificación al centro para el texto
-            paragraph.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-            # Se aplican los estilos con un tamaño de fuente reducido para ajustarse al formato de la tabla
-            if paragraph.runs:
-                apply_styles(paragraph.runs[0], font_size=7.5)
+            value = text.split(',')
+    try:
+        months = sorted({int(month) for month in value})
+    except (TypeError, ValueError):
+        months = []
+    if not months or any(month not in MONTH_NAMES for month in months):
+        raise GenerationError("Error: Los meses solicitados no son válidos, deben ser números del 1 al 12 o 'year' para el año completo")
+    return months
 
 #=======================================================================================================
-# Función: generate_reports
-# Objetivo: Generar los reportes a partir de los datos de un archivo Excel,
-#           reemplazar marcadores en una plantilla Word, agregar participantes,
-#           y empaquetar los reportes generados en un archivo ZIP.
+# Función: period_label
+# Objetivo: Nombre de un periodo de meses para el ZIP y el resumen ("Marzo", "Enero-Marzo", "Anual"...).
 #=======================================================================================================
-def generate_reports():
-    try:
-        # Ruta del archivo Excel con la información de cursos y participantes
-        excel_path = 'db_excel.xlsx'
-        if not os.path.exists(excel_path):
-            error_message = f"Error: No se encontró el archivo {excel_path}. Verifique su existencia o ubicación"
-            print(error_message, flush=True)
-            sys.exit(1)
+def period_label(months):
+    if len(months) == len(MONTH_NAMES):
+        return "Anual"
+    if len(months) > 1 and months[-1] - months[0] == len(months) - 1:
+        return f"{MONTH_NAMES[months[0]]}-{MONTH_NAMES[months[-1]]}"
+    return "_".join(MONTH_NAMES[month] for month in months)
 
-        # Lectura de la hoja 'P01' que contiene los cursos
-        df_courses = pd.read_excel(excel_path, sheet_name='P01')
-        # print(df_courses.columns) ---- Se imprimen las columnas de la hoja de los cursos
-        # Lectura de la hoja 'PARTIP01' que contiene a los participantes
-        df_participants = pd.read_excel(excel_path, sheet_name='PARTIP01')
-        # print(df_participants.columns) ---- Se imprimen las columnas de la hoja de los participantes
+#=======================================================================================================
+# Función: load_workbook
+# Objetivo: Leer las hojas de cursos (P01) y participantes (PARTIP01) del archivo Excel y verificar
+#           que contengan las columnas esenciales. Solo se interpreta el Excel cuando su contenido
+#           cambió desde la última lectura (ver excel_cache.py).
+#=======================================================================================================
+def load_workbook(excel_path):
+    if not os.path.exists(excel_path):
+        raise GenerationError(f"Error: No se encontró el archivo {excel_path}. Verifique su existencia o ubicación")
+    try:
+        # Lectura de las hojas 'P01' (cursos) y 'PARTIP01' (participantes); se reutiliza el caché
+        # mientras el contenido del archivo no cambie
+        df_courses, df_participants = load_frames(excel_path)
     except ValueError as e:
-        error_message = f"Error: El archivo {excel_path} no contiene alguna de las hojas esperadas. Detalles: {e}"
-        print(error_message, flush=True)
-        sys.exit(1)
+        raise GenerationError(f"Error: El archivo {excel_path} no contiene alguna de las hojas esperadas. Detalles: {e}")
     except PermissionError as e:
-        error_message = f"Error: No se puede acceder al archivo {excel_path}. Puede que este abierto por otro programa o este bloqueado. Cierre el archivo e intente nuevamente: {e}"
-        print(error_message, flush=True)
-        sys.exit(1)
+        raise GenerationError(f"Error: No se puede acceder al archivo {excel_path}. Puede que este abierto por otro programa o este bloqueado. Cierre el archivo e intente nuevamente: {e}")
     except Exception as e:
-        print(f"Error inesperado al abrir el documento excel: {e}")
+        raise GenerationError(f"Error inesperado al abrir el documento excel: {e}")
+
+    # Verifica que las columnas esenciales existan en ambos Dataframes
+    if not REQUIRED_COLUMNS.issubset(df_courses.columns) or not REQUIRED_COLUMNS.issubset(df_participants.columns):
+        raise GenerationError("Error: El archivo o algunas de las hojas no contiene las columnas necesarias: ID_CURSO, MES_PROGRAMADO, FECHA_INICIO, FECHA_TERMINO, ID_ACTIVIDAD")
+    return df_courses, df_participants
+
+#=======================================================================================================
+# Función: report_file_name
+# Objetivo: Construir el nombre de archivo seguro de un reporte a partir de los datos del curso y su lote.
+#=======================================================================================================
+def report_file_name(row, batch):
+    return f'{row["NOMBRE_CURSO"].replace("/", "_").replace(" ", "_")}_'f'{row["FECHA_INICIO"]}_'f'{row["FECHA_TERMINO"]}_L{batch + 1}_'f'{row["ID_ACTIVIDAD"]}.docx'
+
+#=======================================================================================================
+# Función: build_participant_index
+# Objetivo: Agrupar a los participantes del mes por la llave compuesta (ID_CURSO, FECHA_INICIO,
+#           FECHA_TERMINO, ID_ACTIVIDAD) en un diccionario, eliminando duplicados (mismo RPE y nombre)
+#           en una sola pasada. Así cada curso obtiene su lista de participantes con una búsqueda directa
+#           en lugar de filtrar toda la tabla por cada curso.
+#=======================================================================================================
+def build_participant_index(df_participants, month):
+    df = df_participants.loc[df_participants['MES_PROGRAMADO'] == month, PARTICIPANT_KEY + PARTICIPANT_COLUMNS]
+    # Los datos faltantes de los participantes se dejan vacíos, igual que en el documento
+    # (las columnas categóricas se convierten a objetos para admitir el texto vacío)
+    df = df.assign(**{column: df[column].astype(object).fillna('') for column in PARTICIPANT_COLUMNS})
+    # Se descartan los duplicados dentro de cada curso conservando el primer registro
+    df = df.dropna(subset=PARTICIPANT_KEY).drop_duplicates(subset=PARTICIPANT_KEY + ['RPE', 'NOMBRE_COMPLETO'])
+
+    index = {}
+    keys = zip(*(df[column] for column in PARTICIPANT_KEY))
+    for key, record in zip(keys, df[PARTICIPANT_COLUMNS].to_dict('records')):
+        index.setdefault(key, []).append(record)
+    return index
+
+#=======================================================================================================
+# Función: course_key
+# Objetivo: Obtener la llave compuesta de un curso para buscar a sus participantes en el índice.
+#=======================================================================================================
+def course_key(row):
+    return tuple(row[column] for column in PARTICIPANT_KEY)
+
+#=======================================================================================================
+# Función: build_document_jobs
+# Objetivo: Recorrer los cursos del mes y preparar la lista ordenada de documentos a construir, un
+#           documento por cada lote de 10 participantes. Los cursos sin participantes se registran en
+#           el resultado y no generan documentos.
+#=======================================================================================================
+def build_document_jobs(df_filtered, participant_index, result):
+    jobs = []
+    # Se itera sobre cada curso filtrado
+    for index, row in df_filtered.iterrows():
+        # Se obtienen los participantes del curso actual (mismo curso, fechas y actividad dentro del mes)
+        participants_list = participant_index.get(course_key(row), [])
+
+        if not participants_list:
+            print(f"No hay participantes inscritos en el curso {row['NOMBRE_CURSO']}")
+            result.courses_without_participants.append(str(row['NOMBRE_CURSO']))
+            continue
+
+        # Se calcula el número de lotes los cuales se dividen por 10 participantes en cada uno
+        num_batches = (len(participants_list) // 10) + (1 if len(participants_list) % 10 else 0)
+        values = (str(row['NOMBRE_CURSO']), str(row['FECHA_INICIO']), str(row['FECHA_TERMINO']))
+        for batch in range(num_batches):
+            jobs.append(DocumentJob(
+                course=str(row['NOMBRE_CURSO']),
+                batch=batch + 1,
+                file_name=report_file_name(row, batch),
+                values=values,
+                participants=participants_list[batch * 10:(batch + 1) * 10],
+                activity=str(row['ID_ACTIVIDAD'])
+            ))
+    return jobs
+
+#=======================================================================================================
+# Función: get_render_pool
+# Objetivo: Obtener el grupo de procesos persistente con el número de procesos solicitado para construir
+#           documentos en paralelo. Hay un grupo por número de procesos; uno existente nunca se cierra
+#           al pedir otro número porque otras generaciones pueden seguir usándolo.
+#=======================================================================================================
+def get_render_pool(workers):
+    with _render_pool_lock:
+        pool = _render_pools.get(workers)
+        if pool is None:
+            # 'spawn' evita heredar hilos y bloqueos del servidor web al crear los procesos
+            pool = _render_pools[workers] = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        return pool
+
+#=======================================================================================================
+# Función: render_documents
+# Objetivo: Construir los documentos de la lista, en el proceso actual o repartidos entre varios
+#           procesos. Devuelve las parejas (contenido, error) en el mismo orden que los documentos, de
+#           modo que el ZIP y los contadores son idénticos sin importar el número de procesos.
+#           Las etapas internas de cada documento solo se suman a `timings` cuando se construyen en el
+#           proceso actual.
+#=======================================================================================================
+def render_documents(template_path, jobs, workers=RENDER_WORKERS, timings=None):
+    if workers <= 1 or len(jobs) < 2:
+        # En el proceso actual se miden también las etapas internas de cada documento
+        for job in jobs:
+            yield render_batch(template_path, job.values, job.participants, timings)
         return
 
-    # Determina el mes a procesar: se usa el argumento pasado al script o, si no, el mes actual
-    if len(sys.argv) > 1 and sys.argv[1]:
-        try:
-            selected_month = int(sys.argv[1]) # Argumento pasado: Mes seleccionado por el usuario
-        except ValueError:
-            selected_month = datetime.now().month
-    else:
-        selected_month = datetime.now().month
-        
-    # Se obtiene el mes seleccionado o el actual (1 = Enero, 2 = Febrero, etc...)
-    current_month = selected_month
-    # Se configura el diccionario con los nombres de los meses en español
-    month_names = {
-        1: 'Enero',
-        2: 'Febrero',
-        3: 'Marzo',
-        4: 'Abril',
-        5: 'Mayo',
-        6: 'Junio',
-        7: 'Julio',
-        8: 'Agosto',
-        9: 'Septiembre',
-        10: 'Octubre',
-        11: 'Noviembre',
-        12: 'Diciembre'
-    }
-    # Se obtiene el nombre del mes en español una vez ya configurado el diccionario
-    # Se crea un objeto datetime con un día cualquiera para ese mes y se formatea el nombre (capitalizado)
-    month_name = month_names.get(current_month, '')
+    pool = get_render_pool(workers)
+    template_path = os.path.abspath(template_path)
+    # Los documentos se envían por ventanas para que la memoria no crezca con el tamaño del mes cuando el
+    # consumidor (por ejemplo, una descarga en streaming) es más lento que los procesos
+    window = workers * RENDER_WINDOW_PER_WORKER
+    try:
+        for start in range(0, len(jobs), window):
+            chunk = jobs[start:start + window]
+            yield from pool.map(render_batch, repeat(template_path), [job.values for job in chunk], [job.participants for job in chunk], chunksize=max(1, len(chunk) // (workers * 2)))
+    except BrokenProcessPool as e:
+        with _render_pool_lock:
+            if _render_pools.get(workers) is pool:
+                del _render_pools[workers] # Se crea uno nuevo en la siguiente generación
+        raise GenerationError(f"Error en los procesos de generación de documentos: {e}")
 
-    # Verifica que las columnas esenciales existan en ambos Dataframes
-    required_columns = {'ID_CURSO', 'MES_PROGRAMADO', 'FECHA_INICIO', 'FECHA_TERMINO', 'ID_ACTIVIDAD'}
-    if not required_columns.issubset(df_courses.columns) or not required_columns.issubset(df_participants.columns):
-        print("Error: El archivo o algunas de las hojas no contiene las columnas necesarias: ID_CURSO, MES_PROGRAMADO, FECHA_INICIO, FECHA_TERMINO")
-        exit()
-
-    # Se unen los datos de cursos y participantes basándose en 'ID_CURSO'
-    df_complete = pd.merge(df_courses, df_participants, on='ID_CURSO', how='left')
-    # Se renombran las columnas duplicadas para su posterior uso a la hora de filtrar a los participantes por mes y fechas
-    df_complete.rename(columns={'MES_PROGRAMADO_x': 'MES_PROGRAMADO_COUR', 'MES_PROGRAMADO_y': 'MES_PROGRAMADO_PART'}, inplace=True)
-    df_complete.rename(columns={'FECHA_INICIO_x': 'FECHA_INICIO_COUR', 'FECHA_INICIO_y': 'FECHA_INICIO_PART'}, inplace=True)
-    df_complete.rename(columns={'FECHA_TERMINO_x': 'FECHA_TERMINO_COUR', 'FECHA_TERMINO_y': 'FECHA_TERMINO_PART'}, inplace=True)
-    df_complete.rename(columns={'ID_ACTIVIDAD_x': 'ID_ACTIVIDAD_COUR', 'ID_ACTIVIDAD_y': 'ID_ACTIVIDAD_PART'}, inplace=True)
-    # print(df_complete.columns) ---- Se imprimen las columnas del Dataframe resultante de la unión de la tabla de los cursos y los participantes
+#=======================================================================================================
+# Función: check_template
+# Objetivo: Verificar que exista la plantilla de Word y compilarla (solo se interpreta la primera vez o
+#           si cambió).
+#=======================================================================================================
+def check_template(template_path):
+    if not os.path.exists(template_path):
+        raise GenerationError("Error: No se encontró el documento base de Word.")
+    try:
+        get_compiled_template(template_path)
+    except Exception as e:
+        raise GenerationError(f"Error al abrir el documento Word: {e}")
 
-    # Filtra los cursos que corresponden al mes a procesar
-    df_filtered = df_courses.loc[df_courses['MES_PROGRAMADO'] == current_month]
+#=======================================================================================================
+# Función: plan_month
+# Objetivo: Preparar el resultado y la lista de documentos de un mes a partir de sus cursos y de los
+#           participantes (de ese mes o de la hoja completa).
+#=======================================================================================================
+def plan_month(month, df_filtered, df_participants, timings=None):
+    result = GenerationResult(month=month, month_name=MONTH_NAMES[month], timings=timings if timings is not None else {})
+    result.total_courses = len(df_filtered)
+    if df_filtered.empty:
+        return result, []
+
+    # Índice de participantes del mes agrupados por curso
+    with timed(result.timings, "merge"):
+        participant_index = build_participant_index(df_participants, month)
+
+    # Lista ordenada de documentos a construir (un documento por lote de 10 participantes)
+    with timed(result.timings, "participant_lookup"):
+        return result, build_document_jobs(df_filtered, participant_index, result)
 
-    # Inicialización de contadores para reportar el resultado final
-    total_docs_generated = 0
-    courses_without_participants = 0
+#=======================================================================================================
+# Función: prepare_generation
+# Objetivo: Leer el archivo de datos, compilar la plantilla y preparar la lista de documentos del mes.
+#           Lanza GenerationError antes de construir cualquier documento si algo impide la generación.
+#=======================================================================================================
+def prepare_generation(month, excel_path, template_path):
+    timings = {}
+    with timed(timings, "excel_read"):
+        df_courses, df_participants = load_workbook(excel_path)
+    with timed(timings, "template_load"):
+        check_template(template_path)
 
-    # Se crea una lista para almacenar las rutas de los reportes generados
-    reports_generated = []
-    zip_filename = None # Se inicializa la variable para evitar UnboundLocalError (Cuando se usa una variable antes de asignarle un valor)
+    # Se obtiene el mes seleccionado o el actual (1 = Enero, 2 = Febrero, etc...)
+    current_month = resolve_month(month)
 
+    # Filtra los cursos que corresponden al mes a procesar
+    with timed(timings, "merge"):
+        df_filtered = df_courses.loc[df_courses['MES_PROGRAMADO'] == current_month]
+    result, jobs = plan_month(current_month, df_filtered, df_participants, timings)
     if df_filtered.empty:
         print("No hay cursos disponibles para este mes")
-    else:
-        # Se crea un directorio temporal donde se guardarán los reportes generados
-        with tempfile.TemporaryDirectory() as temp_dir:
-            print(f"Directorio temporal creado: {temp_dir}")
-
-            # Se itera sobre cada curso filtrado
-            for index, row in df_filtered.iterrows():
-                # Se obtienen los participantes del curso actual y así tambien solo los que esten en el curso del mes actual junto con sus fechas correspondientes
-                participants = df_complete.loc[(df_complete['ID_CURSO'] == row['ID_CURSO']) 
-                                               & (df_complete['MES_PROGRAMADO_PART'] == current_month)
-                                               & (df_complete['FECHA_INICIO_PART'] == row['FECHA_INICIO']) 
-                                               & (df_complete['FECHA_TERMINO_PART'] == row['FECHA_TERMINO'])
-                                               & (df_complete['ID_ACTIVIDAD_PART'] == row['ID_ACTIVIDAD'])]
-                
-                # Convierte la información de los participantes a una lista de diccionarios y elimina duplicados
-                participants_list = participants[['RPE', 'NOMBRE_COMPLETO', 'SEXO_TRAB']].fillna('').drop_duplicates(subset=['RPE', 'NOMBRE_COMPLETO']).to_dict('records')
-                # print(participants_list) ---- Se imprime la lista de diccionarios de los participantes
-
-                # Se calcula el número de lotes los cuales se dividen por 10 participantes en cada uno
-                num_batches = (len(participants_list) // 10) + (1 if len(participants_list) % 10 else 0)
-                # Se itera sobre cada lote
-                for batch in range(num_batches):
-                    try:
-                        # Se carga la plantilla de Word para el reporte
-                        doc = Document('FORMATO_WORD.docx')
-                    except FileNotFoundError:
-                        print("Error: No se encontró el documento base de Word.")
-                        exit()
-                    except Exception as e:
-                        print(f"Error al abrir el documento Word: {e}")
-                        exit()
-
-                    try:
-                        # Se reemplazan los marcadores en la plantilla por los datos del curso
-                        replace_mark(doc, "[NOMBRE_CURSO]", row['NOMBRE_CURSO'])
-                        replace_mark(doc, "[FECHA_INICIO]", row['FECHA_INICIO'])
-                        replace_mark(doc, "[FECHA_TERMINO]", row['FECHA_TERMINO'])
-                    except Exception as e:
-                        print(f"Error al reemplazar los marcadores en el documentos Word: {e}")
-                        continue
-
-                    # Se agregan los participantes a la tabla del documento
-                    if participants_list:
-                        batch_participants = participants_list[batch * 10:(batch + 1) * 10]
-                        try:
-                            add_participants(doc, batch_participants)
-                        except Exception as e:
-                            print(f"Error al agregar a los participantes en el documento Word: {e}")
-                            continue
+    elif not jobs:
+        raise GenerationError("No existen documentos generados para comprimir")
+    return result, jobs
+
+#=======================================================================================================
+# Función: prepare_period
+# Objetivo: Preparar varios meses en una sola pasada: el archivo de datos y la plantilla se leen una
+#           sola vez y los cursos y participantes se reparten por MES_PROGRAMADO con un solo groupby.
+#           Devuelve el PeriodResult (con el resultado de cada mes) y la lista de (resultado, documentos).
+#=======================================================================================================
+def prepare_period(months, excel_path, template_path):
+    timings = {}
+    with timed(timings, "excel_read"):
+        df_courses, df_participants = load_workbook(excel_path)
+    with timed(timings, "template_load"):
+        check_template(template_path)
+
+    months = resolve_months(months)
+    with timed(timings, "merge"):
+        courses_by_month = dict(tuple(df_courses.loc[df_courses['MES_PROGRAMADO'].isin(months)].groupby('MES_PROGRAMADO', sort=False)))
+        participants_by_month = dict(tuple(df_participants.loc[df_participants['MES_PROGRAMADO'].isin(months)].groupby('MES_PROGRAMADO', sort=False)))
+
+    period = PeriodResult(months=months, label=period_label(months), timings=timings)
+    plan = []
+    for month in months:
+        result, jobs = plan_month(month, courses_by_month.get(month, df_courses.iloc[0:0]), participants_by_month.get(month, df_participants.iloc[0:0]))
+        period.results.append(result)
+        plan.append((result, jobs))
+    return period, plan
+
+#=======================================================================================================
+# Función: preview_reports
+# Objetivo: Vista previa de uno o varios meses sin construir ningún documento, a partir de las hojas ya
+#           interpretadas (caché del archivo Excel): cursos de cada mes con sus participantes y lotes,
+#           cursos sin participantes, documentos y tamaño estimado del ZIP. Los participantes se cuentan
+#           con las mismas reglas que la generación (sin duplicados por curso) con un solo groupby para
+#           todos los meses. El tamaño de cada documento es el promedio del historial o, si aún no hay,
+#           ESTIMATED_DOCUMENT_BYTES. Con `courses=False` se omite la lista de cursos de cada mes.
+#=======================================================================================================
+def preview_reports(months=None, excel_path=EXCEL_PATH, historial_dir=HISTORIAL_DIR, courses=True):
+    # Un solo mes (o ninguno: el mes actual) se interpreta igual que en generate_reports
+    months = [resolve_month(months)] if months is None or isinstance(months, int) else resolve_months(months)
+    df_courses, df_participants = load_workbook(excel_path)
+    document_bytes = None
+    if historial_dir and os.path.isdir(historial_dir):
+        with HistorialStore(historial_dir) as store:
+            document_bytes = store.average_size()
+    document_bytes = round(document_bytes or ESTIMATED_DOCUMENT_BYTES)
+
+    # Participantes distintos (RPE y nombre) por mes y curso, como en build_participant_index
+    df = df_participants.loc[df_participants['MES_PROGRAMADO'].isin(months), ['MES_PROGRAMADO'] + PARTICIPANT_KEY + ['RPE', 'NOMBRE_COMPLETO']]
+    df = df.dropna(subset=PARTICIPANT_KEY).drop_duplicates()
+    counts = df.groupby(['MES_PROGRAMADO'] + PARTICIPANT_KEY, sort=False, observed=True).size().to_dict()
+
+    previews = {month: {
+        "month": month,
+        "month_name": MONTH_NAMES[month],
+        "total_courses": 0,
+        "total_docs": 0,
+        "participants": 0,
+        "courses": [],
+        "empty_courses": [],
+        "estimated_bytes": ZIP_END_BYTES
+    } for month in months}
+    df = df_courses.loc[df_courses['MES_PROGRAMADO'].isin(months), ['MES_PROGRAMADO', 'NOMBRE_CURSO'] + PARTICIPANT_KEY]
+    columns = [df[column].tolist() for column in df.columns]
+    for month, name, *key in zip(*columns):
+        preview = previews[month]
+        participants = counts.get((month, *key), 0)
+        batches = -(-participants // BATCH_SIZE)
+        preview["total_courses"] += 1
+        preview["total_docs"] += batches
+        preview["participants"] += participants
+        if not participants:
+            preview["empty_courses"].append(str(name))
+        if courses:
+            preview["courses"].append({
+                "course": str(name),
+                "start_date": str(key[1]),
+                "end_date": str(key[2]),
+                "activity": str(key[3]),
+                "participants": participants,
+                "batches": batches
+            })
+        # Cada documento ocupa su contenido más los encabezados con su nombre (dos veces) dentro del ZIP
+        row = {"NOMBRE_CURSO": str(name), "FECHA_INICIO": key[1], "FECHA_TERMINO": key[2], "ID_ACTIVIDAD": key[3]}
+        name_bytes = len(report_file_name(row, 0).encode('utf-8'))
+        preview["estimated_bytes"] += batches * (document_bytes + ZIP_ENTRY_BYTES + 2 * name_bytes)
+
+    results = [previews[month] for month in months]
+    estimated_bytes = 0
+    for preview in results:
+        if not courses:
+            del preview["courses"]
+        if not preview["total_docs"]:
+            preview["estimated_bytes"] = 0 # No se genera ZIP
+            continue
+        estimated_bytes += preview["estimated_bytes"] - ZIP_END_BYTES
+        if len(months) > 1:
+            # En el ZIP de varios meses cada nombre lleva además la carpeta del mes
+            estimated_bytes += 2 * len(f"{preview['month_name']}/".encode('utf-8')) * preview["total_docs"]
+    return {
+        "month": period_label(months),
+        "months": results,
+        "total_courses": sum(preview["total_courses"] for preview in results),
+        "total_docs": sum(preview["total_docs"] for preview in results),
+        "courses_without_participants": sum(len(preview["empty_courses"]) for preview in results),
+        "document_bytes": document_bytes,
+        "estimated_bytes": estimated_bytes + ZIP_END_BYTES if estimated_bytes else 0
+    }
+
+#=======================================================================================================
+# Función: iter_rendered_documents
+# Objetivo: Devolver uno a uno los documentos del mes como (nombre, contenido en bytes), ya registrados
+#           en el historial. La generación es incremental: cada documento tiene una huella de sus datos
+#           (curso, fechas, participantes del lote y plantilla) guardada en el índice del historial; si la
+#           huella no cambió desde la última ejecución se reutiliza el archivo del historial y solo se
+#           construyen los documentos nuevos o modificados. Los documentos del mes que ya no corresponden
+#           a los datos se eliminan. El contenido se mantiene en memoria: se escribe una sola vez en el
+#           historial y el llamador lo agrega directamente al ZIP. `progress(hechos, total, curso)` se
+#           llama después de cada documento.
+#=======================================================================================================
+def iter_rendered_documents(result, jobs, template_path, historial_dir, workers, progress=None):
+    timings = result.timings
+    template_hash = file_hash(template_path)
+    with HistorialStore(historial_dir) as store:
+        with timed(timings, "fingerprint"):
+            # Solo se comparan los documentos del mismo mes y de los años de los cursos actuales
+            previous = store.month_fingerprints(result.month, {job.values[1][:4] for job in jobs})
+            fingerprints = [job.fingerprint(template_hash) for job in jobs]
+            reusable = [previous.get(job.file_name) == fingerprint and store.exists(job.file_name) for job, fingerprint in zip(jobs, fingerprints)]
+
+        # Solo se construyen los documentos que cambiaron; los resultados llegan en el mismo orden
+        rendered = render_documents(template_path, [job for job, reuse in zip(jobs, reusable) if not reuse], workers, timings)
+
+        # Los documentos guardados se registran por lotes: entre un lote y otro el índice queda libre, y
+        # si el consumidor se detiene (p. ej. una descarga cancelada) se registran los ya guardados
+        pending = []
+        try:
+            for done, (job, fingerprint, reuse) in enumerate(zip(jobs, fingerprints, reusable), start=1):
+                # Se informa el avance (documentos procesados / total y curso actual) a quien lo solicite
+                if progress:
+                    progress(done, len(jobs), job.course)
+                try:
+                    if reuse:
+                        with timed(timings, "historial_read"):
+                            content = store.read(job.file_name)
+                        result.reused += 1
                     else:
-                        print(f"No hay participantes inscritos en el curso {row['NOMBRE_CURSO']}")
-                        courses_without_participants += 1
-
-                    # Genera un nombre de archivo seguro para el reporte y lo guarda en el directorio temporal
-                    file_name = os.path.join(temp_dir, f'{row["NOMBRE_CURSO"].replace("/", "_").replace(" ", "_")}_'f'{row["FECHA_INICIO"]}_'f'{row["FECHA_TERMINO"]}_L{batch + 1}_'f'{row["ID_ACTIVIDAD"]}.docx')
-                    try:    
-                        doc.save(file_name)
-                        # print(f"Documento generado: {file_name}") ---- Se imprime el documento generado en la iteración
-                        reports_generated.append(file_name)
-                        total_docs_generated += 1
-                        # Se copia el documento al historial (queda registrado permanentemente)
-                        historial_path = os.path.join(HISTORIAL_DIR, os.path.basename(file_name))
-                        shutil.copy(file_name, historial_path)
-                    except Exception as e:
-                        print(f"Error al guardar el documento: {e}")
-
-            try:
-                if not reports_generated:
-                    print(reports_generated)
-                    error_message = "No existen documentos generados para comprimir"
-                    print(error_message, flush=True)
-                    sys.exit(1)
-                # Se empaquetan todos los reportes generados en un archivo ZIP
-                zip_filename = os.path.abspath(os.path.join(os.getcwd(), f"Reportes_{month_name}.zip"))
-                with zipfile.ZipFile(zip_filename, "w", zipfile.ZIP_DEFLATED) as zipf:
-                    for report in reports_generated:
-                        try:
-                            zipf.write(report, arcname=os.path.basename(report))
-                            # print(f"Agregado al ZIP: {os.path.basename(report)}") ---- Imprime los archivos que se almacenan en el .zip
-                        except FileNotFoundError:
-                            print(f"Error: No se encontró el archivo {report}. No sera incluido en el ZIP.")
-                        except Exception as e:
-                            print(f"Error al agregar {report} al zip: {e}")
-                print("Archivo ZIP creado exitosamente");
-            except ValueError as ve:
-                print(f"Advertencia: {ve}")
-            except Exception as e:
-                print(f"Error inesperado al crear el archivo ZIP: {e}")
-
-            # Mensaje final de resumen
-            print("\n--- Resumen de generación de reportes ---")
-            print(f"Mes procesado: {month_name}")
-            print(f"Total de documentos generados: {total_docs_generated}")
-            print(f"Cursos sin participantes: {courses_without_participants}")
-
-            return zip_filename
+                        with timed(timings, "render"):
+                            content, error = next(rendered)
+                        if error:
+                            result.errors.append({"course": job.course, "batch": job.batch, "error": f"Error al construir el documento Word: {error}"})
+                            continue
+                        # Se guarda el documento en el historial (queda registrado permanentemente)
+                        with timed(timings, "save"):
+                            content_hash = store.save(content)
+                            pending.append((job.file_name, result.month, job.course, job.values[1], job.values[2], job.activity, job.batch, fingerprint, len(content), content_hash))
+                            if len(pending) >= HISTORIAL_RECORD_BATCH:
+                                store.record_many(pending)
+                                pending = []
+                        result.historial_added.append(job.file_name)
+                        result.rendered += 1
+                except OSError as e:
+                    result.errors.append({"course": job.course, "batch": job.batch, "error": f"Error al guardar el documento: {e}"})
+                    continue
+                result.total_docs_generated += 1
+                result.document_bytes += len(content)
+                yield job.file_name, content
+        finally:
+            if pending:
+                with timed(timings, "save"):
+                    store.record_many(pending)
+
+        # Se eliminan los documentos del mes (y de los mismos años) que ya no se generan con los datos actuales
+        current = {job.file_name for job in jobs}
+        result.historial_removed = [name for name in previous if name not in current]
+        result.removed = store.remove(result.historial_removed)
+
+#=======================================================================================================
+# Función: generate_reports
+# Objetivo: Generar los reportes a partir de los datos de un archivo Excel,
+#           reemplazar marcadores en una plantilla Word, agregar participantes,
+#           y empaquetar los reportes generados en un archivo ZIP.
+#           Se importa desde app.py y se ejecuta dentro del mismo proceso; devuelve un GenerationResult
+#           y lanza GenerationError cuando la generación no puede continuar. Con workers > 1 los
+#           documentos se construyen en paralelo (variable de entorno GENERATOR_WORKERS).
+#           `progress(hechos, total, curso)` permite seguir el avance desde otro hilo.
+#=======================================================================================================
+def generate_reports(month=None, excel_path=EXCEL_PATH, template_path=TEMPLATE_PATH, output_dir=None, historial_dir=HISTORIAL_DIR, workers=RENDER_WORKERS, progress=None):
+    result, jobs = prepare_generation(month, excel_path, template_path)
+    if not jobs:
+        return result
+
+    # Cada documento se escribe en el ZIP en cuanto se construye; el ZIP se arma con un nombre temporal
+    # y se renombra al final para que nunca se descargue a medio escribir
+    output_dir = output_dir or os.getcwd()
+    zip_filename = os.path.abspath(os.path.join(output_dir, f"Reportes_{result.month_name}.zip"))
+    tmp_filename = f"{zip_filename}.{os.getpid()}.tmp"
+    try:
+        with zipfile.ZipFile(tmp_filename, "w", zipfile.ZIP_DEFLATED) as zipf:
+            for file_name, content in iter_rendered_documents(result, jobs, template_path, historial_dir, workers, progress):
+                with timed(result.timings, "zip"):
+                    zipf.writestr(file_name, content)
+        if not result.total_docs_generated:
+            raise GenerationError("No existen documentos generados para comprimir")
+        os.replace(tmp_filename, zip_filename)
+    except GenerationError:
+        raise
+    except Exception as e:
+        raise GenerationError(f"Error inesperado al crear el archivo ZIP: {e}")
+    finally:
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+    result.zip_path = zip_filename
+    record_metrics(result, zip_filename)
+    return result
+
+#=======================================================================================================
+# Función: generate_period_reports
+# Objetivo: Generar los reportes de varios meses (p. ej. un trimestre o el año completo) en una sola
+#           ejecución y empaquetarlos en un solo ZIP con una carpeta por mes. Los datos y la plantilla se
+#           preparan una sola vez; cada mes conserva su generación incremental en el historial. Devuelve
+#           un PeriodResult; `progress(hechos, total, curso)` cuenta los documentos de todo el periodo.
+#=======================================================================================================
+def generate_period_reports(months, excel_path=EXCEL_PATH, template_path=TEMPLATE_PATH, output_dir=None, historial_dir=HISTORIAL_DIR, workers=RENDER_WORKERS, progress=None):
+    period, plan = prepare_period(months, excel_path, template_path)
+    if not period.total_courses:
+        print("No hay cursos disponibles para los meses seleccionados")
+        return period
+
+    total = sum(len(jobs) for _, jobs in plan)
+    output_dir = output_dir or os.getcwd()
+    zip_filename = os.path.abspath(os.path.join(output_dir, f"Reportes_{period.label}.zip"))
+    tmp_filename = f"{zip_filename}.{os.getpid()}.tmp"
+    try:
+        with zipfile.ZipFile(tmp_filename, "w", zipfile.ZIP_DEFLATED) as zipf:
+            offset = 0
+            for result, jobs in plan:
+                # Los meses sin documentos no se procesan para no eliminar su historial
+                if not jobs:
+                    continue
+                month_progress = (lambda done, _, course, offset=offset: progress(offset + done, total, course)) if progress else None
+                for file_name, content in iter_rendered_documents(result, jobs, template_path, historial_dir, workers, month_progress):
+                    with timed(result.timings, "zip"):
+                        zipf.writestr(f"{result.month_name}/{file_name}", content)
+                offset += len(jobs)
+        if not period.total_docs_generated:
+            raise GenerationError("No existen documentos generados para comprimir")
+        os.replace(tmp_filename, zip_filename)
+    except GenerationError:
+        raise
+    except Exception as e:
+        raise GenerationError(f"Error inesperado al crear el archivo ZIP: {e}")
+    finally:
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+    period.zip_path = zip_filename
+    record_metrics(period, zip_filename)
+    return period
+
+#=======================================================================================================
+# Función: record_metrics
+# Objetivo: Registrar en las métricas del proceso los tiempos por etapa, los documentos y los bytes de
+#           una generación terminada (GenerationResult o PeriodResult).
+#=======================================================================================================
+def record_metrics(result, zip_path=None):
+    results = result.results if isinstance(result, PeriodResult) else [result]
+    stage_timings = [result.timings] if isinstance(result, PeriodResult) else []
+    for stage_seconds in stage_timings + [month_result.timings for month_result in results]:
+        for stage, seconds in stage_seconds.items():
+            STAGE_SECONDS.observe(seconds, stage=stage)
+    for month_result in results:
+        DOCUMENTS.inc(month_result.rendered, kind="rendered")
+        DOCUMENTS.inc(month_result.reused, kind="reused")
+        DOCUMENT_BYTES.inc(month_result.document_bytes)
+    if zip_path and os.path.exists(zip_path):
+        ZIP_BYTES.inc(os.path.getsize(zip_path))
+
+#=======================================================================================================
+# Clase: _ChunkBuffer
+# Objetivo: Destino de escritura para zipfile que solo acumula los bytes escritos hasta que se
+#           entregan al cliente. Al no ser "seekable", zipfile escribe el ZIP en modo streaming.
+#=======================================================================================================
+class _ChunkBuffer:
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+#=======================================================================================================
+# Función: stream_reports
+# Objetivo: Variante de generate_reports para descargas en streaming: prepara la generación (los errores
+#           se lanzan antes de enviar cualquier byte) y devuelve el resultado junto con un iterador que
+#           produce el ZIP por partes mientras los documentos se construyen. La memoria usada se limita
+#           al documento en curso y a la ventana de documentos en vuelo.
+#=======================================================================================================
+def stream_reports(month=None, excel_path=EXCEL_PATH, template_path=TEMPLATE_PATH, historial_dir=HISTORIAL_DIR, workers=RENDER_WORKERS, progress=None):
+    result, jobs = prepare_generation(month, excel_path, template_path)
+
+    def chunks():
+        buffer = _ChunkBuffer()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zipf:
+            for file_name, content in iter_rendered_documents(result, jobs, template_path, historial_dir, workers, progress):
+                with timed(result.timings, "zip"):
+                    zipf.writestr(file_name, content)
+                yield buffer.drain()
+        # Directorio central del ZIP
+        yield buffer.drain()
+        record_metrics(result)
+
+    return result, chunks()
 
 if __name__ == '__main__':
-    # print("Working directory:", os.getcwd()) ---- Imprime el directorio actual en el que se trabaja
+    # Se mantiene el uso desde consola: python generator.py <mes>
+    # Varios meses: python generator.py 1,2,3 | 1-3 | year
+    # Vista previa sin construir documentos: python generator.py --preview [meses]
+    preview = len(sys.argv) > 1 and sys.argv[1] == '--preview'
+    args = sys.argv[2:] if preview else sys.argv[1:]
+    selection = args[0] if args else None
+    if preview:
+        try:
+            summary = preview_reports(int(selection) if selection and selection.strip().isdigit() else selection, courses=False)
+        except GenerationError as e:
+            print(e, flush=True)
+            sys.exit(1)
+        print("\n--- Vista previa de la generación de reportes ---")
+        for month in summary["months"]:
+            print(f"{month['month_name']}: {month['total_courses']} cursos, {month['total_docs']} documentos, {len(month['empty_courses'])} cursos sin participantes, ZIP estimado de {month['estimated_bytes'] / 1024 / 1024:.1f} MB")
+        sys.exit(0)
+    try:
+        if selection and not selection.strip().isdigit():
+            period = generate_period_reports(selection)
+        else:
+            period = None
+            result = generate_reports(selection)
+    except GenerationError as e:
+        print(e, flush=True)
+        sys.exit(1)
 
-    zip_file = generate_reports()
-    if zip_file:
-        print(f"ZIP generado: {zip_file}") # Ruta completa de la ubicación del .zip
+    # Mensaje final de resumen
+    print("\n--- Resumen de generación de reportes ---")
+    for result in (period.results if period else [result]):
+        print(f"Mes procesado: {result.month_name}")
+        print(f"Total de documentos generados: {result.total_docs_generated}")
+        print(f"Documentos construidos: {result.rendered} | reutilizados: {result.reused} | eliminados: {result.removed}")
+        print(f"Cursos sin participantes: {len(result.courses_without_participants)}")
+    zip_path = period.zip_path if period else result.zip_path
+    if zip_path:
+        print(f"ZIP generado: {zip_path}") # Ruta completa de la ubicación del .zip
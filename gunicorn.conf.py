@@ -0,0 +1,16 @@
+import os # Valores configurables desde variables de entorno
+
+# =====================================================================================================
+# Configuración de gunicorn (se carga sola al ejecutar `gunicorn wsgi:app` desde este directorio)
+# Objetivo: Usar workers con hilos. Cada conexión a /events queda abierta hasta STREAM_MAX_SECONDS
+# (events.py); con workers síncronos una sola conexión ocuparía el worker completo y las demás
+# solicitudes esperarían. Con hilos, las conexiones de eventos y las solicitudes normales se atienden
+# al mismo tiempo dentro de cada worker.
+# =====================================================================================================
+worker_class = "gthread"
+workers = int(os.environ.get("WEB_CONCURRENCY", "1"))
+# Hilos por worker: cada pestaña abierta ocupa uno con su conexión de eventos
+threads = int(os.environ.get("GUNICORN_THREADS", "16"))
+# La generación corre en segundo plano (jobs.py), pero subir y validar un archivo grande puede tardar
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "120"))
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
@@ -0,0 +1,155 @@
+import os # Manejo de rutas y archivos
+import io # Documentos Word en memoria
+import json # Manifiesto de las partes de cada documento archivado
+import hashlib # Hash del contenido de cada documento y de cada parte
+import zipfile # Un .docx es un ZIP; los archivos mensuales también
+
+# Subdirectorios (ocultos) dentro del directorio del historial
+BLOBS_DIR = ".blobs" # Documentos sueltos, uno por contenido distinto
+ARCHIVES_DIR = ".archivos" # Un archivo comprimido por año y mes
+
+#=================================================================================================
+# Clase: BlobStore
+# Objetivo: Almacén de los documentos del historial direccionado por contenido: cada documento se
+#           guarda una sola vez con el SHA-256 de su contenido como nombre, sin importar cuántos
+#           nombres de reporte lo usen (el índice de HistorialStore relaciona nombre y hash).
+#           Los meses antiguos se compactan en un archivo ZIP por año y mes. Dentro del archivo cada
+#           documento se separa en sus partes (document.xml, estilos, imágenes...) y cada parte
+#           distinta se guarda una sola vez, así las partes que todos los reportes comparten con la
+#           plantilla ocupan espacio una sola vez por mes. Un documento se reconstruye leyendo solo sus
+#           partes, sin descomprimir el archivo completo.
+#=================================================================================================
+class BlobStore:
+    def __init__(self, historial_dir):
+        self.blobs_dir = os.path.join(historial_dir, BLOBS_DIR)
+        self.archives_dir = os.path.join(historial_dir, ARCHIVES_DIR)
+
+    def _path(self, digest):
+        return os.path.join(self.blobs_dir, digest[:2], f"{digest}.docx")
+
+    def archive_path(self, archive):
+        return os.path.join(self.archives_dir, archive)
+
+    #=============================================================================================
+    # Método: put
+    # Objetivo: Guardar el contenido (si no existe ya) y devolver su hash.
+    #=============================================================================================
+    def put(self, content):
+        digest = hashlib.sha256(content).hexdigest()
+        path = self._path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        return digest
+
+    def exists(self, digest):
+        return os.path.exists(self._path(digest))
+
+    # Contenido de un documento suelto (FileNotFoundError si ya no está suelto)
+    def read(self, digest):
+        with open(self._path(digest), 'rb') as f:
+            return f.read()
+
+    def delete(self, digest):
+        try:
+            os.remove(self._path(digest))
+        except FileNotFoundError:
+            pass
+
+    # Bytes ocupados por los documentos sueltos y por los archivos mensuales
+    def disk_usage(self):
+        usage = {"loose": 0, "archives": 0}
+        for key, root_dir in (("loose", self.blobs_dir), ("archives", self.archives_dir)):
+            for root, _, files in os.walk(root_dir):
+                usage[key] += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+        return usage
+
+    #=============================================================================================
+    # Método: write_archive
+    # Objetivo: Escribir (o reemplazar) el archivo mensual con los documentos indicados como pares
+    #           (hash, contenido). Cada documento se guarda como un manifiesto de sus partes; si al
+    #           reconstruirlo no se obtiene exactamente el mismo contenido se guarda completo.
+    #=============================================================================================
+    def write_archive(self, archive, documents):
+        os.makedirs(self.archives_dir, exist_ok=True)
+        path = self.archive_path(archive)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        stored_parts = set()
+        try:
+            with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED, compresslevel=9) as archive_zip:
+                for digest, content in documents:
+                    manifest, parts = split_document(content)
+                    if manifest is None or hashlib.sha256(join_document(manifest, parts)).hexdigest() != digest:
+                        # El documento no se puede reconstruir idéntico: se guarda completo (ya viene comprimido)
+                        archive_zip.writestr(f"documentos/{digest}.docx", content, zipfile.ZIP_STORED)
+                        continue
+                    for part_hash, data in parts.items():
+                        if part_hash not in stored_parts:
+                            archive_zip.writestr(f"partes/{part_hash}", data)
+                            stored_parts.add(part_hash)
+                    archive_zip.writestr(f"documentos/{digest}.json", json.dumps(manifest))
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        os.replace(tmp_path, path)
+
+    #=============================================================================================
+    # Método: read_archived
+    # Objetivo: Reconstruir un documento del archivo mensual leyendo solo su manifiesto y sus partes.
+    #           Lanza KeyError si el documento no está en el archivo.
+    #=============================================================================================
+    def read_archived(self, archive, digest):
+        with zipfile.ZipFile(self.archive_path(archive)) as archive_zip:
+            try:
+                manifest = json.loads(archive_zip.read(f"documentos/{digest}.json"))
+            except KeyError:
+                return archive_zip.read(f"documentos/{digest}.docx")
+            parts = {entry["part"]: archive_zip.read(f"partes/{entry['part']}") for entry in manifest}
+        return join_document(manifest, parts)
+
+    def delete_archive(self, archive):
+        try:
+            os.remove(self.archive_path(archive))
+        except FileNotFoundError:
+            pass
+
+#=================================================================================================
+# Función: split_document
+# Objetivo: Separar un .docx en su manifiesto (nombre, fecha, compresión y atributos de cada parte, en
+#           orden) y el contenido de cada parte por su hash. Devuelve (None, None) si no es un ZIP.
+#=================================================================================================
+def split_document(content):
+    try:
+        with zipfile.ZipFile(io.BytesIO(content)) as docx:
+            manifest, parts = [], {}
+            for info in docx.infolist():
+                data = docx.read(info)
+                part_hash = hashlib.sha256(data).hexdigest()
+                parts[part_hash] = data
+                manifest.append({
+                    "name": info.filename,
+                    "date_time": list(info.date_time),
+                    "compress_type": info.compress_type,
+                    "external_attr": info.external_attr,
+                    "part": part_hash
+                })
+    except zipfile.BadZipFile:
+        return None, None
+    return manifest, parts
+
+#=================================================================================================
+# Función: join_document
+# Objetivo: Volver a construir el .docx a partir de su manifiesto y sus partes, de la misma forma en
+#           que lo empaqueta docx_template (mismas fechas, compresión y orden de las partes).
+#=================================================================================================
+def join_document(manifest, parts):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as docx:
+        for entry in manifest:
+            info = zipfile.ZipInfo(entry["name"], date_time=tuple(entry["date_time"]))
+            info.external_attr = entry["external_attr"]
+            docx.writestr(info, parts[entry["part"]], entry["compress_type"])
+    return buffer.getvalue()
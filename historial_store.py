@@ -0,0 +1,340 @@
+import os # Manejo de rutas y archivos
+import sqlite3 # Índice local de los documentos del historial
+import time # Fecha de creación de cada documento
+from datetime import datetime # Interpretación de las fechas de los documentos anteriores al índice
+from historial_blobs import BlobStore # Contenido de los documentos direccionado por hash y archivos mensuales
+
+# Nombre del archivo del índice dentro del directorio del historial (oculto para no listarse como reporte)
+INDEX_FILE = ".historial.sqlite3"
+
+# Columnas por las que se permite ordenar el listado del historial
+SORT_COLUMNS = {'creado', 'nombre', 'curso', 'fecha_inicio', 'mes', 'tamano'}
+
+# Columnas agregadas después de la primera versión del índice (se crean al abrir índices anteriores)
+ADDED_COLUMNS = {'tamano': 'INTEGER', 'creado': 'REAL', 'hash': 'TEXT', 'archivo': 'TEXT'}
+
+# Meses completos que un documento permanece suelto antes de compactarse en el archivo de su mes
+COMPACT_AFTER_MONTHS = int(os.environ.get('HISTORIAL_COMPACT_AFTER_MONTHS', '3'))
+
+# Año del curso (de la fecha de inicio) para agrupar los documentos por año y mes
+YEAR_SQL = "CAST(substr(fecha_inicio, 1, 4) AS INTEGER)"
+
+#=================================================================================================
+# Clase: HistorialStore
+# Objetivo: Índice SQLite de los documentos guardados en un directorio de historial. Por cada
+#           documento se registra el curso, fechas, actividad, lote y mes al que pertenece, junto con
+#           la huella (fingerprint) de los datos con los que se construyó; así una nueva generación
+#           puede reutilizar los documentos cuyos datos no cambiaron. También permite listar el
+#           historial paginado y filtrado, y eliminar documentos por antigüedad o por mes, sin recorrer
+#           el directorio completo. El contenido se guarda en un BlobStore: el índice relaciona cada
+#           nombre con el hash de su contenido y, si ya se compactó, con el archivo de su mes.
+#=================================================================================================
+class HistorialStore:
+    def __init__(self, historial_dir):
+        self.historial_dir = historial_dir
+        self.blobs = BlobStore(historial_dir)
+        os.makedirs(historial_dir, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(historial_dir, INDEX_FILE), timeout=30)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS documentos (
+                nombre TEXT PRIMARY KEY,
+                mes INTEGER NOT NULL,
+                curso TEXT,
+                fecha_inicio TEXT,
+                fecha_termino TEXT,
+                actividad TEXT,
+                lote INTEGER,
+                fingerprint TEXT,
+                tamano INTEGER,
+                creado REAL
+            )
+        """)
+        existing = {row[1] for row in self._conn.execute("PRAGMA table_info(documentos)")}
+        for column, column_type in ADDED_COLUMNS.items():
+            if column not in existing:
+                self._conn.execute(f"ALTER TABLE documentos ADD COLUMN {column} {column_type}")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS documentos_mes ON documentos (mes)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS documentos_creado ON documentos (creado)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS documentos_hash ON documentos (hash)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS documentos_archivo ON documentos (archivo)")
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if exc[0] is None:
+            self._conn.commit()
+        self.close()
+
+    # Ruta de un documento suelto con su nombre (historial anterior al almacén por contenido)
+    def path(self, name):
+        return os.path.join(self.historial_dir, name)
+
+    # Guarda el contenido de un documento en el almacén y devuelve su hash (se registra con `record`)
+    def save(self, content):
+        return self.blobs.put(content)
+
+    #=============================================================================================
+    # Método: read
+    # Objetivo: Devolver el contenido de un documento por su nombre, ya sea suelto o desde el
+    #           archivo de su mes. Lanza FileNotFoundError si el documento no existe.
+    #=============================================================================================
+    def read(self, name):
+        row = self._conn.execute("SELECT hash, archivo FROM documentos WHERE nombre = ?", (name,)).fetchone()
+        if row is None or row[0] is None:
+            if os.path.basename(name) != name or name.startswith('.'):
+                raise FileNotFoundError(f"No se encontró el documento {name}") # Solo archivos del directorio del historial
+            with open(self.path(name), 'rb') as f:
+                return f.read()
+        digest, archive = row
+        if archive is None:
+            try:
+                return self.blobs.read(digest)
+            except FileNotFoundError:
+                # Se compactó mientras tanto: se busca en el archivo de su mes
+                row = self._conn.execute("SELECT archivo FROM documentos WHERE nombre = ?", (name,)).fetchone()
+                if row is None or row[0] is None:
+                    raise
+                archive = row[0]
+        try:
+            return self.blobs.read_archived(archive, digest)
+        except (KeyError, FileNotFoundError):
+            raise FileNotFoundError(f"No se encontró el documento {name} en el archivo {archive}")
+
+    # Indica si el contenido de un documento está disponible (suelto o en el archivo de su mes)
+    def exists(self, name):
+        row = self._conn.execute("SELECT hash, archivo FROM documentos WHERE nombre = ?", (name,)).fetchone()
+        if row is None or row[0] is None:
+            return os.path.exists(self.path(name))
+        if row[1] is not None:
+            return os.path.exists(self.blobs.archive_path(row[1]))
+        return self.blobs.exists(row[0])
+
+    #=============================================================================================
+    # Método: month_fingerprints
+    # Objetivo: Devolver {nombre: fingerprint} de los documentos generados con el índice para un mes
+    #           de los años indicados (año de la fecha de inicio, AAAA); sin años se consideran todos.
+    #           Así una generación solo reutiliza o elimina documentos del mismo año y mes, y el
+    #           historial de años anteriores se conserva. Los registrados por `sync` no tienen huella y
+    #           no se reutilizan ni se eliminan.
+    #=============================================================================================
+    def month_fingerprints(self, month, years=None):
+        sql, params = "SELECT nombre, fingerprint FROM documentos WHERE mes = ? AND fingerprint IS NOT NULL", [month]
+        if years is not None:
+            years = sorted(years)
+            sql += f" AND substr(fecha_inicio, 1, 4) IN ({', '.join('?' * len(years))})"
+            params += years
+        return dict(self._conn.execute(sql, params).fetchall())
+
+    #=============================================================================================
+    # Método: record
+    # Objetivo: Registrar (o actualizar) un documento recién guardado en el historial con el hash
+    #           de su contenido (ver `save`).
+    #=============================================================================================
+    def record(self, name, month, course, start_date, end_date, activity, batch, fingerprint, size, content_hash=None):
+        self.record_many([(name, month, course, start_date, end_date, activity, batch, fingerprint, size, content_hash)])
+
+    #=============================================================================================
+    # Método: record_many
+    # Objetivo: Registrar varios documentos (tuplas con los argumentos de `record`) en una sola
+    #           transacción corta que se confirma de inmediato, para no bloquear el índice a los demás
+    #           procesos mientras continúa la generación.
+    #=============================================================================================
+    def record_many(self, records):
+        now = time.time()
+        replaced = set()
+        with self._conn:
+            for record in records:
+                row = self._conn.execute("SELECT hash, archivo FROM documentos WHERE nombre = ?", (record[0],)).fetchone()
+                if row is not None and row[0] is not None and row[0] != record[9] and row[1] is None:
+                    replaced.add(row[0])
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO documentos (nombre, mes, curso, fecha_inicio, fecha_termino, actividad, lote, fingerprint, tamano, creado, hash, archivo) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, NULL)",
+                [(*record[:9], now, record[9]) for record in records]
+            )
+        # El contenido suelto anterior de los documentos reemplazados se elimina si ya nadie lo usa
+        for digest in replaced:
+            if self._conn.execute("SELECT 1 FROM documentos WHERE hash = ? AND archivo IS NULL LIMIT 1", (digest,)).fetchone() is None:
+                self.blobs.delete(digest)
+
+    # Tamaño promedio en bytes de los documentos del historial (None si aún no hay tamaños registrados)
+    def average_size(self):
+        return self._conn.execute("SELECT AVG(tamano) FROM documentos WHERE tamano > 0").fetchone()[0]
+
+    #=============================================================================================
+    # Método: list
+    # Objetivo: Devolver (total, documentos de la página) del historial aplicando los filtros por mes,
+    #           curso (coincidencia parcial) y rango de fechas de inicio del curso (AAAA-MM-DD).
+    #=============================================================================================
+    def list(self, page=1, per_page=50, sort='creado', order='desc', month=None, course=None, date_from=None, date_to=None):
+        where, params = self._filters(month=month, course=course, date_from=date_from, date_to=date_to)
+        sort = sort if sort in SORT_COLUMNS else 'creado'
+        order = 'ASC' if str(order).lower() == 'asc' else 'DESC'
+        total = self._conn.execute(f"SELECT COUNT(*) FROM documentos {where}", params).fetchone()[0]
+        rows = self._conn.execute(
+            f"SELECT nombre, mes, curso, fecha_inicio, fecha_termino, actividad, lote, tamano, creado FROM documentos {where} ORDER BY {sort} {order}, nombre LIMIT ? OFFSET ?",
+            params + [per_page, (page - 1) * per_page]
+        )
+        columns = ['nombre', 'mes', 'curso', 'fecha_inicio', 'fecha_termino', 'actividad', 'lote', 'tamano', 'creado']
+        return total, [dict(zip(columns, row)) for row in rows]
+
+    #=============================================================================================
+    # Método: remove
+    # Objetivo: Eliminar documentos del historial (registro y contenido). El contenido suelto se
+    #           elimina cuando ningún otro documento suelto lo usa y el archivo de un mes cuando ya no
+    #           tiene documentos. Devuelve cuántos se eliminaron.
+    #=============================================================================================
+    def remove(self, names):
+        names = list(names)
+        hashes, archives = set(), set()
+        for name in names:
+            row = self._conn.execute("SELECT hash, archivo FROM documentos WHERE nombre = ?", (name,)).fetchone()
+            if row is None or row[0] is None:
+                try:
+                    os.remove(self.path(name))
+                except FileNotFoundError:
+                    pass
+                continue
+            hashes.add(row[0])
+            if row[1] is not None:
+                archives.add(row[1])
+        # Los registros se eliminan en un solo lote y se confirman antes de eliminar el contenido
+        with self._conn:
+            self._conn.executemany("DELETE FROM documentos WHERE nombre = ?", [(name,) for name in names])
+        for digest in hashes:
+            if self._conn.execute("SELECT 1 FROM documentos WHERE hash = ? AND archivo IS NULL LIMIT 1", (digest,)).fetchone() is None:
+                self.blobs.delete(digest)
+        for archive in archives:
+            if self._conn.execute("SELECT 1 FROM documentos WHERE archivo = ? LIMIT 1", (archive,)).fetchone() is None:
+                self.blobs.delete_archive(archive)
+        return len(names)
+
+    # Nombres de los documentos generados hace más de `older_than_days` días y/o del mes indicado (sin
+    # filtros, todos); /clean_historial los elimina con `remove`
+    def names_where(self, older_than_days=None, month=None):
+        created_before = time.time() - older_than_days * 86400 if older_than_days is not None else None
+        where, params = self._filters(month=month, created_before=created_before)
+        return [row[0] for row in self._conn.execute(f"SELECT nombre FROM documentos {where}", params)]
+
+    #=============================================================================================
+    # Método: compact
+    # Objetivo: Compactar en un archivo por año y mes los documentos sueltos de los meses con más de
+    #           `after_months` meses de antigüedad. Si el mes ya tenía archivo se vuelve a escribir con
+    #           sus documentos vigentes más los nuevos (así también se descarta lo eliminado). El
+    #           contenido suelto se elimina después de actualizar el índice. Devuelve el número de
+    #           archivos escritos y de documentos compactados.
+    #=============================================================================================
+    def compact(self, after_months=COMPACT_AFTER_MONTHS):
+        today = datetime.now()
+        cutoff = today.year * 12 + today.month - 1 - after_months
+        groups = self._conn.execute(f"""
+            SELECT DISTINCT {YEAR_SQL}, mes FROM documentos
+            WHERE hash IS NOT NULL AND archivo IS NULL AND mes BETWEEN 1 AND 12 AND fecha_inicio GLOB '[0-9][0-9][0-9][0-9]-*'
+        """).fetchall()
+        stats = {"archives": 0, "documents": 0}
+        for year, month in sorted(groups):
+            if year * 12 + month - 1 >= cutoff:
+                continue
+            archive = f"{year}-{month:02d}.zip"
+            rows = self._conn.execute(
+                f"SELECT nombre, hash, archivo FROM documentos WHERE {YEAR_SQL} = ? AND mes = ? AND hash IS NOT NULL AND (archivo IS NULL OR archivo = ?)",
+                (year, month, archive)
+            ).fetchall()
+            sources = {}
+            for _, digest, source in rows:
+                if sources.get(digest) is None:
+                    sources[digest] = source # Si el contenido está suelto se lee de ahí
+            documents = ((digest, self.blobs.read(digest) if source is None else self.blobs.read_archived(archive, digest)) for digest, source in sources.items())
+            try:
+                self.blobs.write_archive(archive, documents)
+            except FileNotFoundError:
+                continue # Otro worker compactó el mismo mes al mismo tiempo
+            # Solo pasan al archivo los documentos cuyo contenido no cambió mientras se escribía (una
+            # generación pudo registrar un hash nuevo con el mismo nombre)
+            switched = set()
+            with self._conn:
+                for name, digest, source in rows:
+                    cursor = self._conn.execute("UPDATE documentos SET archivo = ? WHERE nombre = ? AND hash = ?", (archive, name, digest))
+                    if cursor.rowcount and source is None:
+                        switched.add(digest)
+            if self._conn.execute("SELECT 1 FROM documentos WHERE archivo = ? LIMIT 1", (archive,)).fetchone() is None:
+                self.blobs.delete_archive(archive) # Los documentos se eliminaron mientras se escribía el archivo
+                continue
+            for digest in switched:
+                if self._conn.execute("SELECT 1 FROM documentos WHERE hash = ? AND archivo IS NULL LIMIT 1", (digest,)).fetchone() is None:
+                    self.blobs.delete(digest)
+            stats["archives"] += 1
+            stats["documents"] += len(switched)
+        return stats
+
+    #=============================================================================================
+    # Método: sync
+    # Objetivo: Pasar al almacén por contenido los documentos sueltos del directorio (generados antes
+    #           de que existiera). Los que aún no están en el índice se registran con los datos que se
+    #           pueden obtener de su nombre (<curso>_<inicio>_<termino>_L<lote>_<actividad>.docx).
+    #           Devuelve cuántos se agregaron al índice.
+    #=============================================================================================
+    def sync(self):
+        indexed = {row[0] for row in self._conn.execute("SELECT nombre FROM documentos")}
+        added = 0
+        for entry in os.scandir(self.historial_dir):
+            if entry.name.startswith('.') or not entry.is_file():
+                continue
+            try:
+                with open(entry.path, 'rb') as f:
+                    digest = self.blobs.put(f.read())
+            except FileNotFoundError:
+                continue # Otro worker ya lo pasó al almacén
+            if entry.name not in indexed:
+                course, start_date, end_date, batch, activity = _parse_name(entry.name)
+                try:
+                    month = datetime.fromisoformat(start_date).month
+                except (TypeError, ValueError):
+                    month = 0 # Mes desconocido
+                stat = entry.stat()
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO documentos (nombre, mes, curso, fecha_inicio, fecha_termino, actividad, lote, tamano, creado) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (entry.name, month, course, start_date, end_date, activity, batch, stat.st_size, stat.st_mtime)
+                )
+                added += 1
+            self._conn.execute("UPDATE documentos SET hash = ?, archivo = NULL WHERE nombre = ?", (digest, entry.name))
+            self._conn.commit()
+            os.remove(entry.path)
+        self._conn.commit()
+        return added
+
+    # Construcción de la cláusula WHERE a partir de los filtros indicados
+    def _filters(self, month=None, course=None, date_from=None, date_to=None, created_before=None):
+        clauses, params = [], []
+        if month is not None:
+            clauses.append("mes = ?")
+            params.append(month)
+        if course:
+            clauses.append("curso LIKE ?")
+            params.append(f"%{course}%")
+        if date_from:
+            clauses.append("substr(fecha_inicio, 1, 10) >= ?")
+            params.append(date_from)
+        if date_to:
+            clauses.append("substr(fecha_inicio, 1, 10) <= ?")
+            params.append(date_to)
+        if created_before is not None:
+            clauses.append("creado < ?")
+            params.append(created_before)
+        return ("WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+#=================================================================================================
+# Función: _parse_name
+# Objetivo: Obtener (curso, inicio, termino, lote, actividad) del nombre de un reporte. Si el nombre
+#           no sigue el formato se devuelve solo el nombre como curso.
+#=================================================================================================
+def _parse_name(name):
+    parts = name[:-len('.docx')].rsplit('_', 4) if name.endswith('.docx') else []
+    if len(parts) != 5 or not parts[3].startswith('L') or not parts[3][1:].isdigit():
+        return name, None, None, None, None
+    course, start_date, end_date, batch, activity = parts
+    return course.replace('_', ' '), start_date, end_date, int(batch[1:]), activity
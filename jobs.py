@@ -0,0 +1,197 @@
+import os # Manejo de rutas y archivos
+import json # Estado de los trabajos compartido con los demás workers
+import shutil # Eliminación de los directorios de salida de los trabajos expirados
+import threading # Protección del registro de trabajos entre hilos del servidor
+import time # Marcas de tiempo de creación y finalización de los trabajos
+import uuid # Identificadores únicos de los trabajos
+from concurrent.futures import ThreadPoolExecutor # Grupo acotado de hilos que ejecutan las generaciones
+
+# Estados posibles de un trabajo de generación
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+ERROR = "error"
+
+# Segundos mínimos entre dos avisos de avance de un mismo trabajo (ver JobManager `listener`)
+PROGRESS_NOTIFY_INTERVAL = 0.5
+
+#=================================================================================================
+# Clase: Job
+# Objetivo: Estado de un trabajo de generación: progreso (documentos hechos / total y curso actual),
+#           resultado al terminar o el error que lo detuvo.
+#=================================================================================================
+class Job:
+    def __init__(self, key, base_dir):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.output_dir = os.path.join(base_dir, self.id) # Directorio propio para el ZIP del trabajo
+        self.state = PENDING
+        self.docs_done = 0
+        self.docs_total = 0
+        self.current_course = None
+        self.result = None
+        self.error = None
+        self.details = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.listener = None # Función que se llama cuando el trabajo cambia (ver JobManager)
+        self._notified_at = 0.0
+
+    # Callback de progreso que recibe el motor de generación después de cada documento
+    def progress(self, done, total, course):
+        self.docs_done = done
+        self.docs_total = total
+        self.current_course = course
+        # El avance se informa como máximo cada PROGRESS_NOTIFY_INTERVAL segundos (y siempre el último documento)
+        now = time.monotonic()
+        if self.listener and (done == total or now - self._notified_at >= PROGRESS_NOTIFY_INTERVAL):
+            self._notified_at = now
+            self.listener(self)
+
+    # Estado del trabajo en formato diccionario, listo para devolverse como JSON
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "state": self.state,
+            "docs_done": self.docs_done,
+            "docs_total": self.docs_total,
+            "current_course": self.current_course,
+            "error": self.error,
+            "details": self.details
+        }
+
+#=================================================================================================
+# Clase: JobManager
+# Objetivo: Encolar generaciones en un grupo acotado de hilos locales. Las solicitudes idénticas
+#           (misma llave, p. ej. mes + hash del archivo Excel) mientras un trabajo sigue en curso se
+#           unen a ese trabajo en lugar de generar dos veces. Los trabajos terminados se conservan
+#           durante `ttl` segundos para consultar su resultado y descargar el ZIP. `listener(trabajo)`
+#           se llama al iniciar y terminar cada trabajo y durante su avance. El estado de cada trabajo
+#           también se escribe en `base_dir/<id>.json`, así cualquier worker de gunicorn puede
+#           consultarlo aunque el trabajo se ejecute en otro.
+#=================================================================================================
+class JobManager:
+    def __init__(self, base_dir, max_workers=2, ttl=1800, listener=None):
+        self.base_dir = base_dir
+        self.ttl = ttl
+        self.listener = listener
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="generacion")
+        self._jobs = {}
+        self._active_by_key = {}
+        self._lock = threading.Lock()
+
+    #=============================================================================================
+    # Método: submit
+    # Objetivo: Encolar `func(job)` bajo la llave indicada. Devuelve (trabajo, unido) donde `unido`
+    #           indica si la solicitud se agregó a un trabajo idéntico que ya estaba en curso.
+    #=============================================================================================
+    def submit(self, key, func):
+        self._purge_expired()
+        with self._lock:
+            active = self._active_by_key.get(key)
+            if active is not None:
+                return active, True
+            job = Job(key, self.base_dir)
+            job.listener = self._notify
+            self._jobs[job.id] = job
+            self._active_by_key[key] = job
+        self._notify(job) # El estado pendiente ya se puede consultar desde cualquier worker
+        self._executor.submit(self._run, job, func)
+        return job, False
+
+    # Trabajo local o, si se ejecuta en otro worker, la copia de su último estado guardado (None si no existe)
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+        return job if job is not None else self._load(job_id)
+
+    def _state_path(self, job_id):
+        return os.path.join(self.base_dir, f"{job_id}.json")
+
+    # Escritura atómica del estado del trabajo (incluye el resultado al terminar)
+    def _save(self, job):
+        os.makedirs(self.base_dir, exist_ok=True)
+        path = self._state_path(job.id)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(dict(job.to_dict(), result=job.result, finished_at=job.finished_at), f, ensure_ascii=False, default=str)
+        os.replace(tmp_path, path)
+
+    def _load(self, job_id):
+        # Los identificadores son hexadecimales; cualquier otro valor no es una ruta válida
+        if not job_id or any(c not in '0123456789abcdef' for c in job_id):
+            return None
+        try:
+            with open(self._state_path(job_id), encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        job = Job(None, self.base_dir)
+        job.id = job_id
+        job.output_dir = os.path.join(self.base_dir, job_id)
+        for attribute in ("state", "docs_done", "docs_total", "current_course", "error", "details", "result", "finished_at"):
+            setattr(job, attribute, data.get(attribute))
+        return job
+
+    #=============================================================================================
+    # Método: _run
+    # Objetivo: Ejecutar el trabajo en un hilo del grupo y registrar su resultado o error.
+    #=============================================================================================
+    def _run(self, job, func):
+        job.state = RUNNING
+        self._notify(job)
+        try:
+            os.makedirs(job.output_dir, exist_ok=True)
+            job.result = func(job)
+            job.state = DONE
+        except Exception as e:
+            job.error = "Error al generar los reportes"
+            job.details = str(e)
+            job.state = ERROR
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                if self._active_by_key.get(job.key) is job:
+                    del self._active_by_key[job.key]
+            self._notify(job)
+
+    # Guarda el estado y avisa al listener de un cambio del trabajo; un error de ninguno de los dos afecta al trabajo
+    def _notify(self, job):
+        try:
+            self._save(job)
+        except (OSError, TypeError, ValueError):
+            pass
+        if self.listener:
+            try:
+                self.listener(job)
+            except Exception:
+                pass
+
+    #=============================================================================================
+    # Método: _purge_expired
+    # Objetivo: Olvidar los trabajos terminados hace más de `ttl` segundos y borrar sus archivos. Los
+    #           estados guardados sin cambios en más de `ttl` segundos (p. ej. de un worker que ya no
+    #           existe) también se eliminan.
+    #=============================================================================================
+    def _purge_expired(self):
+        now = time.time()
+        with self._lock:
+            expired = [job for job in self._jobs.values() if job.finished_at and now - job.finished_at > self.ttl]
+            for job in expired:
+                del self._jobs[job.id]
+        for job in expired:
+            shutil.rmtree(job.output_dir, ignore_errors=True)
+            try:
+                os.remove(self._state_path(job.id))
+            except OSError:
+                pass
+        try:
+            entries = list(os.scandir(self.base_dir))
+        except OSError:
+            return
+        for entry in entries:
+            try:
+                if entry.name.endswith('.json') and now - entry.stat().st_mtime > self.ttl:
+                    os.remove(entry.path)
+            except OSError:
+                pass
@@ -0,0 +1,140 @@
+import time # Medición de la duración de las etapas
+import threading # Protección de los valores de las métricas entre hilos del servidor
+from contextlib import contextmanager # Medición de etapas con bloques "with"
+
+# Límites (en segundos) de los intervalos de los histogramas de duración
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+#=================================================================================================
+# Clase: Counter
+# Objetivo: Contador que solo aumenta, con un valor por cada combinación de etiquetas.
+#=================================================================================================
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(label, '')) for label in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    # Líneas del formato de texto de Prometheus
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labels, key)} {_number(value)}" for key, value in values]
+
+#=================================================================================================
+# Clase: Histogram
+# Objetivo: Distribución de valores observados (p. ej. duraciones en segundos) en intervalos
+#           acumulados, con su suma y conteo, por cada combinación de etiquetas.
+#=================================================================================================
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {} # etiquetas -> [conteos por intervalo, suma, conteo]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(label, '')) for label in self.labels)
+        with self._lock:
+            counts, total, count = self._values.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    # Líneas del formato de texto de Prometheus
+    def samples(self):
+        with self._lock:
+            values = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items())
+        lines = []
+        for key, (counts, total, count) in values:
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{_labels(self.labels + ('le',), key + (_number(bound),))} {bucket_count}")
+            lines.append(f"{self.name}_bucket{_labels(self.labels + ('le',), key + ('+Inf',))} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {count}")
+        return lines
+
+#=================================================================================================
+# Clase: Registry
+# Objetivo: Conjunto de métricas del proceso. Cada métrica se registra una sola vez por nombre
+#           (los módulos pueden pedirla de nuevo y reciben la misma instancia). Con varios workers
+#           de gunicorn cada proceso tiene su propio registro.
+#=================================================================================================
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            return metric
+
+    def counter(self, name, documentation, labels=()):
+        return self._register(Counter, name, documentation, labels)
+
+    def histogram(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, documentation, labels, buckets)
+
+    # Todas las métricas en el formato de texto de Prometheus
+    def render(self):
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+# Registro global del proceso
+REGISTRY = Registry()
+
+def counter(name, documentation, labels=()):
+    return REGISTRY.counter(name, documentation, labels)
+
+def histogram(name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+    return REGISTRY.histogram(name, documentation, labels, buckets)
+
+#=================================================================================================
+# Función: timed
+# Objetivo: Sumar la duración (en segundos) del bloque "with" a la etapa indicada del diccionario de
+#           tiempos. Si no se recibe diccionario el bloque se ejecuta sin medir.
+#=================================================================================================
+@contextmanager
+def timed(timings, stage):
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - start
+
+# Etiquetas de una muestra en el formato de Prometheus
+def _labels(names, values):
+    if not names:
+        return ""
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in values)
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+# Número sin decimales innecesarios
+def _number(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
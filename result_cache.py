@@ -0,0 +1,123 @@
+import os # Manejo de rutas y archivos
+import json # Resumen de la generación guardado junto a cada ZIP
+import hashlib # Llave del caché a partir de los hashes del Excel, la plantilla y el mes
+import threading # Protección de la evicción entre hilos del servidor
+import time # Marca de último uso para la política LRU
+
+#=================================================================================================
+# Clase: ResultCache
+# Objetivo: Caché en disco de los ZIP ya generados. Cada entrada se identifica por el contenido del
+#           archivo Excel, el de la plantilla Word y el mes, así que mientras ninguno cambie la misma
+#           solicitud se sirve directamente desde el caché. Se conserva el resumen de la generación en
+#           un archivo .json junto al .zip. Cuando el tamaño total supera `max_bytes` se eliminan las
+#           entradas usadas hace más tiempo (LRU).
+#=================================================================================================
+class ResultCache:
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    # Llave de una entrada: hash de (hash del Excel, hash de la plantilla, mes)
+    @staticmethod
+    def key(workbook_hash, template_hash, month):
+        return hashlib.sha256(f"{workbook_hash}:{template_hash}:{month}".encode()).hexdigest()
+
+    def _zip_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.zip")
+
+    def _meta_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    #=============================================================================================
+    # Método: get
+    # Objetivo: Devolver (ruta del ZIP, metadatos) de la entrada o None si no existe. Cada acceso
+    #           actualiza su marca de uso para la evicción LRU.
+    #=============================================================================================
+    def get(self, key):
+        zip_path, meta_path = self._zip_path(key), self._meta_path(key)
+        try:
+            with open(meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+            now = time.time()
+            os.utime(zip_path, (now, now))
+        except (OSError, ValueError):
+            return None
+        return zip_path, meta
+
+    #=============================================================================================
+    # Método: put
+    # Objetivo: Mover un ZIP recién generado al caché junto con sus metadatos (se renombra, no se
+    #           copia). Después se descartan las entradas de otras versiones del Excel o de la
+    #           plantilla (salvo con `purge_others=False`) y se aplica la cuota de disco sin eliminar la
+    #           entrada recién guardada, que se descarga enseguida aunque por sí sola supere la cuota.
+    #           Devuelve la ruta final del ZIP.
+    #=============================================================================================
+    def put(self, key, src_path, meta, purge_others=True):
+        zip_path, meta_path = self._zip_path(key), self._meta_path(key)
+        os.replace(src_path, zip_path)
+        tmp_meta = f"{meta_path}.{os.getpid()}.tmp"
+        with open(tmp_meta, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_meta, meta_path)
+        if purge_others:
+            self.purge(lambda other: other.get("workbook_hash") != meta.get("workbook_hash") or other.get("template_hash") != meta.get("template_hash"))
+        self.evict(keep=key)
+        return zip_path
+
+    #=============================================================================================
+    # Método: purge
+    # Objetivo: Eliminar las entradas cuyos metadatos cumplan la condición (todas si no se indica).
+    #=============================================================================================
+    def purge(self, condition=None):
+        with self._lock:
+            for key, meta in self._entries():
+                if condition is None or condition(meta):
+                    self._remove(key)
+
+    # Se eliminan todas las entradas (p. ej. al subir un nuevo archivo Excel)
+    def clear(self):
+        self.purge()
+
+    #=============================================================================================
+    # Método: evict
+    # Objetivo: Eliminar las entradas menos usadas recientemente hasta respetar la cuota de disco. La
+    #           entrada `keep` nunca se elimina (cuenta en el total, así que sale en la siguiente
+    #           evicción si ya no es la más reciente).
+    #=============================================================================================
+    def evict(self, keep=None):
+        with self._lock:
+            entries = []
+            for key, _ in self._entries():
+                try:
+                    stat = os.stat(self._zip_path(key))
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, key))
+            total = sum(size for _, size, _ in entries)
+            for _, size, key in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if key == keep:
+                    continue
+                self._remove(key)
+                total -= size
+
+    # Entradas existentes en el directorio del caché como pares (llave, metadatos)
+    def _entries(self):
+        for f in os.listdir(self.cache_dir):
+            if not f.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.cache_dir, f), encoding='utf-8') as meta_file:
+                    yield f[:-len('.json')], json.load(meta_file)
+            except (OSError, ValueError):
+                continue
+
+    def _remove(self, key):
+        for path in (self._meta_path(key), self._zip_path(key)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
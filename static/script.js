@@ -5,6 +5,8 @@ document.addEventListener("DOMContentLoaded", () => {
     //* Se carga el historial de reportes al iniciar la página
     load_historial();
     loadCurrentNameExcel();
+    //* Se reciben en tiempo real los cambios del historial, del archivo Excel y el avance de los trabajos
+    connectEvents();
 
     //* Se obtiene la referencia de los botones en la interfaz
     const generatorBtn = document.getElementById('generatorBtn'); //* Boton para generar los documentos
@@ -18,6 +20,9 @@ document.addEventListener("DOMContentLoaded", () => {
     generatorBtn.addEventListener('click', function() {
         //* Se obtiene el mes seleccionado por el usuario a través de un elemento select
         const month = document.getElementById("monthSelect").value;
+        //* Los trimestres y el año completo se envían como lista de meses, un mes se envía como antes
+        const isPeriod = month === "year" || month.includes(",");
+        const payload = isPeriod ? { months: month === "year" ? "year" : month.split(",").map(Number) } : { month: month };
 
         //* Se muestra un modal de carga utilizando SweetAlert (Swal) para informar al usuario que el proceso esta en curso
         Swal.fire({
@@ -33,103 +38,103 @@ document.addEventListener("DOMContentLoaded", () => {
         });
 
         //* Se realiza una petición HTTP de tipo POST a la ruta '/generate' del servidor Flask
+        //* El servidor encola la generación y responde de inmediato con el identificador del trabajo
         fetch("https://generador-de-documentos-cfe.onrender.com/generate", { 
             method: "POST", //? Método HTTP POST para enviar datos al servidor
             headers: {
                 "Content-Type": "application/json" //? Especifica que se enviará JSON en la solicitud
             },
-            body: JSON.stringify({ month: month }) //? Se envía el mes seleccionado en formato JSON
+            body: JSON.stringify(payload) //? Se envía el mes o los meses seleccionados en formato JSON
         })
         .then(response => response.json()) //? Se convierte la respuesta del servidor a un objeto JSON
         .then(data => {
-            //? Se cierra el modal de carga (implícito al mostrar otro modal)
-            //* Se muestra el modal de error en caso de que la respuesta contenga un mensaje de error
             if(data.error){
-                Swal.fire({
-                    title: "Error",
-                    html: `<p class="atkinson-hyperlegible-next">${data.details || data.error}</p>`,
-                    icon: "error",
-                    customClass: {
-                        title: "atkinson-hyperlegible-next"
-                    }
-                });
+                showGenerationError(data);
+            } else if(data.summary){
+                //* Los reportes de este mes ya estaban generados con el mismo archivo, se muestran de inmediato
+                showGenerationSummary(data.summary);
             } else{
-                //* Si la generación fue exitosa, se extrae el resumen de la respuesta
-                let summary = data.summary;
-                //* Se muestra el modal con el resumen y el botón para la descarga del ZIP
-                Swal.fire({
-                    title: "Detalles de reportes",
-                    html: `<p class="atkinson-hyperlegible-next"><strong>Mes procesado:</strong> ${summary.month}</p>
-                           <p class="atkinson-hyperlegible-next"><strong>Total de documentos generados:</strong> ${summary.total_docs}</p>
-                           <p class="atkinson-hyperlegible-next"><strong>Cursos sin participantes:</strong> ${summary.courses_without_participants}</p>`,
-                    icon: "success",
-                    confirmButtonText: "Descargar reportes A20",
-                    customClass: {
-                        popup: "details-alert",
-                        title: "details-title atkinson-hyperlegible-next",
-                        confirmButton: "details-btn atkinson-hyperlegible-next"
-                    }
-                }).then((result) => {
-                    //? Si el usuario confirma (click en el botón de la generación de los reportes), se redirige a la URL de descarga
-                    if(result.isConfirmed){
-                        //? Se redirige a la URL para forzar la descarga del ZIP
-                        window.location.href = summary.download_url;
-                        //* Se actualiza el historial en tiempo real después de la confirmación exitosa
-                        load_historial()
-                    }
-                });
+                //* Se sigue el avance del trabajo hasta que termine
+                watchJob(data.job_id);
             }
         })
         .catch(error => {
             //? En caso de error en la petición, se cierra el modal de carga y se muestra un mensaje de error
             Swal.close();
-            Swal.fire({
-                title: "Error",
-                text: error.details || "Hubo un error al generar los reportes.",
-                icon: "error",
-                customClass: {
-                    title: "details-title atkinson-hyperlegible-next",
-                    confirmButton: "details-btn atkinson-hyperlegible-next"
-                }
-            });
+            showGenerationError(error);
 
             //* Se registra el error en la consola para depuración 
             console.error("Error: ", error);
         });
     });
 
+    //* Se escucha el evento click de los botones de paginación del historial
+    document.getElementById('historialPrevBtn').addEventListener('click', () => load_historial(historialPage - 1));
+    document.getElementById('historialNextBtn').addEventListener('click', () => load_historial(historialPage + 1));
+
     //* Se escucha el evento click del botón para limpiar el historial
     cleanBtn.addEventListener("click", function() {
-        fetch("https://generador-de-documentos-cfe.onrender.com/clean_historial", { method: "POST"})
-        .then(response => response.json())
-        .then(data => {
-            if(data.error){
-                //* Se muestra un modal de error en caso de fallo al limpiar el historial
-                Swal.fire({ 
-                    title: "Error",
-                    text: data.details || data.error,
-                    icon: "error",
-                    customClass: {
-                        title: "atkinson-hyperlegible-next",
-                        htmlContainer: "atkinson-hyperlegible-next",
-                        confirmButton: "details-btn atkinson-hyperlegible-next"
-                    }});
-            }else{
-                //* Se muestra un modal de éxito al limpiar el historial
-                Swal.fire({ 
-                    title: "Exito", 
-                    html: `<p class="atkinson-hyperlegible-next">${data.message}</p`,
-                    icon: "success",
-                    customClass: {
-                        title: "atkinson-hyperlegible-next",
-                        confirmButton: "details-btn atkinson-hyperlegible-next"
-                    }});
-                load_historial(); //* Se actualiza la lista del historial para mostrarla vacía
+        const month = document.getElementById("monthSelect").value;
+        //* Se pregunta qué documentos eliminar: todos, los de más de 30 días o los del mes (o periodo) seleccionado
+        Swal.fire({
+            title: "Limpiar historial",
+            input: "select",
+            inputOptions: {
+                all: "Todos los documentos",
+                old: "Generados hace más de 30 días",
+                month: "Del mes o periodo seleccionado"
+            },
+            inputValue: "all",
+            showCancelButton: true,
+            confirmButtonText: "Limpiar",
+            cancelButtonText: "Cancelar",
+            customClass: {
+                title: "atkinson-hyperlegible-next",
+                input: "atkinson-hyperlegible-next",
+                confirmButton: "details-btn atkinson-hyperlegible-next"
             }
-        }).catch(error => {
-            console.error("Error al limpiar el historial: ", error);
-            Swal.fire({ title: "Error", text: "No fue posible limpiar el historial.", icon: "error"});
-        })
+        }).then(choice => {
+            if(!choice.isConfirmed) return;
+            let body = {};
+            if(choice.value === "old") body = { older_than_days: 30 };
+            if(choice.value === "month") body = { month: month };
+
+            fetch("https://generador-de-documentos-cfe.onrender.com/clean_historial", {
+                method: "POST",
+                headers: { "Content-Type": "application/json" },
+                body: JSON.stringify(body)
+            })
+            .then(response => response.json())
+            .then(data => {
+                if(data.error){
+                    //* Se muestra un modal de error en caso de fallo al limpiar el historial
+                    Swal.fire({ 
+                        title: "Error",
+                        text: data.details || data.error,
+                        icon: "error",
+                        customClass: {
+                            title: "atkinson-hyperlegible-next",
+                            htmlContainer: "atkinson-hyperlegible-next",
+                            confirmButton: "details-btn atkinson-hyperlegible-next"
+                        }});
+                }else{
+                    //* Se muestra un modal de éxito al limpiar el historial con el número de documentos eliminados
+                    Swal.fire({ 
+                        title: "Exito", 
+                        html: `<p class="atkinson-hyperlegible-next">${data.message} Documentos eliminados: ${data.removed}</p>`,
+                        icon: "success",
+                        customClass: {
+                            title: "atkinson-hyperlegible-next",
+                            confirmButton: "details-btn atkinson-hyperlegible-next"
+                        }});
+                    //* Sin eventos en tiempo real se vuelve a consultar la lista del historial
+                    if(!eventsConnected()) load_historial();
+                }
+            }).catch(error => {
+                console.error("Error al limpiar el historial: ", error);
+                Swal.fire({ title: "Error", text: "No fue posible limpiar el historial.", icon: "error"});
+            })
+        });
     });
 
     //* Se escucha el evento submit del formulario para subir un nuevo archivo Excel
@@ -194,7 +199,7 @@ document.addEventListener("DOMContentLoaded", () => {
                         confirmButton: "details-btn atkinson-hyperlegible-next"
                     }
                 });
-                loadCurrentNameExcel();
+                if(!eventsConnected()) loadCurrentNameExcel();
             }
         }).catch(error => {
             Swal.close();
@@ -284,10 +289,14 @@ document.addEventListener("DOMContentLoaded", () => {
     });
 });
 
+//* Página actual del historial y documentos por página
+let historialPage = 1;
+let historialPerPage = 50;
+
 //* Función: load_historial
-//* Objetivo: Cargar y mostrar en tiempo real la lista de documentos del historial.
-const load_historial = () => {
-    fetch("https://generador-de-documentos-cfe.onrender.com/historial")
+//* Objetivo: Cargar y mostrar una página de la lista de documentos del historial (los más recientes primero).
+const load_historial = (page = 1) => {
+    fetch(`https://generador-de-documentos-cfe.onrender.com/historial?page=${page}`)
         .then(response => response.json())
         .then(data => {
             console.log("Historial cargado: ", data); //* Se verifica que se reciba la respuesta correctamente
@@ -300,28 +309,72 @@ const load_historial = () => {
 
             list.innerHTML = ""; //* Se limpia la lista actual
             if(data.historial && data.historial.length > 0){
-                //* Se filtra y elimina el archivo .gitkeep de la lista para el historial
-                const filteredFiles = data.historial.filter(file => file !== ".gitkeep");
                 //* Si existen archivos en el historial, se crean elementos de lista para cada uno
-                if(filteredFiles.length > 0){
-                    data.historial.forEach((file) => {
-                        if(file === ".gitkeep") return;
-                        let li = document.createElement("li");
-                        li.className = "historial-file atkinson-hyperlegible-next";
-                        li.textContent = file;
-                        list.appendChild(li);
-                    });
-                }else{
-                    //* En caso de no haber archivos se muestra un mensaje indicándolo
-                    list.innerHTML = `<li class="atkinson-hyperlegible-next">No hay reportes en el historial</li>`;
-                }
+                data.historial.forEach((file) => list.appendChild(historialItem(file)));
             }else{
                 //* En caso de no haber archivos se muestra un mensaje indicándolo
                 list.innerHTML = `<li class="atkinson-hyperlegible-next">No hay reportes en el historial</li>`;
             }
+
+            //* Se actualizan los controles de paginación
+            historialPage = data.page || 1;
+            historialPerPage = data.per_page || historialPerPage;
+            updateHistorialPages(data.total || 0);
         }).catch(error => console.error("Error al cargar el historial: ", error));
 };
 
+//* Función: historialItem
+//* Objetivo: Crear el elemento de la lista de un documento del historial con el enlace para descargarlo.
+const historialItem = (file) => {
+    let li = document.createElement("li");
+    li.className = "historial-file atkinson-hyperlegible-next";
+    let link = document.createElement("a");
+    link.href = `https://generador-de-documentos-cfe.onrender.com/historial/${encodeURIComponent(file)}`;
+    link.textContent = file; //* El texto del elemento sigue siendo el nombre del documento
+    li.appendChild(link);
+    return li;
+};
+
+//* Función: updateHistorialPages
+//* Objetivo: Actualizar la etiqueta y los botones de paginación a partir del total de documentos.
+const updateHistorialPages = (total) => {
+    const pages = Math.max(Math.ceil(total / historialPerPage), 1);
+    document.getElementById("historialPageLabel").textContent = `Página ${historialPage} de ${pages} (${total} documentos)`;
+    document.getElementById("historialPrevBtn").disabled = historialPage <= 1;
+    document.getElementById("historialNextBtn").disabled = historialPage >= pages;
+};
+
+//* Función: applyHistorialDelta
+//* Objetivo: Aplicar en la lista mostrada los documentos agregados y eliminados que llegan por eventos,
+//* sin volver a descargar la página completa del historial. Los nuevos se agregan al inicio de la primera página.
+const applyHistorialDelta = (data) => {
+    const list = document.getElementById("historial-list");
+    if(!list) return;
+    if(data.reload){
+        load_historial(historialPage);
+        return;
+    }
+    if(data.cleared){
+        historialPage = 1;
+        list.innerHTML = "";
+    }
+    const removed = new Set([...(data.removed || []), ...(data.added || [])]);
+    list.querySelectorAll("li.historial-file").forEach(li => {
+        if(removed.has(li.textContent)) li.remove();
+    });
+    if(historialPage === 1){
+        (data.added || []).forEach(file => list.prepend(historialItem(file)));
+        const files = list.querySelectorAll("li.historial-file");
+        for(let i = historialPerPage; i < files.length; i++) files[i].remove();
+    }
+    //* Se quita o se muestra el mensaje de historial vacío según corresponda
+    list.querySelectorAll("li:not(.historial-file)").forEach(li => li.remove());
+    if(!list.querySelector("li.historial-file")){
+        list.innerHTML = `<li class="atkinson-hyperlegible-next">No hay reportes en el historial</li>`;
+    }
+    updateHistorialPages(data.total || 0);
+};
+
 //* Función: loadCurrentNameExcel
 //* Objetivo: Obtener el nombre original del archivo Excel en uso desde la respuesta del endpoint correspondiente.
 const loadCurrentNameExcel = () => {
@@ -338,4 +391,141 @@ const loadCurrentNameExcel = () => {
         console.error("Error al cargar el nombre del archivo actual: ", error);
         
     });
-};
\ No newline at end of file
+};
+
+//* Conexión de eventos en tiempo real y trabajos de generación que se siguen por eventos
+let eventSource = null;
+const jobWatchers = {};
+
+//* Función: connectEvents
+//* Objetivo: Abrir la conexión de eventos (/events). El navegador se reconecta solo y el servidor reenvía los
+//* eventos perdidos; si ya no puede hacerlo envía "reset" y se recargan los datos completos.
+const connectEvents = () => {
+    if(!window.EventSource) return;
+    eventSource = new EventSource("https://generador-de-documentos-cfe.onrender.com/events");
+    eventSource.addEventListener("historial", e => applyHistorialDelta(JSON.parse(e.data)));
+    eventSource.addEventListener("workbook", e => {
+        document.getElementById('currentExcelSpan').textContent = JSON.parse(e.data).filename || 'Ninguno';
+    });
+    eventSource.addEventListener("job", e => {
+        const job = JSON.parse(e.data);
+        if(jobWatchers[job.job_id]) jobWatchers[job.job_id](job);
+    });
+    eventSource.addEventListener("reset", () => {
+        load_historial(historialPage);
+        loadCurrentNameExcel();
+    });
+    eventSource.onerror = () => {
+        //* Mientras no haya conexión los trabajos en curso se consultan periódicamente
+        Object.keys(jobWatchers).forEach(jobId => {
+            delete jobWatchers[jobId];
+            pollJob(jobId);
+        });
+    };
+};
+
+//* Indica si la conexión de eventos está abierta
+const eventsConnected = () => eventSource !== null && eventSource.readyState === EventSource.OPEN;
+
+//* Función: showJobState
+//* Objetivo: Mostrar el avance de un trabajo en el modal de carga o, al terminar, el resumen o el error.
+//* Devuelve true si el trabajo ya terminó.
+const showJobState = (job) => {
+    if(job.state === "done"){
+        showGenerationSummary(job.summary);
+        return true;
+    }
+    if(job.state === "error" || job.error){
+        showGenerationError(job);
+        return true;
+    }
+    const container = Swal.getHtmlContainer();
+    if(container && job.docs_total > 0){
+        //* El nombre del curso viene del archivo Excel: se asigna como texto, nunca como HTML
+        const progress = document.createElement("p");
+        progress.className = "atkinson-hyperlegible-next";
+        progress.textContent = `Documentos generados: ${job.docs_done} de ${job.docs_total}`;
+        const course = document.createElement("p");
+        course.className = "atkinson-hyperlegible-next";
+        course.textContent = job.current_course || "";
+        container.replaceChildren(progress, course);
+    }
+    return false;
+};
+
+//* Función: watchJob
+//* Objetivo: Seguir un trabajo de generación con los eventos "job" y, sin conexión de eventos, consultando su estado.
+//* Se consulta una vez su estado por si terminó antes de empezar a seguirlo.
+const watchJob = (jobId) => {
+    if(!eventsConnected()){
+        pollJob(jobId);
+        return;
+    }
+    jobWatchers[jobId] = (job) => {
+        if(showJobState(job)) delete jobWatchers[jobId];
+    };
+    fetch(`https://generador-de-documentos-cfe.onrender.com/jobs/${jobId}`)
+    .then(response => response.ok ? response.json() : null)
+    .then(job => {
+        //* Si la consulta falla el trabajo se sigue igual por los eventos "job"
+        if(job && jobWatchers[jobId]) jobWatchers[jobId](job);
+    }).catch(error => console.error("Error al consultar el avance de la generación: ", error));
+};
+
+//* Función: pollJob
+//* Objetivo: Consultar periódicamente el estado de un trabajo de generación, mostrar su avance en el modal
+//* de carga y, al terminar, mostrar el resumen con el botón de descarga o el error correspondiente.
+const pollJob = (jobId) => {
+    fetch(`https://generador-de-documentos-cfe.onrender.com/jobs/${jobId}`)
+    .then(response => response.json())
+    .then(job => {
+        //* Si no ha terminado se vuelve a consultar en un segundo
+        if(!showJobState(job)) setTimeout(() => pollJob(jobId), 1000);
+    }).catch(error => {
+        Swal.close();
+        showGenerationError(error);
+        console.error("Error al consultar el avance de la generación: ", error);
+    });
+};
+
+//* Función: showGenerationSummary
+//* Objetivo: Mostrar el modal con el resumen de la generación y el botón para la descarga del ZIP.
+const showGenerationSummary = (summary) => {
+    Swal.fire({
+        title: "Detalles de reportes",
+        html: `<p class="atkinson-hyperlegible-next"><strong>Mes procesado:</strong> ${summary.month}</p>
+               <p class="atkinson-hyperlegible-next"><strong>Total de documentos generados:</strong> ${summary.total_docs}</p>
+               <p class="atkinson-hyperlegible-next"><strong>Nuevos o actualizados:</strong> ${summary.rendered} | <strong>Sin cambios:</strong> ${summary.reused} | <strong>Eliminados:</strong> ${summary.removed}</p>
+               <p class="atkinson-hyperlegible-next"><strong>Cursos sin participantes:</strong> ${summary.courses_without_participants}</p>
+               ${(summary.months || []).map(m => `<p class="atkinson-hyperlegible-next">${m.month}: ${m.total_docs} documentos, ${m.courses_without_participants} cursos sin participantes</p>`).join("")}`,
+        icon: "success",
+        confirmButtonText: "Descargar reportes A20",
+        customClass: {
+            popup: "details-alert",
+            title: "details-title atkinson-hyperlegible-next",
+            confirmButton: "details-btn atkinson-hyperlegible-next"
+        }
+    }).then((result) => {
+        //? Si el usuario confirma (click en el botón de la generación de los reportes), se redirige a la URL de descarga
+        if(result.isConfirmed){
+            //? Se redirige a la URL para forzar la descarga del ZIP
+            window.location.href = summary.download_url;
+            //* Sin eventos en tiempo real se actualiza el historial después de la confirmación exitosa
+            if(!eventsConnected()) load_historial();
+        }
+    });
+};
+
+//* Función: showGenerationError
+//* Objetivo: Mostrar el modal de error de la generación con el detalle devuelto por el servidor.
+const showGenerationError = (data) => {
+    Swal.fire({
+        title: "Error",
+        html: `<p class="atkinson-hyperlegible-next">${data.details || data.error || "Hubo un error al generar los reportes."}</p>`,
+        icon: "error",
+        customClass: {
+            title: "details-title atkinson-hyperlegible-next",
+            confirmButton: "details-btn atkinson-hyperlegible-next"
+        }
+    });
+};
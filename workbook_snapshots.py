@@ -0,0 +1,232 @@
+import os # Manejo de rutas y archivos
+import json # Metadatos de cada versión y apuntador a la versión actual
+import time # Fecha de subida de cada versión y antigüedad de las reservas
+import uuid # Nombre único de cada reserva
+import shutil # Copia del archivo de datos existente al importarlo
+import stat # Permiso de escritura para eliminar versiones de solo lectura
+from excel_cache import file_hash # SHA-256 del contenido del archivo Excel
+
+# Directorio donde se guardan las versiones del archivo Excel
+SNAPSHOTS_DIR = os.path.join(os.getcwd(), "excel_snapshots")
+
+# Apuntador a la versión actual dentro del directorio de versiones
+CURRENT_FILE = "current.json"
+# Subdirectorio con las reservas (pins) de las generaciones en curso
+PINS_DIR = "pins"
+# Una reserva con más antigüedad que esta (en segundos) se considera abandonada aunque su proceso exista
+PIN_MAX_AGE = 6 * 3600
+# Segundos después de un cambio de versión durante los que no se elimina ninguna versión: cubre a quien
+# leyó el apuntador anterior y aún no crea su reserva, y a una versión recién guardada que aún no es la actual
+GC_GRACE = 60
+
+#=================================================================================================
+# Clase: Snapshot
+# Objetivo: Versión del archivo Excel: su hash (SHA-256 del contenido), la ruta del archivo inmutable
+#           y sus metadatos (nombre original, tamaño, fecha de subida y filas por hoja).
+#=================================================================================================
+class Snapshot:
+    def __init__(self, digest, path, meta):
+        self.hash = digest
+        self.path = path
+        self.meta = meta
+
+#=================================================================================================
+# Clase: SnapshotStore
+# Objetivo: Versiones inmutables del archivo Excel identificadas por el hash de su contenido, con un
+#           apuntador atómico (current.json) a la versión actual. Cada generación reserva (pin) la
+#           versión con la que inicia y la lee hasta terminar aunque mientras tanto se suba otro
+#           archivo; así las subidas y las generaciones nunca se bloquean ni leen un archivo a medio
+#           escribir. Las versiones que ya no son la actual ni están reservadas se eliminan. Las
+#           reservas son archivos, así que funcionan entre varios workers de gunicorn.
+#=================================================================================================
+class SnapshotStore:
+    def __init__(self, snapshots_dir=SNAPSHOTS_DIR):
+        self.snapshots_dir = snapshots_dir
+        self.pins_dir = os.path.join(snapshots_dir, PINS_DIR)
+        os.makedirs(self.pins_dir, exist_ok=True)
+
+    def _path(self, digest):
+        return os.path.join(self.snapshots_dir, f"{digest}.xlsx")
+
+    def _meta_path(self, digest):
+        return os.path.join(self.snapshots_dir, f"{digest}.json")
+
+    #=============================================================================================
+    # Método: add
+    # Objetivo: Guardar el archivo como una nueva versión y convertirla en la actual. Con
+    #           `move=True` el archivo se mueve (debe estar en el mismo sistema de archivos); si no,
+    #           se copia. Si ya existe una versión con el mismo contenido se reutiliza. Con
+    #           `make_current=False` solo se guarda y se vuelve la actual después con set_current.
+    #           Devuelve el Snapshot de la versión.
+    #=============================================================================================
+    def add(self, src_path, filename, rows=None, move=False, make_current=True):
+        digest = file_hash(src_path)
+        path = self._path(digest)
+        if os.path.exists(path):
+            if move:
+                os.remove(src_path)
+            os.utime(path) # Se renueva para que la limpieza no la elimine antes de volverse la actual
+        else:
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            if move:
+                try:
+                    os.replace(src_path, tmp_path)
+                except OSError:
+                    # El archivo está en otro sistema de archivos: se copia y se elimina el original
+                    shutil.copyfile(src_path, tmp_path)
+                    os.remove(src_path)
+            else:
+                shutil.copyfile(src_path, tmp_path)
+            os.replace(tmp_path, path)
+
+        meta = {
+            "hash": digest,
+            "filename": filename,
+            "size": os.path.getsize(path),
+            "uploaded_at": time.time(),
+            "rows": rows or {}
+        }
+        _write_json(self._meta_path(digest), meta)
+        snapshot = Snapshot(digest, path, meta)
+        if make_current:
+            self.set_current(snapshot)
+        return snapshot
+
+    #=============================================================================================
+    # Método: set_current
+    # Objetivo: Apuntar current.json a una versión ya guardada con add.
+    #=============================================================================================
+    def set_current(self, snapshot):
+        _write_json(os.path.join(self.snapshots_dir, CURRENT_FILE), {"hash": snapshot.hash, "updated_at": time.time()})
+
+    #=============================================================================================
+    # Método: current
+    # Objetivo: Devolver el Snapshot de la versión actual o None si todavía no existe ninguna.
+    #=============================================================================================
+    def current(self):
+        try:
+            with open(os.path.join(self.snapshots_dir, CURRENT_FILE), encoding='utf-8') as f:
+                digest = json.load(f)["hash"]
+        except (OSError, ValueError, KeyError):
+            return None
+        try:
+            with open(self._meta_path(digest), encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            meta = {"hash": digest}
+        return Snapshot(digest, self._path(digest), meta)
+
+    #=============================================================================================
+    # Método: pin
+    # Objetivo: Reservar la versión actual para una generación. Devuelve (Snapshot, reserva) o
+    #           (None, None) si no hay versiones. La reserva se crea antes de confirmar que la versión
+    #           sigue siendo la actual: si cambió en ese instante se reintenta con la nueva, así la
+    #           limpieza (que lee el apuntador antes de revisar las reservas) nunca elimina una versión
+    #           reservada. La reserva se libera con unpin.
+    #=============================================================================================
+    def pin(self):
+        while True:
+            snapshot = self.current()
+            if snapshot is None:
+                return None, None
+            pin = os.path.join(self.pins_dir, f"{snapshot.hash}.{os.getpid()}.{uuid.uuid4().hex}")
+            open(pin, 'w').close()
+            current = self.current()
+            if current is not None and current.hash == snapshot.hash and os.path.exists(snapshot.path):
+                return snapshot, pin
+            _remove(pin)
+
+    #=============================================================================================
+    # Método: unpin
+    # Objetivo: Liberar la reserva de una generación terminada y eliminar las versiones que ya no
+    #           se utilizan.
+    #=============================================================================================
+    def unpin(self, pin):
+        if pin:
+            _remove(pin)
+            self.gc()
+
+    #=============================================================================================
+    # Método: gc
+    # Objetivo: Eliminar las versiones que no son la actual ni tienen reservas vigentes. Las reservas
+    #           de procesos que ya no existen (o demasiado antiguas) se descartan. No se elimina nada
+    #           durante GC_GRACE segundos después de un cambio de versión ni las versiones guardadas
+    #           hace menos de ese tiempo. Devuelve los hashes de las versiones eliminadas.
+    #=============================================================================================
+    def gc(self):
+        current = self.current()
+        pinned = set()
+        now = time.time()
+        for f in os.listdir(self.pins_dir):
+            digest, _, rest = f.partition('.')
+            pid = rest.partition('.')[0]
+            path = os.path.join(self.pins_dir, f)
+            try:
+                stale = now - os.path.getmtime(path) > PIN_MAX_AGE or not _process_alive(int(pid))
+            except (OSError, ValueError):
+                stale = True
+            if stale:
+                _remove(path)
+            else:
+                pinned.add(digest)
+
+        removed = []
+        if _age(os.path.join(self.snapshots_dir, CURRENT_FILE), now) < GC_GRACE:
+            return removed
+        for f in os.listdir(self.snapshots_dir):
+            digest, ext = os.path.splitext(f)
+            if ext != '.xlsx' or digest in pinned or (current is not None and digest == current.hash):
+                continue
+            if _age(self._path(digest), now) < GC_GRACE:
+                continue
+            _remove(self._path(digest))
+            _remove(self._meta_path(digest))
+            removed.append(digest)
+        return removed
+
+    #=============================================================================================
+    # Método: stats
+    # Objetivo: Número de versiones guardadas y de reservas vigentes (para /current_excel).
+    #=============================================================================================
+    def stats(self):
+        snapshots = sum(1 for f in os.listdir(self.snapshots_dir) if f.endswith('.xlsx'))
+        return {"snapshots": snapshots, "pinned": len(os.listdir(self.pins_dir))}
+
+# Escritura atómica de un archivo JSON (archivo temporal + renombrado)
+def _write_json(path, data):
+    tmp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+# Segundos desde la última modificación de un archivo (0 si no existe)
+def _age(path, now):
+    try:
+        return now - os.path.getmtime(path)
+    except OSError:
+        return 0
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except PermissionError:
+        # En Windows un archivo de solo lectura (versiones guardadas antes) no se puede eliminar
+        try:
+            os.chmod(path, stat.S_IWRITE)
+            os.remove(path)
+        except OSError:
+            pass
+    except OSError:
+        pass
+
+# Indica si el proceso sigue en ejecución (en Windows no se puede consultar sin riesgo y se usa solo la antigüedad)
+def _process_alive(pid):
+    if os.name != 'posix':
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True